@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.admin import register
 from .models import (
     City, Language, Vacancy, Error, Url, ParsedJob, ParsedCompany,
-    Company, Job, JobScore, UserProfile, Application
+    Company, Job, JobScore, JobFeatures, UserProfile, UserJobMatch, Application, ScrapeRun
 )
 
 
@@ -60,7 +60,7 @@ class JobAdmin(admin.ModelAdmin):
     list_display = ('title', 'company_name', 'location', 'source_site', 'salary_min', 'salary_max', 'is_remote', 'posted_date', 'is_active')
     list_filter = ('source_site', 'is_remote', 'experience_level', 'is_active', 'posted_date')
     search_fields = ('title', 'company_name', 'location', 'description')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('created_at', 'updated_at', 'content_hash')
     list_editable = ('is_active',)
 
 
@@ -72,11 +72,21 @@ class JobScoreInline(admin.StackedInline):
 
 @admin.register(JobScore)
 class JobScoreAdmin(admin.ModelAdmin):
-    list_display = ('job', 'relevance_score', 'skill_match_score', 'salary_score', 'location_score', 'calculated_at')
+    list_display = (
+        'job', 'relevance_score', 'content_score', 'freshness_score', 'skill_match_score',
+        'salary_score', 'location_score', 'calculated_at',
+    )
     list_filter = ('calculated_at',)
     readonly_fields = ('calculated_at', 'updated_at')
 
 
+@admin.register(JobFeatures)
+class JobFeaturesAdmin(admin.ModelAdmin):
+    list_display = ('job', 'keywords', 'updated_at')
+    search_fields = ('job__title',)
+    readonly_fields = ('content_hash', 'updated_at')
+
+
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'min_salary', 'location_preference', 'is_notifications_enabled', 'created_at')
@@ -85,9 +95,24 @@ class UserProfileAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'updated_at')
 
 
+@admin.register(UserJobMatch)
+class UserJobMatchAdmin(admin.ModelAdmin):
+    list_display = ('user', 'job', 'score', 'rank', 'calculated_at')
+    search_fields = ('user__email', 'job__title')
+    readonly_fields = ('calculated_at',)
+
+
 @admin.register(Application)
 class ApplicationAdmin(admin.ModelAdmin):
     list_display = ('user', 'job', 'status', 'applied_at', 'reminder_date', 'updated_at')
     list_filter = ('status', 'applied_at', 'reminder_date')
     search_fields = ('user__username', 'job__title', 'job__company_name')
     readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(ScrapeRun)
+class ScrapeRunAdmin(admin.ModelAdmin):
+    list_display = ('source', 'query', 'status', 'attempts', 'finished_early', 'started_at', 'finished_at')
+    list_filter = ('source', 'status', 'finished_early')
+    search_fields = ('query', 'error')
+    readonly_fields = ('started_at', 'updated_at', 'finished_at')
@@ -0,0 +1,270 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, Iterator, List, Optional
+
+from django.conf import settings
+
+from .fetcher import FetchResult
+
+try:
+    import zstandard
+except ImportError:  # архив отключается, скраперы работают как раньше
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE_CONFIG = {
+    'enabled': True,
+    'path': None,  # None - BASE_DIR / 'page_archive'
+    'compression_level': 10,
+    'max_age_days': 60,
+    'max_size_mb': 1024,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    source TEXT NOT NULL,
+    fetched_at TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    status INTEGER,
+    encoding TEXT
+);
+CREATE INDEX IF NOT EXISTS pages_source_fetched ON pages (source, fetched_at);
+CREATE INDEX IF NOT EXISTS pages_hash ON pages (hash);
+"""
+
+
+def archive_config() -> Dict:
+    config = dict(DEFAULT_ARCHIVE_CONFIG)
+    config.update(getattr(settings, 'PAGE_ARCHIVE', {}))
+    if not config['path']:
+        config['path'] = os.path.join(str(getattr(settings, 'BASE_DIR', '.')), 'page_archive')
+    return config
+
+
+def _now() -> str:
+    return datetime.now(dt_timezone.utc).isoformat(timespec='seconds')
+
+
+class PageArchive:
+    """
+    Архив сырых ответов сайтов вместо отладочных дампов в корне проекта.
+
+    Тело ответа хранится один раз по sha256 содержимого (blobs/ab/abcd....zst,
+    сжатие zstd), а каждая загрузка - строкой индекса SQLite (url, source,
+    fetched_at, hash, status). По архиву можно заново прогнать парсеры
+    (manage.py reparse_archive) без повторной загрузки; размер ограничивается
+    сроком хранения и общим объемом (manage.py prune_archive).
+    """
+
+    def __init__(self, path: str, compression_level: int = 10):
+        if zstandard is None:
+            raise RuntimeError('zstandard is not installed')
+        self.path = str(path)
+        self.compression_level = compression_level
+        self.index_path = os.path.join(self.path, 'index.sqlite3')
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(self.path, 'blobs'), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Соединение на операцию (архив пишут поток fetcher'а и несколько процессов)"""
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.path, 'blobs', digest[:2], f"{digest}.zst")
+
+    def store(self, url: str, content: bytes, source: str, status: int = None, encoding: str = None,
+              fetched_at: str = None) -> str:
+        """Сохранить ответ; возвращает hash тела (одинаковые тела хранятся один раз)"""
+        digest = hashlib.sha256(content).hexdigest()
+        with self._lock, self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            if conn.execute('SELECT 1 FROM blobs WHERE hash = ?', (digest,)).fetchone() is None:
+                compressed = zstandard.ZstdCompressor(level=self.compression_level).compress(content)
+                blob_path = self._blob_path(digest)
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                tmp_path = f"{blob_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(compressed)
+                os.replace(tmp_path, blob_path)
+                conn.execute(
+                    'INSERT INTO blobs (hash, size, stored_size, created_at) VALUES (?, ?, ?, ?)',
+                    (digest, len(content), len(compressed), _now())
+                )
+            conn.execute(
+                'INSERT INTO pages (url, source, fetched_at, hash, status, encoding) VALUES (?, ?, ?, ?, ?, ?)',
+                (url, source, fetched_at or _now(), digest, status, encoding)
+            )
+        return digest
+
+    def read(self, digest: str) -> bytes:
+        with open(self._blob_path(digest), 'rb') as f:
+            return zstandard.ZstdDecompressor().decompress(f.read())
+
+    def pages(self, source: str = None, since: datetime = None, until: datetime = None,
+              latest: bool = True) -> List[Dict]:
+        """
+        Строки индекса по источнику и интервалу fetched_at (старые первыми).
+        latest=True - только последняя загрузка каждого URL.
+        """
+        conditions, params = [], []
+        if source:
+            conditions.append('source = ?')
+            params.append(source)
+        if since:
+            conditions.append('fetched_at >= ?')
+            params.append(since.astimezone(dt_timezone.utc).isoformat(timespec='seconds'))
+        if until:
+            conditions.append('fetched_at < ?')
+            params.append(until.astimezone(dt_timezone.utc).isoformat(timespec='seconds'))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        query = f'SELECT * FROM pages {where} ORDER BY fetched_at, id'
+        if latest:
+            query = (
+                f'SELECT * FROM pages WHERE id IN (SELECT MAX(id) FROM pages {where} GROUP BY source, url) '
+                f'ORDER BY fetched_at, id'
+            )
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(query, params)]
+
+    def iter_results(self, rows: List[Dict]) -> Iterator[FetchResult]:
+        """Архивные страницы в виде FetchResult - как будто их только что загрузил AsyncFetcher"""
+        for row in rows:
+            try:
+                content = self.read(row['hash'])
+            except (OSError, zstandard.ZstdError) as e:
+                yield FetchResult(row['url'], error=f"Archived blob {row['hash']} is unreadable: {e}")
+                continue
+            yield FetchResult(row['url'], status=row['status'], content=content, encoding=row['encoding'])
+
+    def prune(self, max_age_days: float = None, max_size_mb: float = None) -> Dict:
+        """
+        Удалить загрузки старше max_age_days, затем самые старые тела, пока архив
+        не уложится в max_size_mb. Тела без ссылок из индекса удаляются с диска.
+        """
+        removed = {'pages': 0, 'blobs': 0, 'bytes': 0}
+        with self._lock, self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            if max_age_days is not None:
+                cutoff = datetime.now(dt_timezone.utc) - timedelta(days=max_age_days)
+                removed['pages'] += conn.execute(
+                    'DELETE FROM pages WHERE fetched_at < ?', (cutoff.isoformat(timespec='seconds'),)
+                ).rowcount
+
+            orphans = [row['hash'] for row in conn.execute(
+                'SELECT hash FROM blobs WHERE hash NOT IN (SELECT hash FROM pages)'
+            )]
+
+            if max_size_mb is not None:
+                budget = int(max_size_mb * 1024 * 1024)
+                total = conn.execute(
+                    'SELECT COALESCE(SUM(stored_size), 0) FROM blobs WHERE hash IN (SELECT hash FROM pages)'
+                ).fetchone()[0]
+                if total > budget:
+                    # Сначала тела, которые дольше всего не загружались
+                    rows = conn.execute(
+                        'SELECT b.hash, b.stored_size FROM blobs b JOIN pages p ON p.hash = b.hash '
+                        'GROUP BY b.hash ORDER BY MAX(p.fetched_at)'
+                    )
+                    for row in rows:
+                        if total <= budget:
+                            break
+                        orphans.append(row['hash'])
+                        total -= row['stored_size']
+                    for digest in orphans:
+                        removed['pages'] += conn.execute('DELETE FROM pages WHERE hash = ?', (digest,)).rowcount
+
+            for digest in orphans:
+                removed['bytes'] += conn.execute(
+                    'SELECT stored_size FROM blobs WHERE hash = ?', (digest,)
+                ).fetchone()[0]
+                conn.execute('DELETE FROM blobs WHERE hash = ?', (digest,))
+                try:
+                    os.remove(self._blob_path(digest))
+                except FileNotFoundError:
+                    pass
+                removed['blobs'] += 1
+        return removed
+
+    def stats(self) -> Dict:
+        with self._connect() as conn:
+            pages, urls = conn.execute('SELECT COUNT(*), COUNT(DISTINCT url) FROM pages').fetchone()
+            blobs, size, stored_size = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM blobs'
+            ).fetchone()
+            sources = {
+                row['source']: row['count']
+                for row in conn.execute('SELECT source, COUNT(*) AS count FROM pages GROUP BY source')
+            }
+        return {
+            'pages': pages, 'urls': urls, 'blobs': blobs, 'size': size, 'stored_size': stored_size,
+            'sources': sources,
+        }
+
+
+class ArchiveFetcher:
+    """Замена AsyncFetcher для ParsePipeline: страницы берутся из архива, а не из сети"""
+
+    def __init__(self, archive: PageArchive, rows: List[Dict]):
+        self.archive = archive
+        self.rows = {row['url']: row for row in rows}
+
+    def iter_fetched(self, urls: List[str], max_pending: int = None, archive: str = None,
+                     cache: str = None) -> Iterator[FetchResult]:
+        return self.archive.iter_results([self.rows[url] for url in urls])
+
+
+_archive: Optional[PageArchive] = None
+_archive_lock = threading.Lock()
+
+
+def get_page_archive() -> Optional[PageArchive]:
+    """Архив процесса по settings.PAGE_ARCHIVE; None - если отключен или нет zstandard"""
+    global _archive
+    config = archive_config()
+    if not config['enabled']:
+        return None
+    with _archive_lock:
+        if _archive is None or _archive.path != str(config['path']):
+            if zstandard is None:
+                logger.warning("zstandard is not installed, page archive is disabled")
+                return None
+            _archive = PageArchive(config['path'], config['compression_level'])
+        return _archive
+
+
+def archive_result(result: FetchResult, source: str) -> Optional[str]:
+    """Сохранить ответ fetcher'а в архив (ошибки архива не ломают скрапинг)"""
+    if result.status is None or not result.content:
+        return None
+    try:
+        archive = get_page_archive()
+        if archive is None:
+            return None
+        return archive.store(result.url, result.content, source, result.status, result.encoding)
+    except Exception as e:
+        logger.error(f"Error archiving {result.url}: {str(e)}")
+        return None
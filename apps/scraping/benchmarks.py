@@ -0,0 +1,361 @@
+import contextlib
+import gc
+import glob
+import html
+import io
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import re
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.test.utils import override_settings
+
+from .html_parser import _card_fragments, available_backends
+from .ingestion import normalize_job_data
+
+try:
+    import resource
+except ImportError:  # Windows - пиковый RSS не измеряется
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCALES = (1, 10, 100)
+DEFAULT_REPEAT = 3
+# Источник без HTML (JSON внутри страницы или API) - backend парсера не влияет
+JSON_BACKEND = 'json'
+# Сколько карточек в синтетической странице поиска LinkedIn (как в выдаче)
+LINKEDIN_PAGE_SIZE = 25
+
+LINKEDIN_CARD_TEMPLATE = (
+    '<li><div class="base-card relative w-full hover:no-underline focus:no-underline base-card--link '
+    'base-search-card base-search-card--link job-search-card" data-entity-urn="urn:li:jobPosting:{id}">'
+    '<a class="base-card__full-link absolute top-0 right-0 bottom-0 left-0 p-0 z-[2]" href="{url}?trk=public_jobs">'
+    '<span class="sr-only">{title}</span></a>'
+    '<div class="search-entity-media"><img class="artdeco-entity-image" alt="{company}" '
+    'data-delayed-url="https://media.licdn.com/dms/image/{id}/company-logo_100_100/0"></div>'
+    '<div class="base-search-card__info"><h3 class="base-search-card__title">{title}</h3>'
+    '<h4 class="base-search-card__subtitle"><a class="hidden-nested-link" href="https://ee.linkedin.com/company/{id}">'
+    '{company}</a></h4><div class="base-search-card__metadata">'
+    '<span class="job-search-card__location">{location}</span>'
+    '<div class="job-posting-benefits text-sm"><span class="job-posting-benefits__text">Be an early applicant</span></div>'
+    '<time class="job-search-card__listdate" datetime="{posted_date}">1 week ago</time>'
+    '</div></div></div></li>'
+)
+
+
+# --- пути разбора источников (то же, что делают скраперы с загруженной страницей) ---
+
+def _cvkeskus_parser() -> Callable:
+    from .scrapers.cvkeskus_scraper import CVKeskusScraper
+    return CVKeskusScraper()._parse_page_markup
+
+
+def _cv_ee_json_parser() -> Callable:
+    from .scrapers.cv_ee_selenium_scraper import CVeeSeleniumScraper, extract_search_results
+    scraper = CVeeSeleniumScraper()
+
+    def parse(markup):
+        search_results = extract_search_results(markup) or {}
+        jobs = (scraper._parse_vacancy_from_json(vacancy) for vacancy in search_results.get('vacancies') or [])
+        return [job for job in jobs if job]
+    return parse
+
+
+def _cv_ee_cards_parser() -> Callable:
+    from .scrapers.cv_ee_selenium_scraper import CVeeSeleniumScraper
+    return CVeeSeleniumScraper()._parse_cards_page
+
+
+def _linkedin_parser() -> Callable:
+    from .scrapers.linkedin_scraper import LinkedInScraper
+    return LinkedInScraper().parse_search_page
+
+
+def _cvkeskus_api_parser() -> Callable:
+    def parse(markup):
+        jobs = (normalize_job_data(job, 'cvkeskus') for job in json.loads(markup).get('jobs') or [])
+        return [job for job in jobs if job]
+    return parse
+
+
+def _cvkeskus_containers():
+    from .scrapers.cvkeskus_scraper import CVKeskusScraper
+    return CVKeskusScraper.CARD_CONTAINERS
+
+
+def _linkedin_containers():
+    from .scrapers.linkedin_scraper import LinkedInScraper
+    return LinkedInScraper.CARD_CONTAINERS
+
+
+# --- синтетические страницы ---
+
+def scale_cards(markup: str, containers, factor: int) -> Optional[str]:
+    """Страница с factor-кратным числом карточек (копии вставляются после последней)"""
+    fragments = list(_card_fragments(markup, containers, strict=False))
+    if not fragments:
+        return None
+    end = markup.rfind(fragments[-1]) + len(fragments[-1])
+    return markup[:end] + ''.join(fragments) * (factor - 1) + markup[end:]
+
+
+def scale_next_data(markup: str, factor: int) -> Optional[str]:
+    """Страница cv.ee с factor-кратным списком вакансий в __NEXT_DATA__"""
+    from .scrapers.cv_ee_selenium_scraper import NEXT_DATA_RE
+    match = NEXT_DATA_RE.search(markup)
+    if not match:
+        return None
+    data = json.loads(match.group(1))
+    search_results = data.get('props', {}).get('pageProps', {}).get('searchResults') or {}
+    search_results['vacancies'] = (search_results.get('vacancies') or []) * factor
+    payload = json.dumps(data, ensure_ascii=False)
+    return markup[:match.start(1)] + payload + markup[match.end(1):]
+
+
+def scale_json_jobs(markup: str, factor: int) -> Optional[str]:
+    data = json.loads(markup)
+    data['jobs'] = (data.get('jobs') or []) * factor
+    return json.dumps(data, ensure_ascii=False)
+
+
+def linkedin_search_page(path: str) -> str:
+    """Синтетическая выдача LinkedIn (guest API) по сохраненным вакансиям"""
+    with open(path, encoding='utf-8') as f:
+        jobs = json.load(f)
+    cards = []
+    for index in range(LINKEDIN_PAGE_SIZE):
+        job = jobs[index % len(jobs)]
+        values = {key: html.escape(str(job.get(key) or '')) for key in ('title', 'company', 'location', 'posted_date')}
+        values['id'] = 4000000000 + index
+        values['url'] = html.escape(f"{job.get('url')}-{index}")
+        cards.append(LINKEDIN_CARD_TEMPLATE.format(**values))
+    return ''.join(cards)
+
+
+BENCHMARK_SOURCES = {
+    'cvkeskus': {
+        'fixtures': ['cvkeskus_debug*.html', 'cvkeskus_sample.html'],
+        'parser': _cvkeskus_parser,
+        'scale': lambda markup, factor: scale_cards(markup, _cvkeskus_containers(), factor),
+    },
+    'cv_ee': {
+        'fixtures': ['cv_ee_debug.html', 'page_source*.html'],
+        'parser': _cv_ee_json_parser,
+        'scale': scale_next_data,
+        'html': False,
+    },
+    'cv_ee_cards': {
+        'fixtures': ['cv_ee_debug.html', 'page_source*.html', 'cv_ee_search_results.html'],
+        'parser': _cv_ee_cards_parser,
+        'scale': lambda markup, factor: scale_cards(
+            markup, [('li', {'class': re.compile('vacancies-list__item')})], factor
+        ),
+    },
+    'linkedin': {
+        'fixtures': ['linkedin_jobs_debug.json'],
+        'load': linkedin_search_page,
+        'parser': _linkedin_parser,
+        'scale': lambda markup, factor: scale_cards(markup, _linkedin_containers(), factor),
+    },
+    'cvkeskus_api': {
+        'fixtures': ['cvkeskus_api_response.json'],
+        'parser': _cvkeskus_api_parser,
+        'scale': scale_json_jobs,
+        'html': False,
+    },
+}
+
+
+def load_markup(source: str, path: str, scale: int = 1) -> Optional[str]:
+    config = BENCHMARK_SOURCES[source]
+    if 'load' in config:
+        markup = config['load'](path)
+    else:
+        with open(path, encoding='utf-8') as f:
+            markup = f.read()
+    if scale > 1:
+        markup = config['scale'](markup, scale)
+    return markup
+
+
+def collect_cases(sources: List[str] = None, backends: List[str] = None, scales=DEFAULT_SCALES,
+                  fixtures_dir: str = None) -> Dict[str, List]:
+    """
+    Кейсы бенчмарка: каждая фикстура источника в масштабе 1 и первая фикстура
+    источника в остальных масштабах, для каждого backend'а.
+    :return: {'cases': [...], 'skipped': [...]}
+    """
+    fixtures_dir = str(fixtures_dir or settings.BASE_DIR)
+    backends = [backend for backend in (backends or available_backends()) if backend in available_backends()]
+    cases, skipped = [], []
+    for source in sources or BENCHMARK_SOURCES:
+        config = BENCHMARK_SOURCES[source]
+        paths = []
+        for pattern in config['fixtures']:
+            for path in sorted(glob.glob(os.path.join(fixtures_dir, pattern))):
+                if path in paths:
+                    continue
+                if os.path.getsize(path) == 0:
+                    skipped.append({'source': source, 'fixture': os.path.basename(path), 'reason': 'empty file'})
+                    continue
+                paths.append(path)
+        if not paths:
+            skipped.append({'source': source, 'fixture': None, 'reason': 'no fixtures found'})
+            continue
+        source_backends = backends if config.get('html', True) else [JSON_BACKEND]
+        for scale in scales:
+            for path in (paths if scale == 1 else paths[:1]):
+                for backend in source_backends:
+                    cases.append({'source': source, 'fixture': path, 'scale': scale, 'backend': backend})
+    return {'cases': cases, 'skipped': skipped}
+
+
+def _max_rss_kb() -> Optional[int]:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS отдает байты, Linux - килобайты
+    return rss // 1024 if platform.system() == 'Darwin' else rss
+
+
+def run_case(case: Dict, repeat: int = DEFAULT_REPEAT) -> Dict:
+    """Прогон одного кейса: время (медиана repeat прогонов), пиковый RSS и аллокации Python"""
+    result = {
+        'source': case['source'],
+        'fixture': os.path.basename(case['fixture']),
+        'scale': case['scale'],
+        'backend': case['backend'],
+    }
+    markup = load_markup(case['source'], case['fixture'], case['scale'])
+    if markup is None:
+        result['error'] = 'fixture has no cards to scale'
+        return result
+    parse = BENCHMARK_SOURCES[case['source']]['parser']()
+    backend_settings = {} if case['backend'] == JSON_BACKEND else {
+        'HTML_PARSER_BACKENDS': {'default': case['backend']},
+    }
+
+    # Скраперы печатают прогресс через print - в отчет бенчмарка он не нужен
+    with override_settings(**backend_settings), contextlib.redirect_stdout(io.StringIO()):
+        gc.collect()
+        rss_before = _max_rss_kb()
+        jobs = parse(markup)  # прогрев (кэши селекторов, импорты)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            jobs = parse(markup)
+            timings.append(time.perf_counter() - started)
+        rss_after = _max_rss_kb()
+
+        del jobs
+        gc.collect()
+        tracemalloc.start()
+        jobs = parse(markup)
+        _, py_peak = tracemalloc.get_traced_memory()
+        py_blocks = len(tracemalloc.take_snapshot().traces)
+        tracemalloc.stop()
+
+    seconds = statistics.median(timings)
+    result.update({
+        'bytes': len(markup.encode('utf-8')),
+        'cards': len(jobs),
+        'seconds': round(seconds, 6),
+        'cards_per_sec': round(len(jobs) / seconds, 1) if seconds else None,
+        'mb_per_sec': round(len(markup) / seconds / 1e6, 2) if seconds else None,
+        'peak_rss_kb': rss_after,
+        'rss_delta_kb': rss_after - rss_before if rss_before is not None else None,
+        'py_peak_kb': round(py_peak / 1024, 1),
+        'py_blocks': py_blocks,
+    })
+    return result
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def _run_isolated(args) -> Dict:
+    case, repeat = args
+    try:
+        return run_case(case, repeat)
+    except Exception as e:
+        logger.error(f"Benchmark case {case} failed: {str(e)}")
+        return dict(case, fixture=os.path.basename(case['fixture']), error=str(e))
+
+
+def run_benchmarks(cases: List[Dict], repeat: int = DEFAULT_REPEAT, isolate: bool = True,
+                   progress: Callable = None) -> List[Dict]:
+    """
+    Прогон кейсов. isolate=True - каждый кейс в отдельном процессе, чтобы
+    пиковый RSS одного кейса не маскировал следующий.
+    """
+    results = []
+    if isolate:
+        with multiprocessing.Pool(1, initializer=_init_worker, maxtasksperchild=1) as pool:
+            for result in pool.imap(_run_isolated, [(case, repeat) for case in cases]):
+                results.append(result)
+                if progress:
+                    progress(result)
+    else:
+        for case in cases:
+            result = _run_isolated((case, repeat))
+            results.append(result)
+            if progress:
+                progress(result)
+    return results
+
+
+def result_key(result: Dict) -> tuple:
+    return result['source'], result['fixture'], result['scale'], result['backend']
+
+
+def build_report(results: List[Dict], skipped: List[Dict], repeat: int) -> Dict:
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'backends': available_backends(),
+        'repeat': repeat,
+        'results': results,
+        'skipped': skipped,
+    }
+
+
+def compare_reports(report: Dict, baseline: Dict, threshold: float = 0.15) -> List[Dict]:
+    """
+    Сравнение с сохраненным прогоном: изменение скорости (cards/sec) и памяти.
+    regression=True - медленнее больше чем на threshold или пиковый RSS вырос
+    больше чем на threshold (и хотя бы на 1 МБ - меньше это шум).
+    """
+    baseline_results = {result_key(result): result for result in baseline.get('results', []) if 'error' not in result}
+    comparison = []
+    for result in report['results']:
+        previous = baseline_results.get(result_key(result))
+        if previous is None or 'error' in result or not previous.get('cards_per_sec'):
+            continue
+        speed_change = result['cards_per_sec'] / previous['cards_per_sec'] - 1
+        memory_change = None
+        memory_regression = False
+        if result.get('rss_delta_kb') is not None and previous.get('rss_delta_kb') is not None:
+            grown_kb = result['rss_delta_kb'] - previous['rss_delta_kb']
+            memory_change = grown_kb / max(previous['rss_delta_kb'], 1)
+            memory_regression = grown_kb > 1024 and memory_change > threshold
+        comparison.append({
+            'key': result_key(result),
+            'cards_per_sec': result['cards_per_sec'],
+            'baseline_cards_per_sec': previous['cards_per_sec'],
+            'speed_change': round(speed_change, 3),
+            'memory_change': round(memory_change, 3) if memory_change is not None else None,
+            'regression': speed_change < -threshold or memory_regression,
+        })
+    return comparison
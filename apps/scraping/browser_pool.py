@@ -0,0 +1,392 @@
+import atexit
+import logging
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Dict, List
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_CONFIG = {
+    'size': 2,  # сколько браузеров держать на процесс
+    'page_budget': 50,  # после стольких загрузок страниц браузер пересоздается
+    'acquire_timeout': 120,  # сколько ждать свободный браузер
+    'headless': True,
+    'page_load_timeout': 30,
+}
+
+# Скрываем navigator.webdriver для каждого нового документа, а не только текущего
+HIDE_WEBDRIVER_JS = "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+
+
+class BrowserPoolTimeout(Exception):
+    """No browser became free within acquire_timeout"""
+
+
+@lru_cache(maxsize=None)
+def chromedriver_path(driver_version: str = None) -> str:
+    """ChromeDriverManager().install() один раз на процесс (а не на каждый скрапер)"""
+    from webdriver_manager.chrome import ChromeDriverManager
+    return ChromeDriverManager(driver_version=driver_version).install()
+
+
+def resource_profile(config: Dict) -> Dict:
+    """Профиль блокировки ресурсов пула (settings.BROWSER_RESOURCE_PROFILES)"""
+    name = config.get('resource_profile')
+    if not name:
+        return {}
+    return getattr(settings, 'BROWSER_RESOURCE_PROFILES', {}).get(name, {})
+
+
+def apply_launch_blocking(options, profile: Dict):
+    """Флаги запуска: без картинок, резолвятся только разрешенные хосты"""
+    if profile.get('block_images'):
+        options.add_argument('--blink-settings=imagesEnabled=false')
+        options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+            'profile.default_content_setting_values.notifications': 2,
+        })
+    allowed_hosts = profile.get('allowed_hosts')
+    if allowed_hosts:
+        # Все остальные хосты (аналитика, реклама, виджеты) просто не резолвятся
+        rules = ['MAP * ~NOTFOUND', 'EXCLUDE localhost', 'EXCLUDE 127.0.0.1']
+        rules += [f'EXCLUDE {host}' for host in allowed_hosts]
+        options.add_argument(f"--host-resolver-rules={', '.join(rules)}")
+
+
+def apply_request_blocking(driver, profile: Dict):
+    """Блокировка запросов по шаблонам URL через CDP (шрифты, картинки, трекеры)"""
+    patterns = profile.get('blocked_urls')
+    if not patterns:
+        return
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': list(patterns)})
+    except Exception as e:
+        logger.warning(f"Could not enable request blocking: {e}")
+
+
+def create_chrome_driver(config: Dict):
+    """Обычный Selenium Chrome (cv.ee)"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+
+    chrome_options = Options()
+    if config.get('headless', True):
+        chrome_options.add_argument('--headless=new')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_argument('--window-size=1920,1080')
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    profile = resource_profile(config)
+    apply_launch_blocking(chrome_options, profile)
+
+    service = Service(chromedriver_path(config.get('driver_version')))
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+    driver.set_page_load_timeout(config.get('page_load_timeout', 30))
+    try:
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': HIDE_WEBDRIVER_JS})
+    except Exception as e:
+        logger.warning(f"Could not install navigator.webdriver override: {e}")
+    apply_request_blocking(driver, profile)
+    return driver
+
+
+def create_undetected_driver(config: Dict):
+    """undetected_chromedriver (CV Keskus)"""
+    import undetected_chromedriver as uc
+
+    options = uc.ChromeOptions()
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--lang=en")  # Force English language
+    options.add_argument("--disable-web-security")
+    options.add_argument("--allow-running-insecure-content")
+    options.add_argument("--disable-features=VizDisplayCompositor")
+    profile = resource_profile(config)
+    apply_launch_blocking(options, profile)
+
+    driver = uc.Chrome(options=options, headless=config.get('headless', True), version_main=None)
+    driver.set_page_load_timeout(config.get('page_load_timeout', 30))
+    apply_request_blocking(driver, profile)
+    return driver
+
+
+DRIVER_FACTORIES = {
+    'chrome': create_chrome_driver,
+    'undetected': create_undetected_driver,
+}
+
+
+def url_origin(url: str) -> str:
+    """Origin (scheme://host[:port]) http(s)-адреса, '' для about:blank, data: и т.п."""
+    parts = urllib.parse.urlsplit(url or '')
+    if parts.scheme not in ('http', 'https') or not parts.netloc:
+        return ''
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class PooledDriver:
+    """
+    Обертка над WebDriver из пула: считает загрузки страниц (get) для
+    page_budget, все остальное проксирует в настоящий драйвер.
+    """
+
+    def __init__(self, driver, pool: 'BrowserPool'):
+        self.driver = driver
+        self.pool = pool
+        self.pages = 0
+        self.leases = 0
+        self.created_at = time.monotonic()
+        # Сайты, открытые за аренду: их storage чистится при возврате в пул
+        self.origins = set()
+
+    def get(self, url: str):
+        self.pages += 1
+        self.origins.add(url_origin(url))
+        return self.driver.get(url)
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+    def __repr__(self):
+        return f"<PooledDriver {self.pool.kind} pages={self.pages} leases={self.leases}>"
+
+
+class BrowserPool:
+    """
+    Пул "теплых" браузеров одного вида (chrome / undetected).
+
+    Скрапер берет браузер через acquire()/release() или lease(), между
+    арендами у браузера чистятся cookies/storage и открывается about:blank.
+    Браузер, исчерпавший page_budget или сломавшийся при сбросе, закрывается
+    и при следующей аренде создается новый. Одновременно существует не
+    больше size браузеров, остальные ждут освобождения.
+    """
+
+    def __init__(self, kind: str, config: Dict = None, factory: Callable = None):
+        self.kind = kind
+        self.config = dict(DEFAULT_POOL_CONFIG)
+        self.config.update(config or {})
+        self.size = self.config['size']
+        self.page_budget = self.config['page_budget']
+        self.factory = factory or DRIVER_FACTORIES[kind]
+        self._idle: List[PooledDriver] = []
+        self._all: List[PooledDriver] = []
+        self._starting = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.stats = {'created': 0, 'recycled': 0, 'discarded': 0, 'leases': 0, 'reused': 0}
+
+    def _create(self) -> PooledDriver:
+        started = time.monotonic()
+        driver = PooledDriver(self.factory(self.config), self)
+        logger.info(f"Started {self.kind} browser in {time.monotonic() - started:.1f}s")
+        return driver
+
+    def _is_alive(self, driver: PooledDriver) -> bool:
+        try:
+            driver.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def acquire(self, timeout: float = None) -> PooledDriver:
+        """Взять браузер из пула (создается, если свободных нет и лимит не исчерпан)"""
+        timeout = self.config['acquire_timeout'] if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError(f"{self.kind} browser pool is shut down")
+                    if self._idle:
+                        driver = self._idle.pop()
+                        create = False
+                        break
+                    if len(self._all) + self._starting < self.size:
+                        self._starting += 1
+                        create = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise BrowserPoolTimeout(f"No free {self.kind} browser after {timeout}s")
+                    self._cond.wait(remaining)
+
+            if create:
+                try:
+                    driver = self._create()
+                except Exception:
+                    with self._cond:
+                        self._starting -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._starting -= 1
+                    self._all.append(driver)
+                    self.stats['created'] += 1
+            elif not self._is_alive(driver):
+                logger.warning(f"Dropping dead {self.kind} browser from the pool")
+                self._discard(driver)
+                continue
+
+            with self._cond:
+                if not create:
+                    self.stats['reused'] += 1
+                driver.leases += 1
+                self.stats['leases'] += 1
+            return driver
+
+    def release(self, driver: PooledDriver, discard: bool = False):
+        """Вернуть браузер в пул (или закрыть - если сломан/исчерпал бюджет)"""
+        if driver is None:
+            return
+        if discard or self._closed:
+            self._discard(driver)
+            return
+        if driver.pages >= self.page_budget:
+            logger.info(f"Recycling {self.kind} browser after {driver.pages} pages")
+            with self._cond:
+                self.stats['recycled'] += 1
+            self._discard(driver, count=False)
+            return
+        try:
+            self._reset(driver)
+        except Exception as e:
+            logger.warning(f"Failed to reset {self.kind} browser, discarding it: {e}")
+            self._discard(driver)
+            return
+        with self._cond:
+            self._idle.append(driver)
+            self._cond.notify()
+
+    @contextmanager
+    def lease(self, timeout: float = None):
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        finally:
+            # Сброс при возврате сам отбракует браузер, если тот сломался
+            self.release(driver)
+
+    def _reset(self, driver: PooledDriver):
+        """Очистка состояния между арендами"""
+        from selenium.common.exceptions import WebDriverException
+
+        raw = driver.driver
+        origins = set(driver.origins)
+        handles = raw.window_handles
+        for handle in handles[1:]:
+            raw.switch_to.window(handle)
+            origins.add(url_origin(raw.current_url))
+            raw.close()
+        raw.switch_to.window(handles[0])
+        # Сайт мог смениться переходами/редиректами без driver.get()
+        origins.add(url_origin(raw.current_url))
+        try:
+            raw.execute_script('window.localStorage.clear(); window.sessionStorage.clear();')
+        except Exception:
+            pass  # about:blank и страницы без доступа к storage
+        try:
+            raw.execute_cdp_cmd('Network.clearBrowserCookies', {})
+            # Шаблонов origin CDP не понимает ('*' - пустой opaque origin), поэтому по одному
+            for origin in sorted(origin for origin in origins if origin):
+                raw.execute_cdp_cmd('Storage.clearDataForOrigin', {'origin': origin, 'storageTypes': 'all'})
+        except (AttributeError, WebDriverException) as e:
+            # Драйвер без CDP - cookies текущего сайта через WebDriver
+            logger.debug(f"CDP reset of {self.kind} browser failed: {e}")
+            raw.delete_all_cookies()
+        driver.origins.clear()
+        raw.get('about:blank')
+
+    def _discard(self, driver: PooledDriver, count: bool = True):
+        with self._cond:
+            if driver in self._all:
+                self._all.remove(driver)
+            if driver in self._idle:
+                self._idle.remove(driver)
+            if count:
+                self.stats['discarded'] += 1
+            self._cond.notify()
+        try:
+            driver.driver.quit()
+        except Exception as e:
+            logger.debug(f"Error quitting {self.kind} browser: {e}")
+
+    def warm_up(self, count: int = None) -> int:
+        """Заранее запустить браузеры, чтобы первая аренда не ждала холодный старт"""
+        drivers = []
+        try:
+            for _ in range(min(count or self.size, self.size)):
+                drivers.append(self.acquire(timeout=0))
+        except BrowserPoolTimeout:
+            pass  # все браузеры уже заняты
+        except Exception as e:
+            logger.error(f"Error warming up {self.kind} browser pool: {e}")
+        for driver in drivers:
+            self.release(driver)
+        return len(drivers)
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            drivers = list(self._all)
+            self._cond.notify_all()
+        for driver in drivers:
+            self._discard(driver, count=False)
+        if drivers:
+            logger.info(f"Closed {len(drivers)} {self.kind} browsers")
+
+
+_pools: Dict[str, BrowserPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_browser_pool(kind: str = 'chrome') -> BrowserPool:
+    """Пул браузеров процесса; настройки берутся из settings.BROWSER_POOL[kind]"""
+    from .cassette import active_cassette
+
+    cassette = active_cassette()
+    if cassette is not None:
+        # Запись/воспроизведение: отдельный пул кассеты, пул процесса не трогаем
+        return cassette.browser_pool(kind)
+    with _pools_lock:
+        if kind not in _pools:
+            config = getattr(settings, 'BROWSER_POOL', {}).get(kind, {})
+            _pools[kind] = BrowserPool(kind, config)
+        return _pools[kind]
+
+
+def warm_browser_pools(background: bool = False):
+    """
+    Прогрев пулов с prewarm=True (вызывается при старте worker-процесса).
+    background=True - в отдельном потоке, чтобы не задерживать инициализацию процесса.
+    """
+    def warm():
+        for kind, config in getattr(settings, 'BROWSER_POOL', {}).items():
+            if config.get('prewarm'):
+                started = get_browser_pool(kind).warm_up()
+                logger.info(f"Warmed up {started} {kind} browsers")
+
+    if background:
+        threading.Thread(target=warm, name='browser-pool-warmup', daemon=True).start()
+    else:
+        warm()
+
+
+@atexit.register
+def shutdown_browser_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
@@ -0,0 +1,281 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+RECORD = 'record'
+REPLAY = 'replay'
+
+
+class CassetteMiss(Exception):
+    """The cassette has no recorded response for this request"""
+
+
+class Cassette:
+    """
+    Запись и воспроизведение всех ответов одного запуска скраперов.
+
+    В режиме record каждый ответ AsyncFetcher, каждый ответ requests (через
+    HTTPAdapter.send) и каждый page_source браузеров из пула сохраняется в
+    каталог кассеты: interactions.jsonl (метаданные по порядку) и bodies/
+    (тела по sha256). В режиме replay те же интерфейсы отдают записанное -
+    без сети, без Chrome и без лимитов хостов. Повторные запросы одного URL
+    получают записи по порядку, после последней - снова последнюю.
+    """
+
+    def __init__(self, path: str, mode: str):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = str(path)
+        self.mode = mode
+        self.index_path = os.path.join(self.path, 'interactions.jsonl')
+        self._lock = threading.Lock()
+        self._pools = {}
+        self._recorded = defaultdict(list)
+        self._positions = defaultdict(int)
+        self.stats = {'recorded': 0, 'replayed': 0, 'missed': 0}
+        if mode == RECORD:
+            os.makedirs(os.path.join(self.path, 'bodies'), exist_ok=True)
+            # Новая запись перезаписывает кассету целиком
+            open(self.index_path, 'w', encoding='utf-8').close()
+        else:
+            if not os.path.exists(self.index_path):
+                raise FileNotFoundError(f"No cassette at {self.path}")
+            with open(self.index_path, encoding='utf-8') as f:
+                for line in f:
+                    interaction = json.loads(line)
+                    self._recorded[(interaction['kind'], interaction['url'])].append(interaction)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    def record(self, kind: str, url: str, status: int = None, headers: Dict = None, content: bytes = b'',
+               encoding: str = None, error: str = None):
+        digest = hashlib.sha256(content).hexdigest()
+        body_path = os.path.join(self.path, 'bodies', digest)
+        interaction = {
+            'kind': kind, 'url': url, 'status': status, 'headers': dict(headers or {}),
+            'encoding': encoding, 'body': digest, 'error': error,
+        }
+        with self._lock:
+            if not os.path.exists(body_path):
+                with open(body_path, 'wb') as f:
+                    f.write(content)
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(interaction, ensure_ascii=False) + '\n')
+            self.stats['recorded'] += 1
+
+    def replay(self, kind: str, url: str) -> Dict:
+        """Следующий записанный ответ для (kind, url): {'status', 'headers', 'encoding', 'content', 'error'}"""
+        key = (kind, url)
+        with self._lock:
+            recorded = self._recorded.get(key)
+            if not recorded:
+                self.stats['missed'] += 1
+                raise CassetteMiss(f"{kind} {url} is not in cassette {self.path}")
+            position = self._positions[key]
+            self._positions[key] = position + 1
+            self.stats['replayed'] += 1
+        interaction = dict(recorded[min(position, len(recorded) - 1)])
+        with open(os.path.join(self.path, 'bodies', interaction.pop('body')), 'rb') as f:
+            interaction['content'] = f.read()
+        return interaction
+
+    def browser_pool(self, kind: str):
+        """Пул браузеров на время кассеты: запись оборачивает настоящий браузер, воспроизведение - без Chrome"""
+        from django.conf import settings
+        from .browser_pool import DRIVER_FACTORIES, BrowserPool
+
+        with self._lock:
+            if kind not in self._pools:
+                if self.replaying:
+                    factory = lambda config: ReplayDriver(self)
+                else:
+                    factory = lambda config: RecordingDriver(DRIVER_FACTORIES[kind](config), self)
+                config = getattr(settings, 'BROWSER_POOL', {}).get(kind, {})
+                self._pools[kind] = BrowserPool(kind, config, factory=factory)
+            return self._pools[kind]
+
+    def close(self):
+        for pool in self._pools.values():
+            pool.shutdown()
+        self._pools = {}
+        logger.info(
+            f"Cassette {self.path} ({self.mode}): {self.stats['recorded']} recorded, "
+            f"{self.stats['replayed']} replayed, {self.stats['missed']} missed"
+        )
+
+
+class RecordingDriver:
+    """WebDriver, который записывает каждый прочитанный page_source (ключ - URL из get())"""
+
+    def __init__(self, driver, cassette: Cassette):
+        self.driver = driver
+        self.cassette = cassette
+        self.requested_url = None
+
+    def get(self, url: str):
+        self.requested_url = url
+        return self.driver.get(url)
+
+    @property
+    def page_source(self) -> str:
+        source = self.driver.page_source
+        self.cassette.record(
+            'selenium', self.requested_url or self.driver.current_url, status=200,
+            content=source.encode('utf-8'), encoding='utf-8'
+        )
+        return source
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+
+class _SwitchTo:
+    def window(self, handle):
+        pass
+
+
+class ReplayDriver:
+    """
+    Браузер без браузера: get() выбирает записанную страницу, page_source
+    отдает ее HTML. Скрипты ожидания из readiness.py отвечают по записанному
+    HTML, клики и элементы не воспроизводятся (find_element -> NoSuchElement).
+    """
+
+    window_handles = ['replay']
+    switch_to = _SwitchTo()
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+        self.current_url = 'about:blank'
+        self._source = '<html><head></head><body></body></html>'
+
+    def get(self, url: str):
+        from selenium.common.exceptions import WebDriverException
+
+        self.current_url = url
+        if url == 'about:blank':
+            self._source = '<html><head></head><body></body></html>'
+            return
+        try:
+            interaction = self.cassette.replay('selenium', url)
+        except CassetteMiss as e:
+            raise WebDriverException(str(e))
+        self._source = interaction['content'].decode(interaction['encoding'] or 'utf-8', errors='replace')
+
+    @property
+    def page_source(self) -> str:
+        return self._source
+
+    @property
+    def title(self) -> str:
+        from .html_parser import parse_html
+
+        title = parse_html(self._source).find('title')
+        return title.get_text(strip=True) if title else ''
+
+    def execute_script(self, script: str, *args):
+        from .readiness import COUNT_JS, NEXT_DATA_JS, SCROLL_DOWN_JS
+        from .html_parser import parse_html
+
+        if script == 'return document.readyState':
+            return 'complete'
+        if script == NEXT_DATA_JS:
+            return 'id="__NEXT_DATA__"' in self._source
+        if script == COUNT_JS:
+            return len(parse_html(self._source).select(args[0]))
+        if script == SCROLL_DOWN_JS:
+            return len(self._source)
+        return None
+
+    def find_element(self, by=None, value=None):
+        from selenium.common.exceptions import NoSuchElementException
+        raise NoSuchElementException(f"Elements are not replayed ({value})")
+
+    def find_elements(self, by=None, value=None):
+        return []
+
+    def execute_cdp_cmd(self, cmd: str, params: Dict = None):
+        return {}
+
+    def set_page_load_timeout(self, timeout):
+        pass
+
+    def delete_all_cookies(self):
+        pass
+
+    def close(self):
+        pass
+
+    def quit(self):
+        pass
+
+
+_active: Optional[Cassette] = None
+_original_send = HTTPAdapter.send
+
+
+def active_cassette() -> Optional[Cassette]:
+    return _active
+
+
+def _cassette_send(adapter, request, **kwargs):
+    """HTTPAdapter.send на время кассеты: все requests-сессии пишутся / воспроизводятся"""
+    cassette = _active
+    if cassette is None:
+        return _original_send(adapter, request, **kwargs)
+    if cassette.replaying:
+        try:
+            interaction = cassette.replay('http', request.url)
+        except CassetteMiss as e:
+            raise requests.ConnectionError(str(e), request=request)
+        if interaction['error']:
+            raise requests.ConnectionError(interaction['error'], request=request)
+        response = requests.Response()
+        response.status_code = interaction['status']
+        response.headers = CaseInsensitiveDict(interaction['headers'])
+        response._content = interaction['content']
+        response.encoding = interaction['encoding']
+        response.url = request.url
+        response.request = request
+        return response
+    try:
+        response = _original_send(adapter, request, **kwargs)
+    except requests.RequestException as e:
+        cassette.record('http', request.url, error=f"{type(e).__name__}: {e}")
+        raise
+    cassette.record('http', request.url, response.status_code, response.headers, response.content, response.encoding)
+    return response
+
+
+@contextmanager
+def use_cassette(path: str, mode: str):
+    """
+    Записать (mode='record') или воспроизвести (mode='replay') все загрузки
+    страниц внутри блока: AsyncFetcher, requests и браузеры из get_browser_pool().
+    HTTP-кэш на время кассеты не используется, при воспроизведении нет и архива.
+    """
+    global _active
+    if _active is not None:
+        raise RuntimeError(f"Cassette {_active.path} is already active")
+    cassette = Cassette(path, mode)
+    _active = cassette
+    HTTPAdapter.send = _cassette_send
+    try:
+        yield cassette
+    finally:
+        HTTPAdapter.send = _original_send
+        _active = None
+        cassette.close()
@@ -0,0 +1,112 @@
+import logging
+from datetime import timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .ingestion import _clean_text, _to_datetime
+from .job_features import refresh_job_features
+from .models import Job
+from .scoring import enqueue_scoring
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DETAILS_CONFIG = {'refresh_days': 7, 'batch_size': 100}
+
+
+class LinkedInDetailsEnricher:
+    """
+    Догрузка страниц вакансий LinkedIn после скрапинга поиска.
+
+    В поиске LinkedIn отдает только карточку вакансии, поэтому для новых
+    (или давно не обновлявшихся) вакансий страницы загружаются параллельно
+    через AsyncFetcher - с лимитами FETCHER_HOST_LIMITS на хост, общими с
+    одновременно идущей загрузкой страниц поиска - и описание/тип
+    занятости/дата публикации записываются одним bulk_update на пачку.
+    content_hash не меняется: он остается отпечатком карточки из поиска,
+    поэтому повторный скрапинг той же карточки не затирает детали.
+    Вакансии, загруженные позже refresh_days назад, пропускаются.
+    """
+
+    UPDATE_FIELDS = ['description', 'employment_type', 'posted_date', 'details_fetched_at']
+
+    def __init__(self, scraper=None, refresh_days: int = None, batch_size: int = None):
+        if scraper is None:
+            from .scrapers.linkedin_scraper import LinkedInScraper
+            scraper = LinkedInScraper()
+        config = dict(DEFAULT_DETAILS_CONFIG)
+        config.update(getattr(settings, 'LINKEDIN_DETAILS_CONFIG', {}))
+        self.scraper = scraper
+        self.refresh_days = refresh_days if refresh_days is not None else config['refresh_days']
+        self.batch_size = batch_size or config['batch_size']
+
+    def pending_jobs(self, job_urls: Iterable[str] = None):
+        """Активные вакансии LinkedIn без деталей или с устаревшими деталями"""
+        cutoff = timezone.now() - timedelta(days=self.refresh_days)
+        queryset = Job.objects.filter(source_site='linkedin', is_active=True).filter(
+            Q(details_fetched_at__isnull=True) | Q(details_fetched_at__lt=cutoff)
+        )
+        if job_urls is not None:
+            queryset = queryset.filter(source_url__in=job_urls)
+        return queryset
+
+    def enrich(self, job_urls: Iterable[str] = None) -> Dict[str, int]:
+        """
+        Load details for the given job URLs (all pending LinkedIn jobs if None).
+        :return: counters {'enriched', 'skipped', 'failed'}
+        """
+        stats = {'enriched': 0, 'skipped': 0, 'failed': 0}
+        if job_urls is not None:
+            job_urls = list(dict.fromkeys(url for url in job_urls if url))
+
+        pending_ids = list(self.pending_jobs(job_urls).order_by('id').values_list('id', flat=True))
+        if job_urls is not None:
+            stats['skipped'] = len(job_urls) - len(pending_ids)
+
+        for start in range(0, len(pending_ids), self.batch_size):
+            jobs = list(
+                Job.objects.filter(id__in=pending_ids[start:start + self.batch_size])
+                .only('id', 'source_url', 'description', 'employment_type', 'posted_date')
+            )
+            try:
+                enriched, failed = self._enrich_batch(jobs)
+                stats['enriched'] += enriched
+                stats['failed'] += failed
+            except Exception as e:
+                logger.error(f"Error enriching batch of {len(jobs)} LinkedIn jobs: {str(e)}")
+                stats['failed'] += len(jobs)
+
+        logger.info(
+            f"LinkedIn job details: {stats['enriched']} enriched, "
+            f"{stats['skipped']} skipped, {stats['failed']} failed"
+        )
+        return stats
+
+    def _enrich_batch(self, jobs: List[Job]) -> Tuple[int, int]:
+        details = self.scraper.fetch_job_details([job.source_url for job in jobs])
+        fetched_at = timezone.now()
+        max_employment_length = Job._meta.get_field('employment_type').max_length
+
+        updated = []
+        for job in jobs:
+            job_details = details.get(job.source_url)
+            if job_details is None:
+                continue
+            if job_details.get('description'):
+                job.description = job_details['description'].strip()
+            if job_details.get('employment_type'):
+                job.employment_type = _clean_text(job_details['employment_type'], max_employment_length)
+            # Дата со страницы вакансии относительная ("2 weeks ago") - точную дату из карточки не затираем
+            if job.posted_date is None:
+                job.posted_date = _to_datetime(job_details.get('posted_date'))
+            job.details_fetched_at = fetched_at
+            updated.append(job)
+
+        if updated:
+            Job.objects.bulk_update(updated, self.UPDATE_FIELDS)
+            # bulk_update не трогает updated_at - проверяем хэш текстов напрямую
+            refresh_job_features(Job.objects.filter(id__in=[job.id for job in updated]), rebuild=True)
+            enqueue_scoring([job.id for job in updated])
+        return len(updated), len(jobs) - len(updated)
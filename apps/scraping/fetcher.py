@@ -0,0 +1,412 @@
+import asyncio
+import collections
+import logging
+import queue
+import random
+import threading
+import time
+import urllib.parse
+from typing import Dict, Iterator, List, Optional
+
+import aiohttp
+from django.conf import settings
+
+from .cassette import CassetteMiss, active_cassette
+from .http_cache import get_http_cache
+
+logger = logging.getLogger(__name__)
+
+# Статусы, при которых имеет смысл повторить запрос
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+DEFAULT_HOST_LIMIT = {'concurrency': 4, 'rate': 2.0, 'burst': 4}
+
+
+def build_url(base_url: str, params: Dict = None) -> str:
+    """Собираем URL с query-параметрами (списки разворачиваются в повторяющиеся ключи)"""
+    if not params:
+        return base_url
+    return f"{base_url}?{urllib.parse.urlencode(params, doseq=True)}"
+
+
+class TokenBucket:
+    """
+    Token bucket: `rate` requests per second on average, bursts up to `burst`.
+
+    Состояние защищено threading.Lock, поэтому один bucket можно делить
+    между event loop'ами разных потоков: каждый вызов резервирует токен
+    (баланс может уйти в минус) и ждет своей очереди в своем цикле.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Занять токен; вернуть, сколько секунд ждать до него"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class HostSemaphore:
+    """
+    Ограничение одновременных запросов к хосту, общее для всех потоков.
+
+    asyncio.Semaphore привязан к своему event loop, а AsyncFetcher работает
+    и в цикле потока iter_fetched(), и в asyncio.run() fetch_all(). Здесь
+    счетчик защищен threading.Lock, а ожидающие - futures своих циклов,
+    которые будятся через call_soon_threadsafe.
+    """
+
+    def __init__(self, value: int):
+        self._value = max(1, value)
+        self._waiters = collections.deque()
+        self._lock = threading.Lock()
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._value > 0 and not self._waiters:
+                self._value -= 1
+                return
+            waiter = loop.create_future()
+            self._waiters.append((loop, waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # место уже получено, но задачу отменили
+            else:
+                with self._lock:
+                    try:
+                        self._waiters.remove((loop, waiter))
+                    except ValueError:
+                        pass  # место уже передано - _grant вернет его, увидев отмену
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                loop, waiter = self._waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(self._grant, waiter)
+                    return
+                except RuntimeError:
+                    continue  # цикл ожидающего уже закрыт
+            self._value += 1
+
+    def _grant(self, waiter: asyncio.Future):
+        if waiter.done():
+            self.release()
+        else:
+            waiter.set_result(None)
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+
+# Лимиты хостов общие для процесса: все AsyncFetcher (поиск, детали
+# вакансий, параллельные fetch_all) делят одну квоту на хост
+_host_controls = {}
+_host_controls_lock = threading.Lock()
+
+
+def host_controls(host: str, limit: Dict):
+    """Семафор и token bucket хоста (один на хост и набор лимитов в процессе)"""
+    key = (host, limit['concurrency'], limit['rate'], limit.get('burst', 1))
+    with _host_controls_lock:
+        if key not in _host_controls:
+            _host_controls[key] = (HostSemaphore(limit['concurrency']), TokenBucket(limit['rate'], limit.get('burst', 1)))
+        return _host_controls[key]
+
+
+class FetchResult:
+    """Результат загрузки одной страницы"""
+
+    def __init__(self, url: str, status: int = None, content: bytes = b'', headers: Dict = None,
+                 encoding: str = None, error: str = None, elapsed: float = 0.0, attempts: int = 0,
+                 from_cache: bool = False):
+        self.url = url
+        self.status = status
+        self.content = content
+        self.headers = headers or {}
+        self.encoding = encoding
+        self.error = error
+        self.elapsed = elapsed
+        self.attempts = attempts
+        self.from_cache = from_cache  # тело взято из HTTP-кэша (свежая запись или ответ 304)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.status is not None and 200 <= self.status < 300
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def __repr__(self):
+        return f"<FetchResult {self.status} {self.url}>"
+
+
+class AsyncFetcher:
+    """
+    Shared asyncio HTTP fetch engine for the requests-based scrapers.
+
+    All requests of one run go through a single aiohttp connection pool.
+    Every host gets its own concurrency limit and token bucket (see
+    FETCHER_HOST_LIMITS), shared by all fetchers and threads of the
+    process, so concurrent runs never exceed the host quota. Failed
+    requests are retried with jittered exponential backoff. Scrapers call
+    the synchronous fetch_all() / iter_fetched() wrappers, so the rest of
+    the code stays blocking.
+    """
+
+    def __init__(self, headers: Dict = None, host_limits: Dict = None, max_connections: int = None,
+                 timeout: float = None, retries: int = None, backoff_base: float = None,
+                 backoff_max: float = None):
+        config = getattr(settings, 'FETCHER_CONFIG', {})
+        # Accept-Encoding выставляет сам aiohttp - только те кодировки, что он умеет распаковать
+        self.headers = {k: v for k, v in (headers or {}).items() if k.lower() != 'accept-encoding'}
+        self.host_limits = dict(getattr(settings, 'FETCHER_HOST_LIMITS', {}))
+        self.host_limits.update(host_limits or {})
+        self.default_limit = getattr(settings, 'FETCHER_DEFAULT_HOST_LIMIT', DEFAULT_HOST_LIMIT)
+        self.max_connections = max_connections or config.get('max_connections', 20)
+        self.timeout = timeout or config.get('timeout', 30)
+        self.retries = retries if retries is not None else config.get('retries', 3)
+        self.backoff_base = backoff_base or config.get('backoff_base', 1.0)
+        self.backoff_max = backoff_max or config.get('backoff_max', 30.0)
+
+    def _host_limit(self, host: str) -> Dict:
+        limit = dict(self.default_limit)
+        limit.update(self.host_limits.get(host, {}))
+        return limit
+
+    def _host_controls(self, url: str):
+        host = urllib.parse.urlsplit(url).netloc
+        return host_controls(host, self._host_limit(host))
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after and retry_after.isdigit():
+            return min(self.backoff_max, float(retry_after))
+        # "Full jitter": случайная задержка в пределах экспоненциального окна
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _make_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300)
+        return aiohttp.ClientSession(
+            connector=connector,
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+
+    async def fetch(self, session: aiohttp.ClientSession, url: str, archive: str = None,
+                    cache: str = None) -> FetchResult:
+        """
+        Fetch one URL respecting the host limits, retrying transient failures.
+        archive - source name to store the response under in the page archive.
+        cache - HTTP cache policy: fresh entries are served without a request,
+        stale ones are revalidated with If-None-Match / If-Modified-Since.
+        """
+        cassette = active_cassette()
+        if cassette is not None and cassette.replaying:
+            return self._replayed_result(cassette, url)
+        # Во время записи кассеты - только настоящие ответы сайта
+        http_cache = get_http_cache() if cache and cassette is None else None
+        entry = await asyncio.to_thread(self._cache_lookup, http_cache, url) if http_cache else None
+        if entry and http_cache.is_fresh(entry):
+            return self._cached_result(url, entry)
+
+        semaphore, bucket = self._host_controls(url)
+        started = time.monotonic()
+        result = FetchResult(url)
+        request_headers = http_cache.conditional_headers(entry) if http_cache else {}
+
+        for attempt in range(self.retries + 1):
+            result.attempts = attempt + 1
+            retry_after = None
+            async with semaphore:
+                await bucket.acquire()
+                try:
+                    async with session.get(url, headers=request_headers) as response:
+                        result.status = response.status
+                        result.headers = dict(response.headers)
+                        result.content = await response.read()
+                        result.encoding = response.get_encoding() if result.content else None
+                        result.error = None
+                        retry_after = response.headers.get('Retry-After')
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    result.status = None
+                    result.error = f"{type(e).__name__}: {e}"
+
+            if result.error is None and result.status not in RETRY_STATUSES:
+                break
+            if attempt < self.retries:
+                delay = self._backoff(attempt, retry_after)
+                logger.warning(
+                    f"Fetch {url} failed ({result.error or result.status}), "
+                    f"retry {attempt + 1}/{self.retries} in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+        if result.status == 304 and entry:
+            # Не изменилась - тело из кэша
+            try:
+                entry = await asyncio.to_thread(http_cache.revalidated, entry, cache, result.headers)
+            except Exception as e:
+                logger.error(f"HTTP cache update failed for {url}: {str(e)}")
+            cached = self._cached_result(url, entry)
+            cached.elapsed, cached.attempts = round(time.monotonic() - started, 3), result.attempts
+            return cached
+        if result.error is None and not result.ok:
+            result.error = f"HTTP {result.status}"
+        result.elapsed = round(time.monotonic() - started, 3)
+        if http_cache and result.status == 200:
+            await asyncio.to_thread(self._cache_store, http_cache, result, cache)
+        if result.error:
+            logger.error(f"Failed to fetch {url}: {result.error}")
+        if cassette is not None:
+            cassette.record('http', url, result.status, result.headers, result.content, result.encoding, result.error)
+        if archive:
+            from .archive import archive_result
+            # Сжатие и запись на диск - вне event loop
+            await asyncio.to_thread(archive_result, result, archive)
+        return result
+
+    @staticmethod
+    def _cache_lookup(http_cache, url: str) -> Optional[Dict]:
+        try:
+            return http_cache.lookup(url)
+        except Exception as e:
+            logger.error(f"HTTP cache lookup failed for {url}: {str(e)}")
+            return None
+
+    @staticmethod
+    def _cache_store(http_cache, result: FetchResult, policy: str):
+        try:
+            http_cache.store(result.url, policy, result.status, result.headers, result.content, result.encoding)
+        except Exception as e:
+            logger.error(f"HTTP cache update failed for {result.url}: {str(e)}")
+
+    @staticmethod
+    def _replayed_result(cassette, url: str) -> FetchResult:
+        try:
+            interaction = cassette.replay('http', url)
+        except CassetteMiss as e:
+            return FetchResult(url, error=str(e))
+        return FetchResult(
+            url, status=interaction['status'], content=interaction['content'], headers=interaction['headers'],
+            encoding=interaction['encoding'], error=interaction['error'],
+        )
+
+    @staticmethod
+    def _cached_result(url: str, entry: Dict) -> FetchResult:
+        return FetchResult(
+            url, status=entry['status'], content=entry['content'], headers=entry['headers'],
+            encoding=entry['encoding'], from_cache=True
+        )
+
+    async def fetch_many(self, urls: List[str], archive: str = None, cache: str = None) -> List[FetchResult]:
+        """Fetch all URLs concurrently, results are returned in input order"""
+        async with self._make_session() as session:
+            return await asyncio.gather(*(self.fetch(session, url, archive, cache) for url in urls))
+
+    def fetch_all(self, urls: List[str], archive: str = None, cache: str = None) -> List[FetchResult]:
+        """Synchronous wrapper around fetch_many()"""
+        if not urls:
+            return []
+        results = asyncio.run(self.fetch_many(list(urls), archive, cache))
+        if cache:
+            cached = [result for result in results if result.from_cache]
+            downloaded = sum(len(result.content) for result in results if not result.from_cache)
+            logger.info(
+                f"Fetched {len(results)} pages ({cache}): {len(cached)} from HTTP cache, "
+                f"{downloaded / 1024:.0f} KB downloaded"
+            )
+        return results
+
+    def iter_fetched(self, urls: List[str], max_pending: int = None, archive: str = None,
+                     cache: str = None) -> Iterator[FetchResult]:
+        """
+        Yield results as soon as each page arrives (completion order).
+        Closing the generator early cancels the requests that are still pending.
+
+        max_pending bounds the pages that are being fetched or wait for the
+        consumer: a new request starts only after the consumer has taken a
+        page, so a slow consumer throttles fetching instead of buffering HTML.
+        """
+        urls = list(urls)
+        if not urls:
+            return
+        results = queue.Queue()
+        stop = threading.Event()
+        done = object()
+        state = {}
+
+        async def fetch_when_free(session, url):
+            if state['slots'] is not None:
+                await state['slots'].acquire()
+            return await self.fetch(session, url, archive, cache)
+
+        async def runner():
+            state['loop'] = asyncio.get_running_loop()
+            state['runner'] = asyncio.current_task()
+            state['slots'] = asyncio.Semaphore(max_pending) if max_pending else None
+            async with self._make_session() as session:
+                tasks = [asyncio.ensure_future(fetch_when_free(session, url)) for url in urls]
+                try:
+                    for next_result in asyncio.as_completed(tasks):
+                        results.put(await next_result)
+                        if stop.is_set():
+                            break
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+
+        def target():
+            try:
+                asyncio.run(runner())
+            except asyncio.CancelledError:
+                pass  # потребитель закрыл генератор
+            except Exception as e:
+                logger.error(f"Fetcher loop failed: {str(e)}")
+            finally:
+                results.put(done)
+
+        thread = threading.Thread(target=target, name='fetcher', daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = results.get()
+                if item is done:
+                    break
+                yield item
+                if max_pending:
+                    # Страницу забрали - освобождаем место для следующего запроса
+                    try:
+                        state['loop'].call_soon_threadsafe(state['slots'].release)
+                    except RuntimeError:
+                        pass  # цикл уже завершился
+        finally:
+            stop.set()
+            if 'runner' in state:
+                # Будим цикл, даже если он ждет свободного места или ответа
+                try:
+                    state['loop'].call_soon_threadsafe(state['runner'].cancel)
+                except RuntimeError:
+                    pass
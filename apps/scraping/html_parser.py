@@ -0,0 +1,659 @@
+import html
+import logging
+import re
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from bs4 import BeautifulSoup
+from django.conf import settings
+
+try:
+    import lxml.html
+    from lxml import etree
+    from cssselect import HTMLTranslator
+except ImportError:  # pragma: no cover - lxml/cssselect не установлены
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # pragma: no cover - selectolax не установлен
+    LexborHTMLParser = None
+
+logger = logging.getLogger(__name__)
+
+# Текст этих тегов не входит в get_text() (как в BeautifulSoup)
+SKIP_TEXT_TAGS = frozenset({'script', 'style', 'template'})
+
+# Порядок выбора, если запрошенный backend не установлен
+FALLBACK_BACKENDS = ('lxml', 'bs4')
+
+# Выбрасываются из карточек при частичном разборе (parse_cards)
+STRIP_CARD_TAGS = frozenset({'script', 'style', 'noscript', 'template', 'nav'})
+
+# Содержимое этих тегов - текст, а не разметка (при поиске карточек пропускается)
+RAW_TEXT_TAGS = frozenset({'script', 'style'})
+
+# Теги, конец которых HTML подразумевает без закрывающего тега (<li>A<li>B</ul>):
+# границы таких карточек сканер не определяет - страница разбирается целиком
+IMPLIED_END_TAGS = frozenset({
+    'li', 'p', 'dt', 'dd', 'option', 'optgroup', 'tr', 'td', 'th',
+    'thead', 'tbody', 'tfoot', 'colgroup', 'caption', 'rt', 'rp',
+})
+
+# Атрибуты открывающего тега: name="..." | name='...' | name=value | name
+ATTR_RE = re.compile(r'''([^\s=/>]+|/)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?''')
+
+Markup = Union[str, bytes]
+# Контейнер карточки вакансии: (тег, атрибуты) в терминах find_all
+CardContainer = Tuple[Optional[str], Dict]
+
+
+def available_backends() -> List[str]:
+    backends = []
+    if LexborHTMLParser is not None:
+        backends.append('selectolax')
+    if lxml is not None:
+        backends.append('lxml')
+    backends.append('bs4')
+    return backends
+
+
+def backend_for(source: str = None) -> str:
+    """Backend источника из settings.HTML_PARSER_BACKENDS (с откатом на установленный)"""
+    config = getattr(settings, 'HTML_PARSER_BACKENDS', {})
+    return _resolve_backend(config.get(source) or config.get('default', 'lxml'))
+
+
+@lru_cache(maxsize=None)
+def _resolve_backend(requested: str) -> str:
+    available = available_backends()
+    if requested in available:
+        return requested
+    fallback = next(name for name in FALLBACK_BACKENDS if name in available)
+    logger.warning(f"HTML parser backend '{requested}' is not installed, using '{fallback}'")
+    return fallback
+
+
+def parse_html(markup: Markup, source: str = None, backend: str = None):
+    """
+    Разбор HTML выбранным backend'ом.
+
+    Для 'lxml'/'selectolax' возвращается HtmlNode с bs4-совместимым API
+    (find/find_all/select/select_one/get_text/get/...), для 'bs4' - обычный
+    BeautifulSoup(markup, 'html.parser'). Код скрапера от backend'а не зависит.
+    """
+    backend = backend or backend_for(source)
+    if backend == 'bs4':
+        return BeautifulSoup(markup, 'html.parser')
+    adapter = ADAPTERS[backend]
+    return HtmlNode(adapter.parse(markup), adapter, is_document=True)
+
+
+def parse_cards(markup: Markup, containers: Sequence[CardContainer], source: str = None,
+                backend: str = None) -> List:
+    """
+    Частичный разбор страницы результатов: строятся только поддеревья карточек.
+
+    containers - объявленные источником контейнеры карточек, например
+    [('article', {'data-component': 'jobad'})]. Возвращаются внешние совпадения
+    в порядке документа (вложенные карточки остаются внутри своих), script/style/
+    nav внутри карточек удаляются. Страница сканируется регулярным выражением,
+    и парсер получает только фрагменты карточек - время и память растут с
+    числом карточек, а не с весом страницы.
+
+    Результат всегда совпадает с полным разбором тем же backend'ом: если
+    границы карточки зависят от правил парсера (подразумеваемый конец <li>,
+    <div/> внутри карточки, незакрытая карточка) или фрагменты разобрались не
+    в столько же элементов, страница разбирается целиком.
+    """
+    containers = [(name, _normalize_attrs(attrs, {})) for name, attrs in containers]
+    backend = backend or backend_for(source)
+    if any(name is None for name, _ in containers):
+        # Без имени тега карточку в разметке не найти - разбираем страницу целиком
+        return _full_parse_cards(markup, containers, backend)
+    text = markup.decode('utf-8', errors='replace') if isinstance(markup, bytes) else markup
+    try:
+        fragments = list(_card_fragments(text, containers))
+    except AmbiguousMarkup as e:
+        logger.debug(f"Full parse instead of card fragments: {e}")
+        return _full_parse_cards(markup, containers, backend)
+    if not fragments:
+        return []
+    # Все карточки одним вызовом парсера
+    if backend == 'bs4':
+        elements = BeautifulSoup(''.join(fragments), 'html.parser').find_all(True, recursive=False)
+    else:
+        elements = ADAPTERS[backend].parse_fragments(''.join(fragments))
+    if len(elements) != len(fragments):
+        logger.debug(f"{len(fragments)} card fragments parsed into {len(elements)} elements, full parse")
+        return _full_parse_cards(markup, containers, backend)
+    return _strip_cards(elements, backend)
+
+
+class AmbiguousMarkup(Exception):
+    """Границы карточки в разметке зависят от правил конкретного парсера"""
+
+
+def _full_parse_cards(markup: Markup, containers: Sequence[CardContainer], backend: str) -> List:
+    """Внешние карточки полного разбора страницы"""
+    if backend == 'bs4':
+        cards = _bs4_document_cards(BeautifulSoup(markup, 'html.parser'), containers, [])
+    else:
+        adapter = ADAPTERS[backend]
+        cards = _document_cards(adapter, adapter.parse(markup), containers, [])
+    return _strip_cards(cards, backend)
+
+
+def _strip_cards(elements: List, backend: str) -> List:
+    """Убрать script/style/nav из карточек; для lxml/selectolax - обернуть в HtmlNode"""
+    if backend == 'bs4':
+        for card in elements:
+            for tag in card.find_all(list(STRIP_CARD_TAGS)):
+                tag.decompose()
+        return elements
+    adapter = ADAPTERS[backend]
+    for el in elements:
+        adapter.strip(el, STRIP_CARD_TAGS)
+    return [HtmlNode(el, adapter) for el in elements]
+
+
+def _is_container(tag: str, attrs, containers: Sequence[CardContainer]) -> bool:
+    for name, container_attrs in containers:
+        if not _match_name(name, tag):
+            continue
+        if all(_match_value(matcher, attrs.get(key), multi_valued=(key == 'class'))
+               for key, matcher in container_attrs.items()):
+            return True
+    return False
+
+
+@lru_cache(maxsize=64)
+def _tag_token_re(names: Tuple[str, ...]):
+    """Комментарии и теги контейнеров/script/style (значения атрибутов могут содержать '>')"""
+    alternatives = '|'.join(re.escape(name) for name in sorted(set(names) | RAW_TEXT_TAGS))
+    return re.compile(
+        rf'<!--.*?-->|<(/?)({alternatives})\b((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>',
+        re.IGNORECASE | re.DOTALL,
+    )
+
+
+@lru_cache(maxsize=8)
+def _raw_text_end_re(tag: str):
+    return re.compile(rf'</{tag}\s*>', re.IGNORECASE)
+
+
+def _skip_raw_text(markup: str, tag: str, position: int) -> int:
+    """Содержимое script/style - текст, теги внутри него не считаются"""
+    match = _raw_text_end_re(tag).search(markup, position)
+    return match.end() if match else len(markup)
+
+
+def _card_fragments(markup: str, containers: Sequence[CardContainer], strict: bool = True) -> Iterator[str]:
+    """
+    HTML внешних карточек: открывающий тег контейнера .. парный закрывающий.
+    strict - AmbiguousMarkup, если границы карточки зависят от парсера
+    (иначе считаются только явные закрывающие теги - для синтетических страниц бенчмарка).
+    """
+    names = {name.lower() for name, _ in containers}
+    token_re = _tag_token_re(tuple(sorted(names)))
+    # Раскодируем только атрибуты, которые проверяют контейнеры (data-props бывают большими)
+    keys = {key for _, attrs in containers for key in attrs}
+    position = 0
+    while True:
+        match = token_re.search(markup, position)
+        if match is None:
+            return
+        position = match.end()
+        tag = (match.group(2) or '').lower()
+        if not tag or match.group(1):
+            continue  # комментарий или закрывающий тег
+        if tag in names:
+            attrs = {
+                key.lower(): html.unescape(value) for key, value in _parse_attrs(match.group(3))
+                if key.lower() in keys
+            }
+            if _is_container(tag, attrs, containers):
+                if strict and tag in IMPLIED_END_TAGS:
+                    raise AmbiguousMarkup(f"<{tag}> card may end without a closing tag")
+                if strict and _self_closing(match):
+                    raise AmbiguousMarkup(f"self-closing <{tag}/> card")
+                position = _element_end(markup, token_re, tag, position, strict)
+                yield markup[match.start():position]
+                continue
+        if tag in RAW_TEXT_TAGS:
+            position = _skip_raw_text(markup, tag, position)
+
+
+def _element_end(markup: str, token_re, tag: str, position: int, strict: bool = True) -> int:
+    """Позиция после парного закрывающего тега (с учетом вложенных тегов того же имени)"""
+    depth = 1
+    while True:
+        match = token_re.search(markup, position)
+        if match is None:
+            if strict:
+                raise AmbiguousMarkup(f"<{tag}> card is not closed")
+            return len(markup)
+        position = match.end()
+        name = (match.group(2) or '').lower()
+        if name == tag:
+            if strict and not match.group(1) and _self_closing(match):
+                # <div/>: html.parser закрывает сразу, HTML5 (selectolax) - нет
+                raise AmbiguousMarkup(f"self-closing <{tag}/> inside a card")
+            depth += -1 if match.group(1) else 1
+            if depth == 0:
+                return position
+        elif name in RAW_TEXT_TAGS and not match.group(1):
+            position = _skip_raw_text(markup, name, position)
+
+
+def _self_closing(match) -> bool:
+    return (match.group(3) or '').rstrip().endswith('/')
+
+
+def _parse_attrs(source: str) -> Iterator[Tuple[str, str]]:
+    for name, double, single, bare in ATTR_RE.findall(source):
+        if name != '/':
+            yield name, double or single or bare
+
+
+def _document_cards(adapter, el, containers: Sequence[CardContainer], cards: List) -> List:
+    """Внешние карточки в уже разобранном документе (обход в порядке документа)"""
+    for child in adapter.children(el):
+        if _is_container(adapter.tag(child), adapter.attrs(child), containers):
+            cards.append(child)
+        else:
+            _document_cards(adapter, child, containers, cards)
+    return cards
+
+
+def _bs4_document_cards(el, containers: Sequence[CardContainer], cards: List) -> List:
+    for child in el.find_all(True, recursive=False):
+        # bs4 хранит class списком
+        attrs = {key: ' '.join(value) if isinstance(value, list) else value for key, value in child.attrs.items()}
+        if _is_container(child.name, attrs, containers):
+            cards.append(child)
+        else:
+            _bs4_document_cards(child, containers, cards)
+    return cards
+
+
+def _css_string(value: str) -> str:
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _selector_for(name, attrs: Dict) -> Optional[str]:
+    """
+    Простые find/find_all (имя тега + строковые/True атрибуты) переводим в CSS,
+    чтобы поиск шел в нативном движке. None - если нужен поиск на Python.
+    """
+    if name is not None and not (isinstance(name, str) and re.fullmatch(r'[a-zA-Z][\w-]*', name)):
+        return None
+    selector = name or '*'
+    for key, value in attrs.items():
+        if not re.fullmatch(r'[a-zA-Z_][\w:.-]*', key):
+            return None
+        if value is True:
+            selector += f'[{key}]'
+        elif isinstance(value, str):
+            if key == 'class' and not value.split():
+                return None
+            if key == 'class' and len(value.split()) == 1 and value == value.strip():
+                # bs4: class_='x' совпадает с любым из классов элемента
+                selector += f'[class~={_css_string(value)}]'
+            else:
+                selector += f'[{key}={_css_string(value)}]'
+        else:
+            return None
+    return selector
+
+
+def _match_value(matcher, value: Optional[str], multi_valued: bool = False) -> bool:
+    """Семантика сравнения значений атрибутов BeautifulSoup"""
+    if matcher is None:
+        return value is None
+    if matcher is True:
+        return value is not None
+    if multi_valued and value is not None:
+        # class: сначала каждый класс по отдельности, затем вся строка целиком
+        if any(_match_value(matcher, token) for token in value.split()):
+            return True
+    if callable(matcher) and not isinstance(matcher, re.Pattern):
+        return bool(matcher(value))
+    if value is None:
+        return False
+    if isinstance(matcher, re.Pattern):
+        return matcher.search(value) is not None
+    if isinstance(matcher, (list, tuple, set)):
+        return any(_match_value(item, value) for item in matcher)
+    return value == matcher
+
+
+def _match_name(matcher, tag: str) -> bool:
+    if matcher is None or matcher is True:
+        return True
+    if isinstance(matcher, str):
+        return tag == matcher
+    if isinstance(matcher, re.Pattern):
+        return matcher.search(tag) is not None
+    if isinstance(matcher, (list, tuple, set)):
+        return tag in matcher
+    return bool(matcher(tag))
+
+
+def _normalize_attrs(attrs, kwargs) -> Dict:
+    if isinstance(attrs, str):
+        attrs = {'class': attrs}
+    merged = dict(attrs or {})
+    for key, value in kwargs.items():
+        merged['class' if key == 'class_' else key] = value
+    return merged
+
+
+class HtmlNode:
+    """
+    Элемент разобранного документа с подмножеством API bs4.Tag, которое
+    используют скраперы: find, find_all, select, select_one, find_parent,
+    get_text/text/string, get/[]/has_attr/attrs, name, parent и tag.child
+    (первый потомок с таким именем).
+    """
+
+    __slots__ = ('_el', '_adapter', '_is_document')
+
+    def __init__(self, el, adapter, is_document: bool = False):
+        self._el = el
+        self._adapter = adapter
+        self._is_document = is_document
+
+    def _wrap(self, el) -> 'HtmlNode':
+        return HtmlNode(el, self._adapter)
+
+    # --- атрибуты ---
+
+    @property
+    def name(self) -> str:
+        return self._adapter.tag(self._el)
+
+    @property
+    def attrs(self) -> Dict:
+        attrs = dict(self._adapter.attrs(self._el))
+        if attrs.get('class') is not None:
+            attrs['class'] = attrs['class'].split()
+        return attrs
+
+    def get(self, key: str, default=None):
+        value = self._adapter.attrs(self._el).get(key)
+        if value is None:
+            return default
+        return value.split() if key == 'class' else value
+
+    def __getitem__(self, key: str):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def has_attr(self, key: str) -> bool:
+        return self._adapter.attrs(self._el).get(key) is not None
+
+    # --- текст ---
+
+    def get_text(self, separator: str = '', strip: bool = False) -> str:
+        pieces = self._adapter.texts(self._el)
+        if strip:
+            pieces = [piece.strip() for piece in pieces]
+            pieces = [piece for piece in pieces if piece]
+        return separator.join(pieces)
+
+    @property
+    def text(self) -> str:
+        return self.get_text()
+
+    @property
+    def string(self) -> Optional[str]:
+        """Как bs4: текст, если у элемента нет дочерних тегов (или ровно один с .string)"""
+        children = self._adapter.children(self._el)
+        if not children:
+            return self.get_text()
+        if len(children) == 1 and not self._adapter.own_text(self._el).strip():
+            return self._wrap(children[0]).string
+        return None
+
+    # --- навигация ---
+
+    @property
+    def parent(self) -> Optional['HtmlNode']:
+        parent = self._adapter.parent(self._el)
+        return self._wrap(parent) if parent is not None else None
+
+    @property
+    def children(self) -> List['HtmlNode']:
+        return [self._wrap(child) for child in self._adapter.children(self._el)]
+
+    def find_parent(self, name=None, attrs=None, **kwargs) -> Optional['HtmlNode']:
+        attrs = _normalize_attrs(attrs, kwargs)
+        parent = self._adapter.parent(self._el)
+        while parent is not None:
+            if self._matches(parent, name, attrs, None):
+                return self._wrap(parent)
+            parent = self._adapter.parent(parent)
+        return None
+
+    # --- поиск ---
+
+    def _matches(self, el, name, attrs: Dict, string) -> bool:
+        adapter = self._adapter
+        if not _match_name(name, adapter.tag(el)):
+            return False
+        if attrs:
+            el_attrs = adapter.attrs(el)
+            for key, matcher in attrs.items():
+                if not _match_value(matcher, el_attrs.get(key), multi_valued=(key == 'class')):
+                    return False
+        if string is not None and not _match_value(string, self._wrap(el).string):
+            return False
+        return True
+
+    def _iter_matches(self, name, attrs: Dict, recursive: bool, string) -> Iterator:
+        if recursive and string is None:
+            selector = _selector_for(name, attrs)
+            if selector is not None:
+                for el in self._adapter.select(self._el, selector):
+                    if self._is_document or not self._adapter.same(el, self._el):
+                        yield el
+                return
+        if recursive:
+            candidates = self._adapter.descendants(self._el, include_self=self._is_document)
+        else:
+            candidates = self._adapter.children(self._el)
+        for el in candidates:
+            if self._matches(el, name, attrs, string):
+                yield el
+
+    def find_all(self, name=None, attrs=None, recursive: bool = True, string=None, limit: int = None,
+                 **kwargs) -> List['HtmlNode']:
+        attrs = _normalize_attrs(attrs, kwargs)
+        result = []
+        for el in self._iter_matches(name, attrs, recursive, string):
+            result.append(self._wrap(el))
+            if limit and len(result) >= limit:
+                break
+        return result
+
+    def find(self, name=None, attrs=None, recursive: bool = True, string=None, **kwargs) -> Optional['HtmlNode']:
+        attrs = _normalize_attrs(attrs, kwargs)
+        for el in self._iter_matches(name, attrs, recursive, string):
+            return self._wrap(el)
+        return None
+
+    def select(self, selector: str) -> List['HtmlNode']:
+        return [
+            self._wrap(el) for el in self._adapter.select(self._el, selector)
+            if self._is_document or not self._adapter.same(el, self._el)
+        ]
+
+    def select_one(self, selector: str) -> Optional['HtmlNode']:
+        for el in self._adapter.select(self._el, selector):
+            if self._is_document or not self._adapter.same(el, self._el):
+                return self._wrap(el)
+        return None
+
+    def decompose(self):
+        """Удалить элемент из дерева"""
+        self._adapter.remove(self._el)
+
+    def __getattr__(self, name: str):
+        # bs4: tag.a == tag.find('a')
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self.find(name)
+
+    def __eq__(self, other):
+        return isinstance(other, HtmlNode) and self._adapter.same(self._el, other._el)
+
+    def __hash__(self):
+        return hash(self._adapter.identity(self._el))
+
+    def __repr__(self):
+        return f"<HtmlNode {self._adapter.name}:{self.name}>"
+
+
+class LxmlAdapter:
+    """lxml.html (libxml2) + cssselect"""
+
+    name = 'lxml'
+
+    def parse(self, markup: Markup):
+        if isinstance(markup, str) and markup.lstrip().startswith('<?xml'):
+            # lxml не принимает str с объявлением кодировки
+            markup = markup.encode('utf-8')
+        try:
+            return lxml.html.document_fromstring(markup)
+        except (etree.ParserError, ValueError):
+            return lxml.html.document_fromstring('<html></html>')
+
+    def parse_fragments(self, markup: str) -> List:
+        """Элементы верхнего уровня фрагмента (карточки без остальной страницы)"""
+        try:
+            fragments = lxml.html.fragments_fromstring(markup)
+        except (etree.ParserError, ValueError):
+            return []
+        return [el for el in fragments if isinstance(el, etree.ElementBase)]
+
+    def tag(self, el) -> str:
+        return el.tag
+
+    def attrs(self, el):
+        return el.attrib
+
+    def parent(self, el):
+        return el.getparent()
+
+    def children(self, el) -> List:
+        return [child for child in el if isinstance(child.tag, str)]
+
+    def descendants(self, el, include_self: bool = False):
+        return el.iter(etree.Element) if include_self else el.iterdescendants(etree.Element)
+
+    def texts(self, el) -> List[str]:
+        return _lxml_text_xpath(el)
+
+    def own_text(self, el) -> str:
+        return (el.text or '') + ''.join(child.tail or '' for child in el)
+
+    def select(self, el, selector: str):
+        return _lxml_css(selector)(el)
+
+    def same(self, a, b) -> bool:
+        return a is b
+
+    def identity(self, el):
+        return id(el)
+
+    def remove(self, el):
+        el.drop_tree()
+
+    def strip(self, el, tags):
+        for child in list(el.iter(*tags)):
+            child.drop_tree()
+
+
+class SelectolaxAdapter:
+    """selectolax (lexbor) - самый быстрый разбор и CSS-поиск"""
+
+    name = 'selectolax'
+
+    def parse(self, markup: Markup):
+        tree = LexborHTMLParser(markup)
+        return tree.root if tree.root is not None else LexborHTMLParser('<html></html>').root
+
+    def parse_fragments(self, markup: str) -> List:
+        body = LexborHTMLParser(markup).body
+        if body is None:
+            return []
+        return self.children(body)
+
+    def tag(self, el) -> str:
+        return el.tag
+
+    def attrs(self, el):
+        # Атрибуты без значения (<input disabled>) - пустая строка, как в bs4
+        return {key: '' if value is None else value for key, value in el.attributes.items()}
+
+    def parent(self, el):
+        parent = el.parent
+        return parent if parent is not None and not parent.tag.startswith('-') else None
+
+    def children(self, el) -> List:
+        return [child for child in el.iter() if not child.tag.startswith(('-', '_'))]
+
+    def descendants(self, el, include_self: bool = False):
+        for node in el.traverse():
+            if node.tag.startswith(('-', '_')):
+                continue
+            if not include_self and node.mem_id == el.mem_id:
+                continue
+            yield node
+
+    def texts(self, el) -> List[str]:
+        if el.tag not in SKIP_TEXT_TAGS and el.css_first('script, style, template') is None:
+            # Быстрый путь: текстовые узлы целиком в lexbor
+            return el.text(deep=True, separator='\x00').split('\x00')
+        return [
+            node.text_content for node in el.traverse(include_text=True)
+            if node.tag == '-text' and node.text_content and node.parent.tag not in SKIP_TEXT_TAGS
+        ]
+
+    def own_text(self, el) -> str:
+        return ''.join(node.text_content or '' for node in el.iter(include_text=True) if node.tag == '-text')
+
+    def select(self, el, selector: str):
+        return el.css(selector)
+
+    def same(self, a, b) -> bool:
+        return a.mem_id == b.mem_id
+
+    def identity(self, el):
+        return el.mem_id
+
+    def remove(self, el):
+        el.decompose()
+
+    def strip(self, el, tags):
+        el.strip_tags(list(tags))
+
+
+@lru_cache(maxsize=512)
+def _lxml_css(selector: str):
+    """CSS -> скомпилированный XPath (кэшируется, перевод cssselect недешевый)"""
+    return etree.XPath(HTMLTranslator().css_to_xpath(selector))
+
+
+if lxml is not None:
+    _lxml_text_xpath = etree.XPath(
+        'descendant-or-self::text()[not(parent::script) and not(parent::style) and not(parent::template)]'
+    )
+
+ADAPTERS = {
+    'lxml': LxmlAdapter(),
+    'selectolax': SelectolaxAdapter(),
+}
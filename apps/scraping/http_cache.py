@@ -0,0 +1,244 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from .cassette import active_cassette
+
+try:
+    import zstandard
+except ImportError:  # тела хранятся без сжатия
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_CONFIG = {
+    'enabled': True,
+    'path': None,  # None - BASE_DIR / 'http_cache.sqlite3'
+    'ttl': {},  # секунды по политике кэша; без записи - по Cache-Control ответа
+    'max_age_days': 30,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    policy TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    encoding TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    codec TEXT NOT NULL,
+    body BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_stored ON responses (stored_at);
+"""
+
+# Заголовки, которые описывают передачу, а не тело - в кэш не пишутся
+HOP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'set-cookie'}
+MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+
+def cache_config() -> Dict:
+    config = dict(DEFAULT_CACHE_CONFIG)
+    config.update(getattr(settings, 'HTTP_CACHE', {}))
+    if not config['path']:
+        config['path'] = os.path.join(str(getattr(settings, 'BASE_DIR', '.')), 'http_cache.sqlite3')
+    return config
+
+
+def freshness_lifetime(headers: Dict, ttl: Optional[int]) -> Optional[int]:
+    """
+    Сколько секунд ответ можно отдавать без запроса к сайту; None - не хранить.
+
+    TTL политики (HTTP_CACHE['ttl']) важнее Cache-Control: сайты отдают
+    страницы вакансий с no-cache, а мы сознательно не перезагружаем их
+    чаще раза в TTL. Без TTL действуют no-store / no-cache / max-age.
+    """
+    cache_control = (CaseInsensitiveDict(headers).get('Cache-Control') or '').lower()
+    if 'no-store' in cache_control:
+        return None
+    if ttl is not None:
+        return ttl
+    if 'no-cache' in cache_control:
+        return 0
+    match = MAX_AGE_RE.search(cache_control)
+    return int(match.group(1)) if match else 0
+
+
+class HttpCache:
+    """
+    Персистентный HTTP-кэш (SQLite) для requests.Session и AsyncFetcher.
+
+    Для каждого URL хранится последний ответ 200 с ETag / Last-Modified.
+    Пока запись свежая (TTL политики или max-age), сайт не запрашивается
+    вовсе; после - запрос уходит с If-None-Match / If-Modified-Since, и на
+    304 тело берется из кэша. Политика - имя вида 'linkedin_job', по нему
+    выбирается TTL.
+    """
+
+    def __init__(self, path: str, ttl: Dict = None):
+        self.path = str(path)
+        self.ttl = ttl or {}
+        self._lock = threading.Lock()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM responses WHERE url = ?', (url,)).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        body = entry.pop('body')
+        entry['content'] = zstandard.ZstdDecompressor().decompress(body) if entry['codec'] == 'zstd' else bytes(body)
+        entry['headers'] = json.loads(entry['headers'])
+        return entry
+
+    @staticmethod
+    def is_fresh(entry: Dict) -> bool:
+        return entry['expires_at'] > time.time()
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict]) -> Dict:
+        headers = {}
+        if entry and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url: str, policy: str, status: int, headers: Dict, content: bytes, encoding: str = None):
+        """Сохранить ответ 200 (если его можно кэшировать)"""
+        headers = {k: v for k, v in headers.items() if k.lower() not in HOP_HEADERS}
+        lifetime = freshness_lifetime(headers, self.ttl.get(policy))
+        etag = CaseInsensitiveDict(headers).get('ETag')
+        last_modified = CaseInsensitiveDict(headers).get('Last-Modified')
+        if status != 200 or lifetime is None or not (lifetime or etag or last_modified):
+            return
+        codec, body = 'identity', content
+        if zstandard is not None:
+            codec, body = 'zstd', zstandard.ZstdCompressor(level=3).compress(content)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO responses (url, policy, status, headers, encoding, etag, last_modified, '
+                'stored_at, expires_at, codec, body) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, policy, status, json.dumps(headers), encoding, etag, last_modified,
+                 now, now + lifetime, codec, body)
+            )
+
+    def revalidated(self, entry: Dict, policy: str, headers: Dict) -> Dict:
+        """Ответ 304: тело из кэша, валидаторы и срок свежести обновляются"""
+        headers = CaseInsensitiveDict(headers)
+        lifetime = freshness_lifetime(headers, self.ttl.get(policy)) or 0
+        entry['etag'] = headers.get('ETag') or entry['etag']
+        entry['last_modified'] = headers.get('Last-Modified') or entry['last_modified']
+        entry['expires_at'] = time.time() + lifetime
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                'UPDATE responses SET etag = ?, last_modified = ?, expires_at = ? WHERE url = ?',
+                (entry['etag'], entry['last_modified'], entry['expires_at'], entry['url'])
+            )
+        return entry
+
+    def prune(self, max_age_days: float) -> int:
+        cutoff = time.time() - max_age_days * 86400
+        with self._lock, self._connect() as conn:
+            return conn.execute('DELETE FROM responses WHERE stored_at < ?', (cutoff,)).rowcount
+
+
+_cache: Optional[HttpCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_http_cache() -> Optional[HttpCache]:
+    """HTTP-кэш процесса по settings.HTTP_CACHE; None - если отключен"""
+    global _cache
+    config = cache_config()
+    if not config['enabled']:
+        return None
+    with _cache_lock:
+        if _cache is None or _cache.path != str(config['path']):
+            _cache = HttpCache(config['path'], config['ttl'])
+        return _cache
+
+
+class CachingAdapter(HTTPAdapter):
+    """Транспорт requests с HttpCache: свежие ответы без запроса, условные GET, 304 из кэша"""
+
+    def __init__(self, policy: str, cache: HttpCache = None, **kwargs):
+        super().__init__(**kwargs)
+        self.policy = policy
+        self.cache = cache
+
+    def send(self, request, **kwargs):
+        cache = self.cache or get_http_cache()
+        if cache is None or request.method != 'GET' or active_cassette() is not None:
+            return super().send(request, **kwargs)
+        try:
+            entry = cache.lookup(request.url)
+        except Exception as e:
+            logger.error(f"HTTP cache lookup failed for {request.url}: {str(e)}")
+            return super().send(request, **kwargs)
+        if entry and cache.is_fresh(entry):
+            return self._cached_response(request, entry)
+
+        request.headers.update(cache.conditional_headers(entry))
+        response = super().send(request, **kwargs)
+        try:
+            if response.status_code == 304 and entry:
+                response.close()
+                return self._cached_response(request, cache.revalidated(entry, self.policy, response.headers))
+            if response.status_code == 200:
+                cache.store(request.url, self.policy, 200, dict(response.headers), response.content, response.encoding)
+        except Exception as e:
+            logger.error(f"HTTP cache update failed for {request.url}: {str(e)}")
+        return response
+
+    @staticmethod
+    def _cached_response(request, entry: Dict) -> requests.Response:
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = entry['content']
+        response.encoding = entry['encoding']
+        response.url = request.url
+        response.request = request
+        response.reason = 'OK'
+        response.from_cache = True
+        return response
+
+
+def install_http_cache(session: requests.Session, policy: str) -> requests.Session:
+    """Подключить HttpCache к сессии: все GET сессии идут через кэш с политикой policy"""
+    adapter = CachingAdapter(policy)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
@@ -0,0 +1,104 @@
+import hashlib
+import logging
+import math
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INCREMENTAL_CONFIG = {
+    'enabled': True,
+    # Доля уже известных вакансий, при которой страница считается старой
+    'known_ratio': 0.9,
+    # Больше стольких URL у источника - вместо set используется Bloom-фильтр
+    'bloom_above': 200000,
+    'false_positive_rate': 0.001,
+}
+
+
+def incremental_config() -> Dict:
+    config = dict(DEFAULT_INCREMENTAL_CONFIG)
+    config.update(getattr(settings, 'INCREMENTAL_CRAWL', {}))
+    return config
+
+
+def job_key(job_data: Dict) -> Optional[str]:
+    """Ключ вакансии со страницы выдачи - тот же, что Job.source_url после ingestion"""
+    key = job_data.get('source_url') or job_data.get('url')
+    return key[:Job._meta.get_field('source_url').max_length] if key else None
+
+
+class BloomFilter:
+    """Компактное множество строк без хранения самих строк (ложные срабатывания ~ error_rate)"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * step) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class KnownJobIndex:
+    """
+    Множество URL вакансий, которые уже есть в БД (Job.source_url).
+
+    Загружается один раз на запуск скрапера; по нему скрапер понимает, что
+    дошел до уже импортированной части выдачи (сайты сортируют от новых к
+    старым) и дальше листать не нужно.
+    """
+
+    def __init__(self, keys: Iterable[str] = (), capacity: int = 0):
+        config = incremental_config()
+        if capacity > config['bloom_above']:
+            # Запас под вакансии, добавленные во время запуска
+            self._keys = BloomFilter(capacity * 2, config['false_positive_rate'])
+        else:
+            self._keys = set()
+        self.count = 0
+        self.update(keys)
+
+    @classmethod
+    def for_source(cls, source_site: str) -> 'KnownJobIndex':
+        jobs = Job.objects.filter(source_site=source_site)
+        index = cls(
+            jobs.values_list('source_url', flat=True).iterator(chunk_size=5000),
+            capacity=jobs.count(),
+        )
+        logger.info(
+            f"Known {source_site} jobs index: {index.count} URLs"
+            f"{' (Bloom filter)' if isinstance(index._keys, BloomFilter) else ''}"
+        )
+        return index
+
+    def update(self, keys: Iterable[str]):
+        for key in keys:
+            if key and key not in self._keys:
+                self._keys.add(key)
+                self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def known_ratio(self, jobs: List[Dict]) -> float:
+        """Доля вакансий страницы, которые уже известны (0 для пустой страницы)"""
+        keys = [job_key(job) for job in jobs]
+        keys = [key for key in keys if key]
+        if not keys:
+            return 0.0
+        return sum(1 for key in keys if key in self._keys) / len(keys)
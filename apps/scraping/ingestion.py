@@ -0,0 +1,296 @@
+import hashlib
+import json
+import logging
+from datetime import datetime, date, timezone as dt_timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .incremental import job_key
+from .job_features import refresh_job_features
+from .models import Job, Company
+from .scoring import enqueue_scoring
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+# Вакансий в одном микро-батче ingest_stream (пишется сразу, пока скрапер работает)
+DEFAULT_BATCH_SIZE = 100
+
+
+def _clean_text(value, max_length: int = None) -> str:
+    """Схлопываем пробелы/переносы и обрезаем под размер поля"""
+    if value is None:
+        return ''
+    text = ' '.join(str(value).split())
+    return text[:max_length] if max_length else text
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_datetime(value) -> Optional[datetime]:
+    """Приводим дату публикации к aware datetime (ISO строки, даты, datetime)"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        parsed = parse_datetime(value)
+        if parsed is None:
+            parsed_date = parse_date(value[:10]) if len(value) >= 10 else None
+            if parsed_date is None:
+                # Относительные даты вида "2 päeva tagasi" не храним
+                return None
+            parsed = datetime.combine(parsed_date, datetime.min.time())
+        value = parsed
+    elif isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    if not isinstance(value, datetime):
+        return None
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, dt_timezone.utc)
+    # Храним в UTC, чтобы content_hash не зависел от смещения в исходной строке
+    return value.astimezone(dt_timezone.utc)
+
+
+def normalize_job_data(job_data: Dict, source_site: str, defaults: Dict = None) -> Optional[Dict]:
+    """
+    Normalize a scraped job dict into Job field values.
+
+    Scrapers use slightly different keys ('url'/'source_url',
+    'company'/'company_name'), this maps all of them onto the Job model.
+    Returns None when the job has no URL or title.
+    """
+    defaults = defaults or {}
+    source_url = job_data.get('source_url') or job_data.get('url')
+    title = _clean_text(job_data.get('title'), Job._meta.get_field('title').max_length)
+    if not source_url or not title:
+        return None
+
+    def pick(key, fallback=None):
+        value = job_data.get(key)
+        if value in (None, ''):
+            value = defaults.get(key, fallback)
+        return value
+
+    employment_type = pick('employment_type')
+    return {
+        'source_url': source_url[:Job._meta.get_field('source_url').max_length],
+        'title': title,
+        'company_name': _clean_text(
+            job_data.get('company') or job_data.get('company_name'),
+            Job._meta.get_field('company_name').max_length
+        ),
+        'location': _clean_text(pick('location', ''), Job._meta.get_field('location').max_length),
+        'description': (pick('description', '') or '').strip(),
+        'requirements': (pick('requirements', '') or '').strip(),
+        'source_site': source_site,
+        'salary_min': _to_int(pick('salary_min')),
+        'salary_max': _to_int(pick('salary_max')),
+        'salary_currency': pick('salary_currency', 'EUR'),
+        'is_remote': bool(pick('is_remote', False)),
+        'experience_level': pick('experience_level', 'any'),
+        'employment_type': _clean_text(employment_type, 100) if employment_type else None,
+        'posted_date': _to_datetime(pick('posted_date')),
+        'is_active': True,
+    }
+
+
+# Поля, из которых считается Job.content_hash
+CONTENT_HASH_FIELDS = (
+    'title', 'company_name', 'location', 'description', 'requirements',
+    'salary_min', 'salary_max', 'salary_currency', 'is_remote',
+    'experience_level', 'employment_type', 'posted_date', 'is_active',
+)
+
+
+def compute_content_hash(row: Dict) -> str:
+    """Fingerprint of the normalized scraped fields of a job"""
+    payload = json.dumps(
+        [row.get(field) for field in CONTENT_HASH_FIELDS],
+        default=str, ensure_ascii=False, separators=(',', ':')
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class JobIngestionService:
+    """
+    Пакетная запись вакансий в БД, общая для всех скраперов.
+
+    Компании разрешаются одним запросом на чанк, вакансии пишутся через
+    bulk_create(update_conflicts=True) по source_url. Каждый чанк - отдельная
+    транзакция, поэтому ошибка в одном чанке не откатывает остальные.
+    Вакансии, у которых content_hash не изменился, не перезаписываются.
+    """
+
+    # Поля, которые перезаписываются при повторном скрапинге существующей вакансии
+    UPDATE_FIELDS = [
+        'title', 'company', 'company_name', 'location', 'description', 'requirements',
+        'source_site', 'salary_min', 'salary_max', 'salary_currency', 'is_remote',
+        'experience_level', 'employment_type', 'posted_date', 'is_active',
+        'content_hash', 'updated_at',
+        # Карточка изменилась - детали вакансии нужно загрузить заново
+        'details_fetched_at',
+    ]
+
+    def __init__(self, source_site: str, chunk_size: int = None, defaults: Dict = None):
+        self.source_site = source_site
+        self.chunk_size = chunk_size or getattr(settings, 'INGESTION_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+        self.defaults = defaults or {}
+        # source_url вакансий из чанков, которые не удалось записать при последнем ingest()
+        self.failed_urls = set()
+
+    def ingest(self, jobs_data: Iterable[Dict],
+               progress_callback: Callable[[int, int], None] = None) -> Dict[str, int]:
+        """
+        Write a batch of scraped job dicts.
+        :return: counters {'new', 'updated', 'unchanged', 'failed', 'total'}
+        """
+        stats = {'new': 0, 'updated': 0, 'unchanged': 0, 'failed': 0, 'total': 0}
+        self.failed_urls = set()
+
+        # Нормализуем и убираем дубликаты по source_url (последняя версия побеждает)
+        rows = {}
+        for job_data in jobs_data or []:
+            stats['total'] += 1
+            try:
+                row = normalize_job_data(job_data, self.source_site, self.defaults)
+            except Exception as e:
+                logger.error(f"Error normalizing job {job_data.get('title', 'Unknown')}: {str(e)}")
+                row = None
+            if row is None:
+                stats['failed'] += 1
+                continue
+            rows[row['source_url']] = row
+
+        rows = list(rows.values())
+        for start in range(0, len(rows), self.chunk_size):
+            chunk = rows[start:start + self.chunk_size]
+            try:
+                with transaction.atomic():
+                    chunk_stats = self._ingest_chunk(chunk)
+                for key, value in chunk_stats.items():
+                    stats[key] += value
+            except Exception as e:
+                logger.error(f"Error writing {self.source_site} jobs chunk of {len(chunk)}: {str(e)}")
+                stats['failed'] += len(chunk)
+                self.failed_urls.update(row['source_url'] for row in chunk)
+            if progress_callback:
+                progress_callback(min(start + self.chunk_size, len(rows)), len(rows))
+
+        logger.info(
+            f"Ingested {self.source_site} jobs: {stats['new']} new, {stats['updated']} updated, "
+            f"{stats['unchanged']} unchanged, {stats['failed']} failed"
+        )
+        return stats
+
+    def ingest_stream(self, pages: Iterable[Iterable[Dict]], batch_size: int = None,
+                      on_batch: Callable[[List[Dict], Dict[str, int]], None] = None) -> Dict[str, int]:
+        """
+        Write jobs while the scraper is still running.
+
+        pages - generator of job lists (one per results page). Jobs are
+        collected into micro-batches of batch_size and each batch is written
+        (and committed) as soon as it is full, so memory stays flat and a
+        failing scraper keeps everything it has already yielded.
+        on_batch(jobs, batch_stats) is called after each written batch with
+        the jobs of the batch that were actually written (jobs of a failed
+        chunk are left out).
+        :return: counters {'new', 'updated', 'unchanged', 'failed', 'total'}
+        """
+        batch_size = batch_size or getattr(settings, 'INGESTION_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        stats = {'new': 0, 'updated': 0, 'unchanged': 0, 'failed': 0, 'total': 0}
+        batch = []
+
+        def flush():
+            jobs = batch[:]
+            batch.clear()
+            batch_stats = self.ingest(jobs)
+            for key in stats:
+                stats[key] += batch_stats[key]
+            if on_batch:
+                written = [job for job in jobs if job_key(job) not in self.failed_urls]
+                on_batch(written, batch_stats)
+
+        try:
+            for page_jobs in pages:
+                batch.extend(page_jobs)
+                if len(batch) >= batch_size:
+                    flush()
+        finally:
+            # Уже собранные вакансии пишем и при ошибке скрапера
+            if batch:
+                flush()
+        return stats
+
+    def _ingest_chunk(self, chunk: List[Dict]) -> Dict[str, int]:
+        stats = {'new': 0, 'updated': 0, 'unchanged': 0}
+        existing = {
+            values['source_url']: values
+            for values in Job.objects.filter(
+                source_url__in=[row['source_url'] for row in chunk]
+            ).values('source_url', 'content_hash', 'posted_date')
+        }
+
+        to_write = []
+        for row in chunk:
+            current = existing.get(row['source_url'])
+            # Хэш - отпечаток карточки в том виде, в каком ее отдал источник:
+            # значения из БД (дата публикации, детали LinkedInDetailsEnricher) в него
+            # не входят, иначе неизменная карточка считалась бы измененной
+            row['content_hash'] = compute_content_hash(row)
+            if current is not None and row['posted_date'] is None:
+                # Не затираем известную дату публикации, если источник ее не отдал
+                row['posted_date'] = current['posted_date']
+            if current is None:
+                stats['new'] += 1
+            elif current['content_hash'] == row['content_hash']:
+                stats['unchanged'] += 1
+                continue
+            else:
+                stats['updated'] += 1
+            to_write.append(row)
+
+        if not to_write:
+            return stats
+
+        companies = self._resolve_companies(to_write)
+        Job.objects.bulk_create(
+            [Job(company=companies.get(row['company_name'][:200]), **row) for row in to_write],
+            update_conflicts=True,
+            unique_fields=['source_url'],
+            update_fields=self.UPDATE_FIELDS,
+        )
+        job_ids = list(
+            Job.objects.filter(source_url__in=[row['source_url'] for row in to_write]).values_list('id', flat=True)
+        )
+        # Признаки текста (слова, навыки) - один раз при записи, а не в каждом скоринге
+        refresh_job_features(Job.objects.filter(id__in=job_ids), rebuild=True)
+        # Скоры пересчитываются только для новых и изменившихся вакансий
+        enqueue_scoring(job_ids)
+        return stats
+
+    def _resolve_companies(self, rows: List[Dict]) -> Dict[str, Company]:
+        """Находим/создаем компании для всего чанка за один проход"""
+        locations = {}
+        for row in rows:
+            if row['company_name']:
+                locations.setdefault(row['company_name'][:200], row['location'])
+        if not locations:
+            return {}
+
+        companies = {c.name: c for c in Company.objects.filter(name__in=locations)}
+        missing = [name for name in locations if name not in companies]
+        if missing:
+            Company.objects.bulk_create(
+                [Company(name=name, location=locations[name]) for name in missing],
+                ignore_conflicts=True,
+            )
+            companies.update({c.name: c for c in Company.objects.filter(name__in=missing)})
+        return companies
@@ -0,0 +1,184 @@
+import hashlib
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .keyword_matcher import KeywordMatcher, text_words
+from .models import Job, JobFeatures
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+# Сколько последних вакансий сравнивается при поиске похожих
+SIMILAR_CANDIDATES = 500
+
+
+def skill_matcher() -> KeywordMatcher:
+    """Словарь признаков - ключевые слова технологий и уровней опыта JobScoringService"""
+    from .services import JobScoringService
+    return JobScoringService.keyword_matcher()
+
+
+def tech_keywords() -> Set[str]:
+    from .services import JobScoringService
+    return {keyword for keywords in JobScoringService.TECH_KEYWORDS.values() for keyword in keywords}
+
+
+def features_hash(title: str, description: str, requirements: str) -> str:
+    """Хэш входа признаков: тексты вакансии и словарь (изменение словаря пересчитывает все)"""
+    payload = '\x1f'.join([title or '', description or '', requirements or ''] + skill_matcher().keywords)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def extract_features(title: str, description: str, requirements: str) -> Dict:
+    """Поля JobFeatures для текстов вакансии"""
+    matcher = skill_matcher()
+    text = f"{title or ''} {description or ''}"
+    return {
+        'content_hash': features_hash(title, description, requirements),
+        'tokens': sorted(text_words(f"{text} {requirements or ''}".lower())),
+        'keywords': sorted(matcher.find(text)),
+        'requirement_keywords': sorted(matcher.find(requirements)),
+    }
+
+
+def refresh_job_features(jobs=None, rebuild: bool = False, chunk_size: int = None) -> Dict[str, int]:
+    """
+    Пересчитать признаки вакансий, у которых их нет или тексты изменились.
+
+    Кандидаты выбираются в SQL: нет JobFeatures или Job.updated_at новее
+    признаков; rebuild=True проверяет все вакансии (например, после
+    изменения словаря). Признаки перезаписываются, только если изменился
+    features_hash, остальным кандидатам лишь обновляется updated_at.
+    :return: {'built', 'unchanged'}
+    """
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+    jobs = Job.objects.all() if jobs is None else jobs
+    if not rebuild:
+        jobs = jobs.filter(Q(features__isnull=True) | Q(features__updated_at__lt=F('updated_at')))
+
+    stats = {'built': 0, 'unchanged': 0}
+    rows = jobs.order_by().values('id', 'title', 'description', 'requirements', 'features__content_hash')
+    chunk = []
+    for row in rows.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            _write_chunk(chunk, stats)
+            chunk = []
+    if chunk:
+        _write_chunk(chunk, stats)
+    if stats['built']:
+        logger.info(f"Job features: {stats['built']} built, {stats['unchanged']} unchanged")
+    return stats
+
+
+def _write_chunk(rows: List[Dict], stats: Dict[str, int]):
+    changed, unchanged = [], []
+    for row in rows:
+        content_hash = features_hash(row['title'], row['description'], row['requirements'])
+        if content_hash == row['features__content_hash']:
+            unchanged.append(row['id'])
+            continue
+        features = extract_features(row['title'], row['description'], row['requirements'])
+        changed.append(JobFeatures(job_id=row['id'], **features))
+
+    with transaction.atomic():
+        if changed:
+            JobFeatures.objects.bulk_create(
+                changed,
+                update_conflicts=True,
+                unique_fields=['job'],
+                update_fields=['content_hash', 'tokens', 'keywords', 'requirement_keywords', 'updated_at'],
+            )
+        if unchanged:
+            # Иначе вакансия снова попадет в кандидаты по updated_at
+            JobFeatures.objects.filter(job_id__in=unchanged).update(updated_at=timezone.now())
+    stats['built'] += len(changed)
+    stats['unchanged'] += len(unchanged)
+
+
+def get_features(job: Job) -> Optional[JobFeatures]:
+    try:
+        return job.features
+    except JobFeatures.DoesNotExist:
+        return None
+
+
+def job_keywords(job: Job) -> Dict[str, Set[str]]:
+    """
+    Ключевые слова вакансии: {'text': в title + description, 'requirements': в requirements}.
+    Из JobFeatures, а если их еще нет - разбором текста.
+    """
+    features = get_features(job)
+    if features is None:
+        features = JobFeatures(**extract_features(job.title, job.description, job.requirements))
+    return {'text': set(features.keywords), 'requirements': set(features.requirement_keywords)}
+
+
+def other_keywords(matcher: KeywordMatcher) -> Tuple[Set[str], Set[str]]:
+    """
+    Ключевые слова matcher вне словаря признаков: (слова, фразы).
+    Слова ищутся по JobFeatures.tokens, фразы и слова со знаками ('f#', '.net') -
+    только по тексту вакансии.
+    """
+    vocabulary = skill_matcher().index
+    other = {keyword for keyword in matcher.keywords if keyword not in vocabulary}
+    return other - matcher.phrases, other & matcher.phrases
+
+
+def match_skills(features: JobFeatures, matcher: KeywordMatcher, text: str = None) -> Set[str]:
+    """
+    Навыки matcher, найденные в вакансии. Слова словаря берутся из найденных
+    ключевых слов признаков, остальные слова - из множества слов, а фразы вне
+    словаря ищутся в text (title + description + requirements): без текста
+    они не засчитываются.
+    """
+    vocabulary = skill_matcher().index
+    found_keywords = set(features.keywords) | set(features.requirement_keywords)
+    found = {keyword for keyword in matcher.keywords if keyword in vocabulary and keyword in found_keywords}
+    words, phrases = other_keywords(matcher)
+    if words:
+        found |= matcher.find_words(set(features.tokens)) & words
+    if phrases and text:
+        found |= matcher.find(text) & phrases
+    return found
+
+
+def job_skills(features: JobFeatures) -> Set[str]:
+    """Технологии вакансии (без уровней опыта)"""
+    return (set(features.keywords) | set(features.requirement_keywords)) & tech_keywords()
+
+
+def similar_jobs(job: Job, limit: int = 5, candidates: int = SIMILAR_CANDIDATES) -> List[Job]:
+    """
+    Похожие вакансии: наибольшее пересечение технологий (Жаккар) среди
+    последних активных вакансий; при равенстве - тот же уровень опыта.
+    """
+    features = get_features(job)
+    skills = job_skills(features) if features else set()
+    if not skills:
+        return list(
+            Job.objects.filter(is_active=True, experience_level=job.experience_level)
+            .exclude(id=job.id).select_related('company')[:limit]
+        )
+
+    rows = (
+        JobFeatures.objects.filter(job__is_active=True)
+        .exclude(job_id=job.id)
+        .order_by('-job__created_at')
+        .values_list('job_id', 'keywords', 'requirement_keywords', 'job__experience_level')[:candidates]
+    )
+    technologies = tech_keywords()
+    ranked = []
+    for job_id, keywords, requirement_keywords, experience_level in rows:
+        other = (set(keywords) | set(requirement_keywords)) & technologies
+        common = len(skills & other)
+        if common:
+            ranked.append((common / len(skills | other), experience_level == job.experience_level, job_id))
+    ranked.sort(reverse=True)
+    ids = [job_id for _, _, job_id in ranked[:limit]]
+    by_id = {similar.id: similar for similar in Job.objects.filter(id__in=ids).select_related('company')}
+    return [by_id[job_id] for job_id in ids if job_id in by_id]
@@ -0,0 +1,102 @@
+import re
+import string
+from functools import lru_cache
+from typing import Dict, Iterable, List, Set, Tuple
+
+WORD_RE = re.compile(r'\w+')
+# Знаки препинания -> пробел: str.translate + split() быстрее, чем WORD_RE.findall
+_SEPARATORS = str.maketrans({
+    char: ' ' for char in string.punctuation.replace('_', '') + '–—•·«»“”„‘’…×€£$©®™°§¶'
+})
+
+
+def text_words(text: str) -> Set[str]:
+    """Множество слов текста (в нижнем регистре он уже должен быть)"""
+    return set(text.translate(_SEPARATORS).split())
+
+
+class KeywordMatcher:
+    """
+    Поиск многих ключевых слов за один проход по тексту.
+
+    Текст один раз разбивается на слова (str.translate + split, в C) и
+    превращается в множество, после чего однословные ключевые слова
+    ('python', 'js', 'mid') ищутся одним пересечением множеств - цена не
+    зависит от числа ключевых слов.
+    Фразы и слова со знаками ('node.js', 'c#', '.net', 'entity framework')
+    проверяются своим скомпилированным шаблоном, и только если все их слова
+    есть в тексте. Совпадение засчитывается на границе слова: 'js' не
+    находится в 'json', 'mid' - в 'middleware', 'java' - в 'javascript';
+    '.net' находится в 'asp.net'. Регистр не учитывается.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = list(dict.fromkeys(
+            ' '.join(keyword.lower().split()) for keyword in keywords if keyword and keyword.strip()
+        ))
+        self.index: Dict[str, int] = {keyword: i for i, keyword in enumerate(self.keywords)}
+        self._words = {keyword for keyword in self.keywords if WORD_RE.fullmatch(keyword)}
+        # Фразы и слова со знаками - их нельзя проверить по одному множеству слов
+        self.phrases: Set[str] = set(self.keywords) - self._words
+        self._phrases: List[Tuple[str, List[str], re.Pattern]] = []
+        for keyword in self.keywords:
+            if keyword in self._words:
+                continue
+            pattern = r'\s+'.join(map(re.escape, keyword.split()))
+            # Граница нужна только со стороны буквы/цифры: '.net' в 'asp.net' - совпадение
+            if WORD_RE.match(keyword[0]):
+                pattern = r'(?<!\w)' + pattern
+            if WORD_RE.match(keyword[-1]):
+                pattern += r'(?!\w)'
+            self._phrases.append((keyword, WORD_RE.findall(keyword), re.compile(pattern)))
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def find(self, text: str) -> Set[str]:
+        """Все ключевые слова, найденные в text"""
+        if not text:
+            return set()
+        text = text.lower()
+        words = text_words(text)
+        found = self._words & words
+        for keyword, keyword_words, pattern in self._phrases:
+            if all(word in words for word in keyword_words) and pattern.search(text):
+                found.add(keyword)
+        return found
+
+    def find_words(self, words: Set[str]) -> Set[str]:
+        """
+        Однословные ключевые слова по готовому множеству слов текста (JobFeatures.tokens).
+        Фразы (self.phrases) так не проверить - 'f#' превращается в 'f', '.net' в 'net',
+        поэтому для них нужен find() по тексту.
+        """
+        return self._words & words
+
+    def indices(self, text: str) -> Set[int]:
+        """Номера (self.index) найденных ключевых слов"""
+        return {self.index[keyword] for keyword in self.find(text)}
+
+    def matches_any(self, text: str) -> bool:
+        if not text:
+            return False
+        text = text.lower()
+        words = text_words(text)
+        if not self._words.isdisjoint(words):
+            return True
+        return any(
+            all(word in words for word in keyword_words) and pattern.search(text)
+            for keyword, keyword_words, pattern in self._phrases
+        )
+
+
+@lru_cache(maxsize=256)
+def _compiled(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher(keywords)
+
+
+def get_matcher(keywords: Iterable[str]) -> KeywordMatcher:
+    """KeywordMatcher для набора слов; собирается один раз на процесс и набор"""
+    return _compiled(tuple(sorted({
+        ' '.join(keyword.lower().split()) for keyword in keywords if keyword and keyword.strip()
+    })))
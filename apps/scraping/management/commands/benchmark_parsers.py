@@ -0,0 +1,146 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.scraping.benchmarks import (
+    BENCHMARK_SOURCES, DEFAULT_REPEAT, DEFAULT_SCALES, build_report, collect_cases, compare_reports,
+    run_benchmarks,
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the job page parsers on the saved HTML fixtures (offline, no browser)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sources',
+            nargs='+',
+            choices=list(BENCHMARK_SOURCES),
+            help='Sources to benchmark (default: all)',
+        )
+        parser.add_argument(
+            '--backends',
+            nargs='+',
+            choices=['selectolax', 'lxml', 'bs4'],
+            help='HTML parser backends (default: all installed)',
+        )
+        parser.add_argument(
+            '--scales',
+            nargs='+',
+            type=int,
+            default=list(DEFAULT_SCALES),
+            help='Card count multipliers for the synthetic pages',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=DEFAULT_REPEAT,
+            help='Timed runs per case (the median is reported)',
+        )
+        parser.add_argument(
+            '--fixtures-dir',
+            help='Directory with the saved pages (default: BASE_DIR)',
+        )
+        parser.add_argument(
+            '--output',
+            help='Where to write the JSON report (default: logs/parser_benchmark_<timestamp>.json)',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Previous JSON report to compare against',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.15,
+            help='Relative slowdown (or memory growth) counted as a regression',
+        )
+        parser.add_argument(
+            '--fail-on-regression',
+            action='store_true',
+            help='Exit with an error if the baseline comparison finds regressions',
+        )
+        parser.add_argument(
+            '--in-process',
+            action='store_true',
+            help='Run all cases in this process (faster, peak RSS is not per case)',
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {e}")
+
+        collected = collect_cases(
+            options['sources'], options['backends'], options['scales'], options['fixtures_dir']
+        )
+        for skipped in collected['skipped']:
+            self.stdout.write(self.style.WARNING(
+                f"Skipping {skipped['source']} {skipped['fixture'] or ''}: {skipped['reason']}"
+            ))
+        if not collected['cases']:
+            raise CommandError('No benchmark cases (are the fixtures in --fixtures-dir?)')
+
+        self.stdout.write(f"Running {len(collected['cases'])} cases, {options['repeat']} runs each...")
+        self.stdout.write(
+            f"{'source':<13} {'fixture':<38} {'scale':>5} {'backend':<10} {'cards':>6} "
+            f"{'ms':>9} {'cards/s':>10} {'rss +MB':>8} {'py MB':>7}"
+        )
+        results = run_benchmarks(
+            collected['cases'], options['repeat'], isolate=not options['in_process'], progress=self._print_result
+        )
+
+        report = build_report(results, collected['skipped'], options['repeat'])
+        output = options['output']
+        if not output:
+            # Отчеты не попадают в корень репозитория
+            logs_dir = os.path.join(settings.BASE_DIR, 'logs')
+            os.makedirs(logs_dir, exist_ok=True)
+            output = os.path.join(logs_dir, f"parser_benchmark_{timezone.now().strftime('%Y%m%d_%H%M%S')}.json")
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Report saved to {os.path.abspath(output)}"))
+
+        if baseline is not None:
+            self._print_comparison(compare_reports(report, baseline, options['threshold']), options)
+
+    def _print_result(self, result):
+        if 'error' in result:
+            self.stdout.write(self.style.ERROR(
+                f"{result['source']:<13} {result['fixture']:<38} {result['scale']:>5} "
+                f"{result['backend']:<10} error: {result['error']}"
+            ))
+            return
+        rss = f"{result['rss_delta_kb'] / 1024:.1f}" if result['rss_delta_kb'] is not None else '-'
+        self.stdout.write(
+            f"{result['source']:<13} {result['fixture'][:38]:<38} {result['scale']:>5} {result['backend']:<10} "
+            f"{result['cards']:>6} {result['seconds'] * 1000:>9.1f} {result['cards_per_sec'] or 0:>10.0f} "
+            f"{rss:>8} {result['py_peak_kb'] / 1024:>7.1f}"
+        )
+
+    def _print_comparison(self, comparison, options):
+        regressions = [row for row in comparison if row['regression']]
+        self.stdout.write(f"Compared {len(comparison)} cases with {options['baseline']}:")
+        for row in comparison:
+            source, fixture, scale, backend = row['key']
+            memory = f", memory {row['memory_change']:+.0%}" if row['memory_change'] is not None else ''
+            line = (
+                f"  {source} {fixture} x{scale} {backend}: {row['baseline_cards_per_sec']:.0f} -> "
+                f"{row['cards_per_sec']:.0f} cards/s ({row['speed_change']:+.0%}{memory})"
+            )
+            self.stdout.write(self.style.ERROR(line) if row['regression'] else line)
+
+        if regressions:
+            message = f"{len(regressions)} regressions over {options['threshold']:.0%}"
+            if options['fail_on_regression']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS('No regressions'))
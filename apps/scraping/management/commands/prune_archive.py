@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.scraping.archive import archive_config, get_page_archive
+
+
+class Command(BaseCommand):
+    help = 'Apply the page archive retention (age and total size limits from PAGE_ARCHIVE)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age-days',
+            type=float,
+            help='Delete fetches older than this (default: PAGE_ARCHIVE max_age_days)',
+        )
+        parser.add_argument(
+            '--max-size-mb',
+            type=float,
+            help='Delete the oldest pages until the archive fits (default: PAGE_ARCHIVE max_size_mb)',
+        )
+
+    def handle(self, *args, **options):
+        archive = get_page_archive()
+        if archive is None:
+            raise CommandError('Page archive is disabled (PAGE_ARCHIVE) or zstandard is not installed')
+        config = archive_config()
+        max_age_days = options['max_age_days'] if options['max_age_days'] is not None else config['max_age_days']
+        max_size_mb = options['max_size_mb'] if options['max_size_mb'] is not None else config['max_size_mb']
+
+        removed = archive.prune(max_age_days, max_size_mb)
+        stats = archive.stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {removed['pages']} pages, {removed['blobs']} blobs ({removed['bytes'] / 1024 / 1024:.1f} MB); "
+            f"archive: {stats['pages']} pages of {stats['urls']} URLs, "
+            f"{stats['stored_size'] / 1024 / 1024:.1f} MB stored ({stats['size'] / 1024 / 1024:.1f} MB raw)"
+        ))
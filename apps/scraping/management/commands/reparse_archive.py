@@ -0,0 +1,94 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from apps.scraping.archive import ArchiveFetcher, get_page_archive
+from apps.scraping.ingestion import JobIngestionService
+from apps.scraping.pipeline import ParsePipeline
+
+# Источник архива -> (парсер страницы результатов, значения по умолчанию для ingestion)
+REPARSE_SOURCES = {
+    'cvkeskus': ('apps.scraping.scrapers.cvkeskus_scraper.parse_results_page', {'employment_type': 'full_time'}),
+    'cv_ee': ('apps.scraping.scrapers.cv_ee_selenium_scraper.parse_search_page', None),
+    'linkedin': ('apps.scraping.scrapers.linkedin_scraper.parse_search_page', None),
+}
+
+
+def _parse_day(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=dt_timezone.utc)
+    except ValueError:
+        raise CommandError(f"Invalid date {value!r}, expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = 'Re-run the current parsers over archived result pages and import the jobs (no refetching)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sources',
+            nargs='+',
+            choices=list(REPARSE_SOURCES),
+            help='Sources to reparse (default: all)',
+        )
+        parser.add_argument(
+            '--since',
+            help='Only pages fetched on or after this day (YYYY-MM-DD, UTC)',
+        )
+        parser.add_argument(
+            '--until',
+            help='Only pages fetched before this day (YYYY-MM-DD, UTC)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Parse processes (default: PARSE_PIPELINE, 0 - parse in this process)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only parse and report job counts, do not write to the database',
+        )
+
+    def handle(self, *args, **options):
+        archive = get_page_archive()
+        if archive is None:
+            raise CommandError('Page archive is disabled (PAGE_ARCHIVE) or zstandard is not installed')
+        since = _parse_day(options['since']) if options['since'] else None
+        until = _parse_day(options['until']) if options['until'] else None
+
+        for source in options['sources'] or list(REPARSE_SOURCES):
+            parser_path, defaults = REPARSE_SOURCES[source]
+            # Последняя загрузка каждого URL в интервале - старые снимки не перезаписывают новые
+            rows = archive.pages(source, since, until)
+            if not rows:
+                self.stdout.write(f"{source}: no archived pages")
+                continue
+
+            pipeline = ParsePipeline(
+                import_string(parser_path), ArchiveFetcher(archive, rows),
+                source_site=source, defaults=defaults, workers=options['workers'],
+            )
+            ingestion = JobIngestionService(source, defaults=defaults)
+            stats = {'new': 0, 'updated': 0, 'unchanged': 0, 'failed': 0, 'total': 0}
+            for page in pipeline.iter_pages([row['url'] for row in rows]):
+                if page['error']:
+                    self.stdout.write(self.style.WARNING(f"  {page['url']}: {page['error']}"))
+                    continue
+                if options['dry_run'] or not page['jobs']:
+                    continue
+                page_stats = ingestion.ingest(page['jobs'])
+                for key in stats:
+                    stats[key] += page_stats[key]
+
+            summary = (
+                f"{source}: {pipeline.stats['pages']} pages ({pipeline.stats['failed']} failed), "
+                f"{pipeline.stats['jobs']} jobs, {pipeline.stats['parse_seconds']:.2f}s parsing"
+            )
+            if not options['dry_run']:
+                summary += (
+                    f"; new {stats['new']}, updated {stats['updated']}, "
+                    f"unchanged {stats['unchanged']}, failed {stats['failed']}"
+                )
+            self.stdout.write(self.style.SUCCESS(summary))
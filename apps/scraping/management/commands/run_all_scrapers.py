@@ -1,5 +1,7 @@
-from django.core.management.base import BaseCommand
+from contextlib import nullcontext
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
+from apps.scraping.cassette import RECORD, REPLAY, use_cassette
 from apps.scraping.tasks import scrape_all_sources, calculate_job_scores, send_job_notifications
 import logging
 
@@ -24,8 +26,28 @@ class Command(BaseCommand):
             action='store_true',
             help='Skip job scoring calculation',
         )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Crawl every results page instead of stopping at already imported jobs',
+        )
+        cassette = parser.add_mutually_exclusive_group()
+        cassette.add_argument(
+            '--record',
+            metavar='DIR',
+            help='Record every HTTP response and browser page of the run into a cassette directory',
+        )
+        cassette.add_argument(
+            '--replay',
+            metavar='DIR',
+            help='Serve the run from a recorded cassette (no network, no Chrome)',
+        )
 
     def handle(self, *args, **options):
+        cassette_path = options['record'] or options['replay']
+        if cassette_path and options['async']:
+            raise CommandError('--record/--replay run the scrapers in this process, they cannot be used with --async')
+
         self.stdout.write(
             self.style.SUCCESS(f'Starting job scraping at {timezone.now()}')
         )
@@ -36,7 +58,7 @@ class Command(BaseCommand):
                 self.stdout.write('Running scrapers asynchronously...')
                 
                 # Запускаем парсинг
-                scrape_task = scrape_all_sources.delay()
+                scrape_task = scrape_all_sources.delay(incremental=not options['full'])
                 self.stdout.write(f'Scraping task started: {scrape_task.id}')
                 
                 # Запускаем расчет скоров
@@ -53,8 +75,15 @@ class Command(BaseCommand):
                 # Запускаем задачи синхронно
                 self.stdout.write('Running scrapers synchronously...')
                 
-                # Парсинг
-                scrape_result = scrape_all_sources()
+                # Парсинг (с кассетой - только в этом процессе, без Celery)
+                if cassette_path:
+                    mode = RECORD if options['record'] else REPLAY
+                    self.stdout.write(f'Cassette {cassette_path} ({mode})')
+                    cassette = use_cassette(cassette_path, mode)
+                else:
+                    cassette = nullcontext()
+                with cassette:
+                    scrape_result = scrape_all_sources(local=bool(cassette_path), incremental=not options['full'])
                 self.stdout.write(f'Scraping result: {scrape_result}')
                 
                 # Расчет скоров
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraping', '0007_job_details_fetched_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrapeRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('cvonline', 'CV Online'), ('cv_ee', 'CV.ee'), ('linkedin', 'LinkedIn'), ('other', 'Other')], max_length=50)),
+                ('query', models.CharField(blank=True, default='', max_length=255)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='running', max_length=20)),
+                ('cursor', models.JSONField(default=dict)),
+                ('seen_ids', models.JSONField(default=list)),
+                ('stats', models.JSONField(default=dict)),
+                ('attempts', models.PositiveIntegerField(default=1)),
+                ('finished_early', models.BooleanField(default=False)),
+                ('error', models.TextField(blank=True, default='')),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Scrape Run',
+                'verbose_name_plural': 'Scrape Runs',
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['source', 'query', 'status'], name='scraping_sc_source_83b6cd_idx')],
+            },
+        ),
+    ]
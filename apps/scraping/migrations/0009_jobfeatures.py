@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraping', '0008_scraperun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobFeatures',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(blank=True, default='', max_length=64)),
+                ('tokens', models.JSONField(default=list)),
+                ('keywords', models.JSONField(default=list)),
+                ('requirement_keywords', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('job', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='features', to='scraping.job')),
+            ],
+            options={
+                'verbose_name': 'Job Features',
+                'verbose_name_plural': 'Job Features',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraping', '0009_jobfeatures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobscore',
+            name='content_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='jobscore',
+            name='freshness_score',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('scraping', '0010_jobscore_content_freshness'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserJobMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.IntegerField(default=0)),
+                ('rank', models.PositiveIntegerField(default=0)),
+                ('matched_skills', models.JSONField(default=list)),
+                ('calculated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_matches', to='scraping.job')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='job_matches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Job Match',
+                'verbose_name_plural': 'User Job Matches',
+                'ordering': ['user', 'rank'],
+                'indexes': [models.Index(fields=['user', 'rank'], name='scraping_us_user_id_433cc0_idx')],
+                'unique_together': {('user', 'job')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraping', '0011_userjobmatch'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='source_site',
+            field=models.CharField(choices=[('cvonline', 'CV Online'), ('cv_ee', 'CV.ee'), ('linkedin', 'LinkedIn'), ('cvkeskus', 'CV Keskus'), ('other', 'Other')], default='other', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='scraper',
+            name='source',
+            field=models.CharField(choices=[('cvonline', 'CV Online'), ('cv_ee', 'CV.ee'), ('linkedin', 'LinkedIn'), ('cvkeskus', 'CV Keskus'), ('other', 'Other')], max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='scraperun',
+            name='source',
+            field=models.CharField(choices=[('cvonline', 'CV Online'), ('cv_ee', 'CV.ee'), ('linkedin', 'LinkedIn'), ('cvkeskus', 'CV Keskus'), ('other', 'Other')], max_length=50),
+        ),
+    ]
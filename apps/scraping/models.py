@@ -124,6 +124,7 @@ class Job(models.Model):
         ('cvonline', 'CV Online'),
         ('cv_ee', 'CV.ee'),
         ('linkedin', 'LinkedIn'),
+        ('cvkeskus', 'CV Keskus'),
         ('other', 'Other'),
     ]
     
@@ -148,6 +149,10 @@ class Job(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    # sha256 от нормализованных полей, полученных со страницы источника
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    # Когда последний раз загружалась страница вакансии (полное описание и пр.)
+    details_fetched_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         verbose_name = 'Job'
@@ -157,6 +162,29 @@ class Job(models.Model):
     def __str__(self):
         return f"{self.title} at {self.company_name}"
 
+class JobFeatures(models.Model):
+    """
+    Предрасчитанные признаки текста вакансии (apps/scraping/job_features.py):
+    слова и найденные ключевые слова, чтобы скоринг, уведомления и аналитика
+    не разбирали title + description + requirements заново.
+    """
+    job = models.OneToOneField(Job, on_delete=models.CASCADE, related_name='features')
+    # sha256 от текстов и словаря ключевых слов - признаки пересчитываются, только если он изменился
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+    # Множество слов title + description + requirements (в нижнем регистре)
+    tokens = models.JSONField(default=list)
+    # Ключевые слова JobScoringService, найденные в title + description и в requirements
+    keywords = models.JSONField(default=list)
+    requirement_keywords = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Job Features'
+        verbose_name_plural = 'Job Features'
+
+    def __str__(self):
+        return f"Features for job #{self.job_id}"
+
 # Обновленная модель JobScore согласно плану MVP
 class JobScore(models.Model):
     job = models.OneToOneField(Job, on_delete=models.CASCADE, related_name='jobscore')
@@ -164,6 +192,11 @@ class JobScore(models.Model):
     skill_match_score = models.IntegerField(default=0)  # 0-100  
     salary_score = models.IntegerField(default=0)  # 0-100
     location_score = models.IntegerField(default=0)  # 0-100
+    # relevance_score = content_score + freshness_score * 0.2: содержимая часть считается
+    # при изменении вакансии, свежесть обновляется отдельно (scoring.update_freshness)
+    # None - скор посчитан до разделения, calculate_job_scores пересчитает его
+    content_score = models.FloatField(null=True, blank=True)  # 0-80
+    freshness_score = models.IntegerField(default=0)  # 0-100
     calculated_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -193,6 +226,26 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"Profile for {self.user.username}"
 
+class UserJobMatch(models.Model):
+    """Персональный скор вакансии для пользователя: top-K по UserProfile (apps/scraping/personalization.py)"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='job_matches')
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='user_matches')
+    score = models.IntegerField(default=0)  # 0-100
+    rank = models.PositiveIntegerField(default=0)  # 1 - лучшая вакансия пользователя
+    # Навыки профиля, найденные в вакансии
+    matched_skills = models.JSONField(default=list)
+    calculated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'User Job Match'
+        verbose_name_plural = 'User Job Matches'
+        ordering = ['user', 'rank']
+        unique_together = ('user', 'job')
+        indexes = [models.Index(fields=['user', 'rank'])]
+
+    def __str__(self):
+        return f"{self.user} - {self.job.title}: {self.score}"
+
 # Новая модель Application для трекинга откликов согласно плану MVP  
 class Application(models.Model):
     STATUS_CHOICES = [
@@ -340,4 +393,36 @@ class Scraper(models.Model):
                 return jobs[:limit] if jobs else []
             return []
         except Exception as e:
-            return {'error': str(e)}
\ No newline at end of file
+            return {'error': str(e)}
+
+class ScrapeRun(models.Model):
+    """Один запуск скрапера по источнику и запросу: курсор страниц для продолжения после сбоя"""
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    source = models.CharField(max_length=50, choices=Job.SOURCE_SITES)
+    query = models.CharField(max_length=255, blank=True, default='')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    # {'pages': [URL страниц результатов, вакансии которых уже записаны]}
+    cursor = models.JSONField(default=dict)
+    # URL вакансий, найденных запуском (новые первыми) - граница следующего запуска
+    seen_ids = models.JSONField(default=list)
+    stats = models.JSONField(default=dict)
+    attempts = models.PositiveIntegerField(default=1)
+    finished_early = models.BooleanField(default=False)
+    error = models.TextField(blank=True, default='')
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Scrape Run'
+        verbose_name_plural = 'Scrape Runs'
+        ordering = ['-started_at']
+        indexes = [models.Index(fields=['source', 'query', 'status'])]
+
+    def __str__(self):
+        return f"{self.source} run #{self.pk} ({self.status})"
@@ -0,0 +1,12 @@
+def init_parse_worker():
+    """
+    Инициализатор процесса разбора ParsePipeline.
+
+    Отдельный модуль без импорта моделей: с forkserver/spawn воркер
+    загружает инициализатор до django.setup(), а импорт pipeline.py
+    потянул бы модели и упал с AppRegistryNotReady.
+    """
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
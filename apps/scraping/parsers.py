@@ -1,10 +1,12 @@
 import requests
 import codecs
-from bs4 import BeautifulSoup as BS
 from random import randint
 
+from .fetcher import AsyncFetcher
+from .html_parser import parse_html
 
-__all__ = ('work', 'rabota', 'dou', 'djinni')
+
+__all__ = ('work', 'rabota', 'dou', 'djinni', 'run_parsers')
 
 headers = [{'User-Agent': 'Mozilla/5.0 (Windows NT 5.1; rv:47.0) Gecko/20100101 Firefox/47.0',
             'Accept':'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'},
@@ -15,15 +17,37 @@ headers = [{'User-Agent': 'Mozilla/5.0 (Windows NT 5.1; rv:47.0) Gecko/20100101
            ]
 
 
+def _get_page(url, prefetched=None):
+    """Страница уже загружена run_parsers() или качаем ее как раньше"""
+    if prefetched is not None:
+        return prefetched.status, prefetched.content
+    resp = requests.get(url, headers=headers[randint(0, 2)])
+    return resp.status_code, resp.content
+
+
+def run_parsers(parsers):
+    """
+    Скачивает страницы всех парсеров параллельно через AsyncFetcher и разбирает их.
+    :param parsers: пары (функция-парсер, url)
+    """
+    fetcher = AsyncFetcher(headers=headers[randint(0, 2)])
+    pages = fetcher.fetch_all([url for func, url in parsers])
+    jobs, errors = [], []
+    for (func, url), page in zip(parsers, pages):
+        j, e = func(url, prefetched=page)
+        jobs += j
+        errors += e
+    return jobs, errors
+
 
-def work(url):
+def work(url, prefetched=None):
     jobs = []
     errors = []
     domain = 'https://www.work.ua'
     url = 'https://www.work.ua/ru/jobs-kyiv-python/'
-    resp = requests.get(url, headers=headers[randint(0, 2)])
-    if resp.status_code == 200:
-        soup = BS(resp.content, 'html.parser')
+    status_code, content = _get_page(url, prefetched)
+    if status_code == 200:
+        soup = parse_html(content)
         main_div = soup.find('div', id='pjax-job-list')
         if main_div:
             div_list = main_div.find_all('div', attrs={'class': 'job-link'})
@@ -45,13 +69,13 @@ def work(url):
     return jobs, errors
 
 
-def rabota(url):
+def rabota(url, prefetched=None):
     jobs = []
     errors = []
     domain = 'https://rabota.ua'
-    resp = requests.get(url, headers=headers[randint(0, 2)])
-    if resp.status_code == 200:
-        soup = BS(resp.content, 'html.parser')
+    status_code, content = _get_page(url, prefetched)
+    if status_code == 200:
+        soup = parse_html(content)
         new_jobs = soup.find('div', attrs={'class': 'f-vacancylist-newnotfound'})
         if not new_jobs:
             table = soup.find('table', id='ctl00_content_vacancyList_gridList')
@@ -78,13 +102,13 @@ def rabota(url):
 
     return jobs, errors
 
-def dou(url):
+def dou(url, prefetched=None):
     jobs = []
     errors = []
 #    domain = 'https://www.work.ua'
-    resp = requests.get(url, headers=headers[randint(0, 2)])
-    if resp.status_code == 200:
-        soup = BS(resp.content, 'html.parser')
+    status_code, content = _get_page(url, prefetched)
+    if status_code == 200:
+        soup = parse_html(content)
         main_div = soup.find('div', id='vacancyListId')
         if main_div:
             li_list = main_div.find_all('li', attrs={'class': 'l-vacancy'})
@@ -107,13 +131,13 @@ def dou(url):
     return jobs, errors
 
 
-def djinni(url):
+def djinni(url, prefetched=None):
     jobs = []
     errors = []
     domain = 'https://djinni.co'
-    resp = requests.get(url, headers=headers[randint(0, 2)])
-    if resp.status_code == 200:
-        soup = BS(resp.content, 'html.parser')
+    status_code, content = _get_page(url, prefetched)
+    if status_code == 200:
+        soup = parse_html(content)
         main_ul = soup.find('ul', attrs={'class': 'list-jobs'})
         if main_ul:
             li_list = main_ul.find_all('li', attrs={'class': 'list-jobs__item'})
@@ -0,0 +1,263 @@
+import logging
+import time
+from typing import Dict, Iterable, Iterator, List, Set
+
+import numpy as np
+from scipy import sparse
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .job_features import match_skills, other_keywords, refresh_job_features
+from .keyword_matcher import get_matcher
+from .models import Job, JobFeatures, UserJobMatch, UserProfile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PERSONALIZATION_CONFIG = {
+    # Сколько лучших вакансий хранится на пользователя
+    'top_k': 200,
+    # Вакансий в одном произведении матриц
+    'job_batch_size': 5000,
+    # Пользователей в одной матрице профилей
+    'user_batch_size': 500,
+    # score = доля навыков профиля в вакансии * skill_weight + relevance_score / 100 * relevance_weight
+    'skill_weight': 70,
+    'relevance_weight': 30,
+}
+
+JOB_FIELDS = (
+    'id', 'salary_min', 'location', 'is_remote', 'jobscore__relevance_score',
+    'features__keywords', 'features__requirement_keywords',
+)
+TEXT_FIELDS = ('title', 'description', 'requirements')
+
+
+def personalization_config() -> Dict:
+    config = dict(DEFAULT_PERSONALIZATION_CONFIG)
+    config.update(getattr(settings, 'PERSONALIZATION', {}))
+    return config
+
+
+def profile_skills(profile: UserProfile) -> List[str]:
+    """Навыки профиля (как в NotificationService.filter_jobs_for_user)"""
+    return [skill.strip().lower() for skill in (profile.skills or '').split(',') if skill.strip()]
+
+
+class UserJobMatcher:
+    """
+    Персональные скоры вакансий для группы пользователей.
+
+    Навыки профилей и найденные в вакансиях навыки (JobFeatures) кодируются
+    разреженными матрицами пользователи x навыки и вакансии x навыки; доля
+    навыков профиля, найденных в каждой вакансии, считается одним
+    произведением матриц на батч вакансий. Фильтры профиля (min_salary,
+    location_preference) применяются масками NumPy, а лучшие top_k вакансий
+    пользователя накапливаются через argpartition и пишутся в UserJobMatch.
+    """
+
+    def __init__(self, profiles: Iterable[UserProfile], top_k: int = None, batch_size: int = None):
+        config = personalization_config()
+        self.top_k = top_k or config['top_k']
+        self.batch_size = batch_size or config['job_batch_size']
+        self.skill_weight = config['skill_weight']
+        self.relevance_weight = config['relevance_weight']
+        self.profiles = list(profiles)
+        self.skills = [profile_skills(profile) for profile in self.profiles]
+        self.matcher = get_matcher(skill for skills in self.skills for skill in skills)
+
+        # Пользователи x навыки: 1 / число навыков, чтобы произведение давало долю найденных
+        rows, columns = [], []
+        for row, skills in enumerate(self.skills):
+            indices = {self.matcher.index[' '.join(skill.split())] for skill in skills}
+            rows.extend([row] * len(indices))
+            columns.extend(indices)
+        self.skill_counts = np.bincount(rows, minlength=len(self.profiles)).astype(float)
+        self.users = sparse.csr_matrix(
+            (1 / self.skill_counts[rows], (rows, columns)),
+            shape=(len(self.profiles), max(len(self.matcher), 1)),
+        )
+        self.min_salary = np.array([profile.min_salary or 0 for profile in self.profiles])
+        self.locations = {}
+        for row, profile in enumerate(self.profiles):
+            preference = (profile.location_preference or '').strip().lower()
+            if preference:
+                self.locations.setdefault(preference, []).append(row)
+
+        self.best_scores = np.empty((len(self.profiles), 0))
+        self.best_ids = np.empty((len(self.profiles), 0), dtype=np.int64)
+        self.job_skills: Dict[int, Set[str]] = {}
+
+    def iter_batches(self, jobs) -> Iterator[List[Dict]]:
+        # Множество слов нужно только для слов не из словаря признаков, тексты - для таких фраз
+        words, phrases = other_keywords(self.matcher)
+        fields = JOB_FIELDS + (('features__tokens',) if words else ()) + (TEXT_FIELDS if phrases else ())
+        batch = []
+        for row in jobs.values(*fields).iterator(chunk_size=self.batch_size):
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def job_vectors(self, rows: List[Dict]) -> sparse.csr_matrix:
+        """Вакансии x навыки: 1, если навык профилей найден в вакансии"""
+        matrix_rows, columns = [], []
+        for row_index, row in enumerate(rows):
+            if row['features__keywords'] is None:
+                continue
+            features = JobFeatures(
+                keywords=row['features__keywords'],
+                requirement_keywords=row['features__requirement_keywords'],
+                tokens=row.get('features__tokens') or [],
+            )
+            text = ' '.join(row[field] or '' for field in TEXT_FIELDS) if 'title' in row else None
+            found = match_skills(features, self.matcher, text)
+            if found:
+                self.job_skills[row['id']] = found
+                matrix_rows.extend([row_index] * len(found))
+                columns.extend(self.matcher.index[keyword] for keyword in found)
+        return sparse.csr_matrix(
+            (np.ones(len(columns)), (matrix_rows, columns)),
+            shape=(len(rows), self.users.shape[1]),
+        )
+
+    def score_batch(self, rows: List[Dict]) -> np.ndarray:
+        """Скоры пользователи x вакансии батча; -1 - вакансия не проходит фильтры профиля"""
+        skill_share = (self.users @ self.job_vectors(rows).T).toarray()
+        relevance = np.array([row['jobscore__relevance_score'] or 0 for row in rows]) / 100
+        scores = np.floor(skill_share * self.skill_weight + relevance[None, :] * self.relevance_weight)
+
+        # Как filter_jobs_for_user: при заданных навыках нужен хотя бы один из них
+        allowed = (self.skill_counts[:, None] == 0) | (skill_share > 0)
+        salary = np.array([row['salary_min'] or 0 for row in rows])
+        allowed &= ~(
+            (self.min_salary[:, None] > 0) & (salary[None, :] > 0) & (salary[None, :] < self.min_salary[:, None])
+        )
+        if self.locations:
+            remote = np.array([bool(row['is_remote']) for row in rows])
+            locations = [(row['location'] or '').lower() for row in rows]
+            for preference, users in self.locations.items():
+                suitable = remote | np.array([preference in location for location in locations])
+                allowed[users] &= suitable[None, :]
+        return np.where(allowed, scores, -1)
+
+    def add_batch(self, rows: List[Dict]):
+        """Слить скоры батча с накопленными top_k каждого пользователя"""
+        scores = np.hstack([self.best_scores, self.score_batch(rows)])
+        ids = np.hstack([
+            self.best_ids,
+            np.broadcast_to(np.array([row['id'] for row in rows], dtype=np.int64), (len(self.profiles), len(rows))),
+        ])
+        if scores.shape[1] > self.top_k:
+            top = np.argpartition(-scores, self.top_k - 1, axis=1)[:, :self.top_k]
+            scores = np.take_along_axis(scores, top, axis=1)
+            ids = np.take_along_axis(ids, top, axis=1)
+        self.best_scores, self.best_ids = scores, ids
+
+    def matches(self) -> List[UserJobMatch]:
+        calculated_at = timezone.now()
+        matches = []
+        for row, profile in enumerate(self.profiles):
+            skills = {' '.join(skill.split()) for skill in self.skills[row]}
+            # Лучший скор первым, при равенстве - более новая вакансия
+            order = np.lexsort((-self.best_ids[row], -self.best_scores[row]))
+            rank = 0
+            for column in order:
+                score = self.best_scores[row, column]
+                if score < 0:
+                    break
+                rank += 1
+                job_id = int(self.best_ids[row, column])
+                matches.append(UserJobMatch(
+                    user_id=profile.user_id,
+                    job_id=job_id,
+                    score=int(min(100, score)),
+                    rank=rank,
+                    matched_skills=sorted(skills & self.job_skills.get(job_id, set())),
+                    calculated_at=calculated_at,
+                ))
+        return matches
+
+    def rank(self, jobs) -> int:
+        """Накопить top_k вакансий из jobs для каждого пользователя группы (без записи)"""
+        count = 0
+        if self.profiles:
+            for rows in self.iter_batches(jobs.order_by()):
+                self.add_batch(rows)
+                count += len(rows)
+        return count
+
+    def calculate(self, jobs=None) -> Dict[str, int]:
+        """
+        Посчитать и записать top_k вакансий каждого пользователя группы
+        (старые строки пользователей заменяются).
+        :return: {'users', 'jobs', 'matches'}
+        """
+        jobs = Job.objects.filter(is_active=True) if jobs is None else jobs
+        stats = {'users': len(self.profiles), 'jobs': self.rank(jobs), 'matches': 0}
+        matches = self.matches()
+        with transaction.atomic():
+            UserJobMatch.objects.filter(user_id__in=[profile.user_id for profile in self.profiles]).delete()
+            UserJobMatch.objects.bulk_create(matches, batch_size=2000)
+        stats['matches'] = len(matches)
+        return stats
+
+
+def calculate_user_matches(user_ids: List[int] = None) -> Dict[str, float]:
+    """
+    Пересчитать UserJobMatch для всех профилей (или user_ids) группами по user_batch_size.
+    :return: {'users', 'matches', 'seconds'}
+    """
+    started = time.monotonic()
+    # Признаки нужны всем активным вакансиям - досчитываем пропущенные
+    refresh_job_features(Job.objects.filter(is_active=True))
+
+    profiles = UserProfile.objects.order_by('id')
+    if user_ids is not None:
+        profiles = profiles.filter(user_id__in=user_ids)
+    profiles = list(profiles)
+
+    group_size = personalization_config()['user_batch_size']
+    stats = {'users': 0, 'matches': 0}
+    for start in range(0, len(profiles), group_size):
+        group = profiles[start:start + group_size]
+        try:
+            group_stats = UserJobMatcher(group).calculate()
+            stats['users'] += group_stats['users']
+            stats['matches'] += group_stats['matches']
+        except Exception as e:
+            logger.error(f"Error calculating job matches for {len(group)} users: {str(e)}")
+    stats['seconds'] = round(time.monotonic() - started, 2)
+    logger.info(f"User job matches: {stats['matches']} for {stats['users']} users in {stats['seconds']}s")
+    return stats
+
+
+def match_new_jobs(profiles: Iterable[UserProfile], jobs) -> Dict[int, List[Job]]:
+    """
+    Вакансии jobs, подходящие каждому профилю, лучшие первыми: {user_id: [Job]}.
+    Считается по всем jobs без ограничения top_k и без записи в UserJobMatch -
+    для уведомлений о новых вакансиях, которые могли не попасть в сохраненный top_k.
+    """
+    profiles = list(profiles)
+    job_count = jobs.count()
+    matched_ids: Dict[int, List[int]] = {}
+    if not profiles or not job_count:
+        return {}
+    refresh_job_features(jobs)
+
+    group_size = personalization_config()['user_batch_size']
+    for start in range(0, len(profiles), group_size):
+        matcher = UserJobMatcher(profiles[start:start + group_size], top_k=job_count)
+        matcher.rank(jobs)
+        for match in matcher.matches():
+            matched_ids.setdefault(match.user_id, []).append(match.job_id)
+
+    by_id = Job.objects.select_related('jobscore').in_bulk(
+        {job_id for job_ids in matched_ids.values() for job_id in job_ids}
+    )
+    return {
+        user_id: [by_id[job_id] for job_id in job_ids if job_id in by_id]
+        for user_id, job_ids in matched_ids.items()
+    }
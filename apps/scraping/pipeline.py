@@ -0,0 +1,206 @@
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+
+from .ingestion import normalize_job_data
+from .parse_worker import init_parse_worker
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PIPELINE_CONFIG = {
+    'workers': None,  # процессов разбора; None - по числу ядер минус одно, 0 - разбор в текущем процессе
+    'queue_size': 16,  # сколько страниц может загружаться или ждать разбора одновременно
+}
+
+
+def pipeline_config() -> Dict:
+    config = dict(DEFAULT_PIPELINE_CONFIG)
+    config.update(getattr(settings, 'PARSE_PIPELINE', {}))
+    return config
+
+
+def parse_page(parser: Callable[[str], List[Dict]], url: str, content: bytes, encoding: str = None,
+               source_site: str = None, defaults: Dict = None) -> Dict:
+    """
+    Разбор одной загруженной страницы (выполняется в процессе-воркере).
+
+    parser - функция уровня модуля (передается в воркер по имени), HTML ->
+    список вакансий. Если задан source_site, вакансии сразу нормализуются в
+    поля Job (normalize_job_data), невалидные отбрасываются.
+    """
+    started = time.perf_counter()
+    jobs = parser(content.decode(encoding or 'utf-8', errors='replace'))
+    parsed = len(jobs)
+    if source_site:
+        jobs = [row for row in (normalize_job_data(job, source_site, defaults) for job in jobs) if row]
+    return {
+        'url': url,
+        'jobs': jobs,
+        'parsed': parsed,
+        'error': None,
+        'parse_seconds': round(time.perf_counter() - started, 4),
+        'pid': os.getpid(),
+    }
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def default_workers() -> int:
+    workers = pipeline_config()['workers']
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) - 1)
+    if workers and multiprocessing.current_process().daemon:
+        # Из демонического процесса (например, prefork-воркер) дочерние процессы не создать
+        logger.warning("Parse workers are not available in a daemonic process, parsing inline")
+        return 0
+    return workers
+
+
+def _pool_context():
+    """
+    forkserver (spawn, где его нет): пул создается лениво, когда в процессе
+    уже работают потоки (scrape_all_sources, цикл AsyncFetcher, прогрев
+    браузеров), а fork такого процесса может оставить воркер навсегда
+    заблокированным на чужом локе (logging, драйвер БД).
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def get_parse_executor(workers: int) -> ProcessPoolExecutor:
+    """Пул процессов разбора на процесс (создается при первом использовании)"""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=_pool_context(), initializer=init_parse_worker
+            )
+            _executor_workers = workers
+            logger.info(f"Started parse pool with {workers} workers")
+        return _executor
+
+
+def _reset_parse_executor(broken: ProcessPoolExecutor):
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def shutdown_parse_executor():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ParsePipeline:
+    """
+    Двухстадийный конвейер: загрузка -> разбор.
+
+    Страницы грузит AsyncFetcher (asyncio, свои лимиты на хост), сырые байты
+    попадают в ограниченную очередь (queue_size: загружаются + ждут разбора),
+    а разбирают их процессы ProcessPoolExecutor - разбор HTML идет на всех
+    ядрах и не ждет сети, загрузка не ждет разбора. Готовые страницы
+    отдаются в порядке завершения, чтобы сразу писать их в БД.
+    """
+
+    def __init__(self, parser: Callable[[str], List[Dict]], fetcher, source_site: str = None,
+                 defaults: Dict = None, workers: int = None, queue_size: int = None, archive: str = None,
+                 cache: str = None):
+        self.parser = parser
+        self.fetcher = fetcher
+        self.archive = archive  # источник для архива сырых страниц (apps/scraping/archive.py)
+        self.cache = cache  # политика HTTP-кэша (apps/scraping/http_cache.py)
+        self.source_site = source_site
+        self.defaults = defaults
+        self.workers = default_workers() if workers is None else workers
+        self.queue_size = queue_size or pipeline_config()['queue_size']
+        # Страниц в пуле одновременно: хватает, чтобы воркеры не простаивали
+        self.max_in_flight = max(1, 2 * self.workers)
+        self.stats = {'pages': 0, 'failed': 0, 'jobs': 0, 'parse_seconds': 0.0}
+
+    def iter_pages(self, urls: Iterable[str]) -> Iterator[Dict]:
+        """
+        Загрузить и разобрать страницы.
+        :return: генератор {'url', 'jobs', 'error', ...} по одной странице
+        """
+        pending = {}
+        fetched = self.fetcher.iter_fetched(
+            list(urls), max_pending=self.queue_size, archive=self.archive, cache=self.cache
+        )
+        try:
+            for result in fetched:
+                if not result.ok:
+                    yield self._record({'url': result.url, 'jobs': [], 'error': result.error or f"HTTP {result.status}"})
+                    continue
+                args = (self.parser, result.url, result.content, result.encoding, self.source_site, self.defaults)
+                if not self.workers:
+                    yield self._record(self._parse_inline(args))
+                    continue
+                executor = get_parse_executor(self.workers)
+                try:
+                    pending[executor.submit(parse_page, *args)] = (args, executor)
+                except (BrokenProcessPool, RuntimeError) as e:
+                    logger.error(f"Parse pool is unavailable ({e}), parsing inline")
+                    yield self._record(self._parse_inline(args))
+                    continue
+
+                # Пул занят - ждем, пока освободится воркер (загрузка тем временем упрется в очередь)
+                if len(pending) >= self.max_in_flight:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                else:
+                    done = [future for future in pending if future.done()]
+                for future in done:
+                    yield self._record(self._collect(future, pending.pop(future)))
+
+            for future in as_completed(list(pending)):
+                yield self._record(self._collect(future, pending.pop(future)))
+        finally:
+            fetched.close()
+            for future in pending:
+                future.cancel()
+
+    def _collect(self, future, submitted) -> Dict:
+        args, executor = submitted
+        try:
+            return future.result()
+        except BrokenProcessPool as e:
+            # Воркер упал (например, по памяти) - пул пересоздается при следующей странице
+            logger.error(f"Parse worker died ({e}), parsing {args[1]} inline")
+            _reset_parse_executor(executor)
+            return self._parse_inline(args)
+        except Exception as e:
+            logger.error(f"Error parsing {args[1]}: {str(e)}")
+            return {'url': args[1], 'jobs': [], 'error': str(e)}
+
+    def _parse_inline(self, args) -> Dict:
+        try:
+            return parse_page(*args)
+        except Exception as e:
+            logger.error(f"Error parsing {args[1]}: {str(e)}")
+            return {'url': args[1], 'jobs': [], 'error': str(e)}
+
+    def _record(self, page: Dict) -> Dict:
+        self.stats['pages'] += 1
+        if page.get('error'):
+            self.stats['failed'] += 1
+        self.stats['jobs'] += len(page['jobs'])
+        self.stats['parse_seconds'] += page.get('parse_seconds', 0.0)
+        return page
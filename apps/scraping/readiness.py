@@ -0,0 +1,142 @@
+import logging
+import time
+from typing import Callable, Dict, List
+
+from django.conf import settings
+from selenium.common.exceptions import (
+    JavascriptException, StaleElementReferenceException, TimeoutException, WebDriverException,
+)
+from selenium.webdriver.support.ui import WebDriverWait
+
+logger = logging.getLogger(__name__)
+
+# Таймауты по условиям (секунды), переопределяются через settings.READINESS_TIMEOUTS
+DEFAULT_TIMEOUTS = {
+    'document_ready': 15,
+    'next_data': 15,
+    'element_count': 15,
+    'scroll_end': 20,
+    'url_change': 10,
+    'element_gone': 5,
+}
+
+POLL_INTERVAL = 0.2
+
+COUNT_JS = "return document.querySelectorAll(arguments[0]).length;"
+SCROLL_DOWN_JS = (
+    "if (document.body) { window.scrollTo(0, document.body.scrollHeight); }"
+    "return document.body ? document.body.scrollHeight : 0;"
+)
+NEXT_DATA_JS = (
+    "var el = document.getElementById('__NEXT_DATA__');"
+    "return !!(el && el.textContent && el.textContent.length > 2);"
+)
+
+
+class PageReadiness:
+    """
+    Ожидание готовности страницы по событиям DOM вместо фиксированных time.sleep.
+
+    Каждое условие ждется не дольше своего таймаута (DEFAULT_TIMEOUTS /
+    READINESS_TIMEOUTS), фактическое время ожидания записывается в timings,
+    так что время страницы определяется реальной задержкой сайта. Методы
+    возвращают True/False и не бросают TimeoutException - скрапер просто
+    продолжает с тем, что успело загрузиться.
+    """
+
+    def __init__(self, driver, timeouts: Dict[str, float] = None, poll: float = POLL_INTERVAL):
+        self.driver = driver
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        self.timeouts.update(getattr(settings, 'READINESS_TIMEOUTS', {}))
+        self.timeouts.update(timeouts or {})
+        self.poll = poll
+        self.timings: List[Dict] = []
+
+    def _wait(self, condition: str, predicate: Callable, timeout: float = None, detail: str = '') -> bool:
+        timeout = self.timeouts[condition] if timeout is None else timeout
+        started = time.monotonic()
+        try:
+            WebDriverWait(
+                self.driver, timeout, poll_frequency=self.poll,
+                # Во время навигации скрипты/элементы могут временно "исчезать"
+                ignored_exceptions=(JavascriptException, StaleElementReferenceException),
+            ).until(predicate)
+            ok = True
+        except TimeoutException:
+            ok = False
+        elapsed = round(time.monotonic() - started, 3)
+        self.timings.append({'condition': condition, 'detail': detail, 'seconds': elapsed, 'ok': ok})
+        if ok:
+            logger.debug(f"Ready: {condition} {detail} in {elapsed}s")
+        else:
+            logger.warning(f"Timed out waiting for {condition} {detail} after {elapsed}s")
+        return ok
+
+    def document_ready(self, timeout: float = None) -> bool:
+        """document.readyState == 'complete'"""
+        return self._wait(
+            'document_ready',
+            lambda d: d.execute_script('return document.readyState') == 'complete',
+            timeout,
+        )
+
+    def next_data(self, timeout: float = None) -> bool:
+        """Скрипт __NEXT_DATA__ присутствует и не пустой"""
+        return self._wait('next_data', lambda d: d.execute_script(NEXT_DATA_JS), timeout)
+
+    def element_count_stable(self, css_selector: str, min_count: int = 1, stable_for: float = 0.6,
+                             timeout: float = None) -> bool:
+        """
+        Количество элементов по селектору >= min_count и не менялось stable_for секунд
+        (список вакансий догружен).
+        """
+        state = {'count': -1, 'since': time.monotonic()}
+
+        def stable(driver):
+            count = driver.execute_script(COUNT_JS, css_selector)
+            now = time.monotonic()
+            if count != state['count']:
+                state['count'], state['since'] = count, now
+                return False
+            return count >= min_count and now - state['since'] >= stable_for
+
+        return self._wait('element_count', stable, timeout, detail=css_selector)
+
+    def scroll_to_end(self, idle: float = 0.8, timeout: float = None) -> bool:
+        """
+        Прокручиваем вниз, пока scrollHeight растет (lazy loading);
+        готово, когда высота не менялась idle секунд.
+        """
+        state = {'height': -1, 'since': time.monotonic()}
+
+        def settled(driver):
+            height = driver.execute_script(SCROLL_DOWN_JS)
+            now = time.monotonic()
+            if height != state['height']:
+                state['height'], state['since'] = height, now
+                return False
+            return now - state['since'] >= idle
+
+        return self._wait('scroll_end', settled, timeout)
+
+    def url_changed(self, old_url: str, timeout: float = None) -> bool:
+        """Переход на другую страницу (в т.ч. клиентская навигация Next.js)"""
+        return self._wait('url_change', lambda d: d.current_url != old_url, timeout)
+
+    def element_gone(self, element, timeout: float = None) -> bool:
+        """Элемент скрыт или удален из DOM (например, баннер cookies после клика)"""
+        def gone(driver):
+            try:
+                return not element.is_displayed()
+            except WebDriverException:
+                return True
+
+        return self._wait('element_gone', gone, timeout)
+
+    def total_wait(self) -> float:
+        return round(sum(timing['seconds'] for timing in self.timings), 3)
+
+    def summary(self) -> str:
+        return ', '.join(
+            f"{t['condition']}={t['seconds']}s{'' if t['ok'] else ' (timeout)'}" for t in self.timings
+        )
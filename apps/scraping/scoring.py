@@ -0,0 +1,286 @@
+import logging
+import time
+from datetime import timedelta
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, IntegerField
+from django.db.models.functions import Cast, Floor
+from django.utils import timezone
+
+from .models import Job, JobScore
+from .services import JobScoringService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCORING_CHUNK_SIZE = 2000
+
+# Колонки Job, которые нужны для расчета всех четырех скоров
+SCORING_FIELDS = (
+    'id', 'title', 'description', 'requirements', 'experience_level', 'created_at',
+    'salary_min', 'location', 'is_remote', 'company_name',
+    # Предрасчитанные ключевые слова (JobFeatures); None - признаков еще нет
+    'features__keywords', 'features__requirement_keywords',
+)
+
+# Пороги зарплат по уровню (как в JobScoringService.calculate_salary_score)
+SALARY_RANGES = {
+    'junior': (1500, 3000),
+    'middle': (3000, 5000),
+    'senior': (5000, 8000),
+}
+DEFAULT_SALARY_RANGE = (2000, 4000)
+
+# Порядок важен: побеждает первая найденная локация
+LOCATION_SCORES = (
+    ('tallinn', 100),
+    ('tartu', 90),
+    ('estonia', 85),
+    ('remote', 95),
+    ('hybrid', 90),
+)
+
+# Свежесть: возраст в днях <= порога -> скор
+FRESHNESS_BUCKETS = (1, 7, 14, 30)
+FRESHNESS_SCORES = (100, 90, 70, 50, 30)
+
+
+class BatchJobScorer:
+    """
+    Векторный расчет JobScore для тысяч вакансий сразу.
+
+    Дает те же значения, что JobScoringService, но вместо четырех
+    вызовов на вакансию: нужные колонки загружаются чанками через
+    values(), найденные ключевые слова (JobFeatures) собираются в матрицы
+    (вакансии x ключевые слова), а зарплата, свежесть и полнота считаются операциями
+    NumPy над всем чанком. Каждый чанк пишется одним
+    bulk_create(update_conflicts=True) по job.
+    """
+
+    def __init__(self, chunk_size: int = None, now=None):
+        self.chunk_size = chunk_size or getattr(settings, 'SCORING_CHUNK_SIZE', DEFAULT_SCORING_CHUNK_SIZE)
+        self.now = now
+        tech = JobScoringService.TECH_KEYWORDS
+        self.tech_keywords = [keyword for keywords in tech.values() for keyword in keywords]
+        # Номер категории для каждой колонки матрицы технологий
+        self.tech_categories = np.repeat(np.arange(len(tech)), [len(keywords) for keywords in tech.values()])
+        self.category_sizes = np.array([len(keywords) for keywords in tech.values()])
+        experience = JobScoringService.EXPERIENCE_KEYWORDS
+        self.levels = list(experience)
+        self.experience_keywords = [keyword for keywords in experience.values() for keyword in keywords]
+        self.experience_levels = np.repeat(
+            np.arange(len(experience)), [len(keywords) for keywords in experience.values()]
+        )
+
+    @staticmethod
+    def keyword_hits(found: List[Set[str]], keywords: List[str]) -> np.ndarray:
+        """Матрица len(found) x len(keywords) по найденным в каждой вакансии ключевым словам"""
+        columns = {keyword: column for column, keyword in enumerate(keywords)}
+        rows, hit_columns = [], []
+        for row, row_found in enumerate(found):
+            for keyword in row_found:
+                column = columns.get(keyword)
+                if column is not None:
+                    rows.append(row)
+                    hit_columns.append(column)
+        hits = np.zeros((len(found), len(keywords)), dtype=bool)
+        hits[rows, hit_columns] = True
+        return hits
+
+    @staticmethod
+    def row_keywords(rows: List[Dict]) -> Tuple[List[Set[str]], List[Set[str]]]:
+        """Ключевые слова title + description и requirements: из JobFeatures, без них - разбором текста"""
+        matcher = JobScoringService.keyword_matcher()
+        text, requirements = [], []
+        for row in rows:
+            if row.get('features__keywords') is not None:
+                text.append(set(row['features__keywords']))
+                requirements.append(set(row['features__requirement_keywords']))
+            else:
+                text.append(matcher.find(f"{row['title'] or ''} {row['description'] or ''}"))
+                requirements.append(matcher.find(row['requirements'] or ''))
+        return text, requirements
+
+    def score_rows(self, rows: List[Dict]) -> Dict[str, np.ndarray]:
+        """Скоры для чанка строк values(*SCORING_FIELDS) - массивы int в порядке rows"""
+        count = len(rows)
+        titles = [row['title'] or '' for row in rows]
+        descriptions = [row['description'] or '' for row in rows]
+        requirements = [row['requirements'] or '' for row in rows]
+        text_keywords, requirement_keywords = self.row_keywords(rows)
+
+        # Технологии и уровни опыта в title + description
+        hits = self.keyword_hits(text_keywords, self.tech_keywords + self.experience_keywords)
+        tech_hits = hits[:, :len(self.tech_keywords)]
+        experience_hits = hits[:, len(self.tech_keywords):]
+
+        # Технологии: доля всех ключевых слов, найденных в title + description
+        tech_score = np.minimum(100, tech_hits.sum(axis=1) / len(self.tech_keywords) * 100)
+
+        # Уровень опыта: есть ли ключевое слово уровня вакансии
+        level_index = np.array([
+            self.levels.index(row['experience_level']) if row['experience_level'] in self.levels else -1
+            for row in rows
+        ])
+        level_hit = (experience_hits & (self.experience_levels[None, :] == level_index[:, None])).any(axis=1)
+        experience_score = np.where(level_hit, 100, 70)
+
+        # Свежесть по created_at
+        now = (self.now or timezone.now()).timestamp()
+        created = np.array(
+            [row['created_at'].timestamp() if row['created_at'] else np.nan for row in rows], dtype=float
+        )
+        days_old = np.floor((now - np.nan_to_num(created, nan=now)) / 86400)
+        freshness_score = np.array(FRESHNESS_SCORES)[np.searchsorted(FRESHNESS_BUCKETS, days_old, side='left')]
+        freshness_score = np.where(np.isnan(created), 50, freshness_score)
+
+        # Полнота заполнения полей
+        salary = np.array([row['salary_min'] or 0 for row in rows], dtype=float)
+        completeness_score = np.minimum(100, (
+            np.where([len(title) > 10 for title in titles], 20, 0)
+            + np.where([len(description) > 100 for description in descriptions], 30, 0)
+            + np.where([len(requirement) > 50 for requirement in requirements], 20, 0)
+            + np.where(salary != 0, 15, 0)
+            + np.where([bool(row['company_name']) for row in rows], 15, 0)
+        ))
+
+        # Содержимая часть не зависит от времени; свежесть потом обновляет update_freshness
+        content_score = tech_score * 0.4 + experience_score * 0.2 + completeness_score * 0.2
+        relevance = content_score + freshness_score * JobScoringService.FRESHNESS_WEIGHT
+        relevance_score = np.clip(relevance.astype(int), 0, 100)
+
+        # Навыки: найденные ключевые слова к размеру категорий, в которых что-то нашлось
+        skill_hits = tech_hits | self.keyword_hits(requirement_keywords, self.tech_keywords)
+        found_by_category = np.stack([
+            skill_hits[:, self.tech_categories == category].sum(axis=1)
+            for category in range(len(self.category_sizes))
+        ], axis=1)
+        found = found_by_category.sum(axis=1)
+        weight = ((found_by_category > 0) * self.category_sizes).sum(axis=1)
+        skill_match_score = np.where(
+            weight == 0, 30, np.clip((found / np.maximum(weight, 1) * 100).astype(int), 0, 100)
+        )
+
+        # Зарплата: интерполяция внутри ожидаемого диапазона уровня
+        ranges = np.array([SALARY_RANGES.get(row['experience_level'], DEFAULT_SALARY_RANGE) for row in rows], dtype=float)
+        min_expected, max_expected = ranges[:, 0], ranges[:, 1]
+        salary_score = np.select(
+            [salary == 0, salary >= max_expected, salary >= min_expected],
+            [50, 100, 50 + (salary - min_expected) / (max_expected - min_expected) * 50],
+            salary / min_expected * 50,
+        ).astype(int)
+
+        # Локация: удаленка, затем первая найденная в названии
+        locations = [(row['location'] or '').lower() for row in rows]
+        location_score = np.full(count, 60)
+        for location, score in reversed(LOCATION_SCORES):
+            location_score = np.where([location in value for value in locations], score, location_score)
+        location_score = np.where([bool(row['is_remote']) for row in rows], 95, location_score)
+
+        return {
+            'relevance_score': relevance_score,
+            'skill_match_score': skill_match_score,
+            'salary_score': salary_score,
+            'location_score': location_score,
+            'content_score': content_score.astype(float),
+            'freshness_score': freshness_score,
+        }
+
+    def iter_chunks(self, jobs) -> Iterator[List[Dict]]:
+        chunk = []
+        for row in jobs.values(*SCORING_FIELDS).iterator(chunk_size=self.chunk_size):
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def write(self, rows: List[Dict], scores: Dict[str, np.ndarray]) -> int:
+        calculated_at = timezone.now()
+        objects = [
+            JobScore(
+                job_id=row['id'],
+                calculated_at=calculated_at,
+                **{name: values[index].item() for name, values in scores.items()},
+            )
+            for index, row in enumerate(rows)
+        ]
+        with transaction.atomic():
+            JobScore.objects.bulk_create(
+                objects,
+                update_conflicts=True,
+                unique_fields=['job'],
+                update_fields=list(scores) + ['calculated_at', 'updated_at'],
+            )
+        return len(objects)
+
+    def score_queryset(self, jobs: Iterable) -> Dict[str, float]:
+        """
+        Посчитать и записать скоры всех вакансий queryset'а.
+        :return: {'scored', 'failed', 'seconds'}
+        """
+        started = time.monotonic()
+        stats = {'scored': 0, 'failed': 0}
+        for rows in self.iter_chunks(jobs):
+            try:
+                stats['scored'] += self.write(rows, self.score_rows(rows))
+            except Exception as e:
+                logger.error(f"Error scoring chunk of {len(rows)} jobs: {str(e)}")
+                stats['failed'] += len(rows)
+        stats['seconds'] = round(time.monotonic() - started, 2)
+        return stats
+
+
+def update_freshness(now=None) -> int:
+    """
+    Обновить freshness_score и relevance_score одним UPDATE на корзину
+    возраста (FRESHNESS_BUCKETS) - только у скоров, чья корзина сменилась.
+    Тексты вакансий не читаются: relevance_score = content_score + свежесть.
+    :return: число обновленных скоров
+    """
+    now = now or timezone.now()
+    weight = JobScoringService.FRESHNESS_WEIGHT
+    updated = 0
+    newer_bound = None
+    for days, score in zip(FRESHNESS_BUCKETS + (None,), FRESHNESS_SCORES):
+        # (now - created_at).days <= days  <=>  created_at > now - (days + 1) дней
+        older_bound = now - timedelta(days=days + 1) if days is not None else None
+        scores = JobScore.objects.filter(content_score__isnull=False).exclude(freshness_score=score)
+        if older_bound is not None:
+            scores = scores.filter(job__created_at__gt=older_bound)
+        if newer_bound is not None:
+            scores = scores.filter(job__created_at__lte=newer_bound)
+        # content_score <= 80 и свежесть <= 100 * 0.2, поэтому обрезать до 0-100 не нужно
+        updated += scores.update(
+            freshness_score=score,
+            relevance_score=Cast(Floor(F('content_score') + score * weight), IntegerField()),
+        )
+        newer_bound = older_bound
+    return updated
+
+
+def enqueue_scoring(job_ids: List[int]):
+    """
+    Пересчитать скоры только этих (новых или изменившихся) вакансий после
+    commit текущей транзакции: задачей score_jobs, если есть Celery broker,
+    иначе сразу в этом процессе.
+    """
+    job_ids = list(job_ids)
+    if not job_ids:
+        return
+
+    def run():
+        try:
+            if getattr(settings, 'CELERY_BROKER_URL', None):
+                from .tasks import score_jobs
+                score_jobs.delay(job_ids)
+            else:
+                BatchJobScorer().score_queryset(Job.objects.filter(id__in=job_ids))
+        except Exception as e:
+            # Пропущенные вакансии подберет calculate_job_scores
+            logger.error(f"Error scheduling scoring of {len(job_ids)} jobs: {str(e)}")
+
+    transaction.on_commit(run)
@@ -0,0 +1,266 @@
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .incremental import KnownJobIndex, incremental_config, job_key
+from .models import ScrapeRun
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCRAPE_RUNS_CONFIG = {
+    # Незавершенный запуск старше этого не продолжается - начинаем заново
+    'resume_within_hours': 24,
+    # Запуск в статусе running, обновлявшийся позже этого, еще идет - его не продолжаем
+    'stale_after_minutes': 30,
+    # Сколько URL вакансий хранить как границу для следующего запуска
+    'max_seen_ids': 5000,
+    # Блокировка выбора/создания запуска (секунды) - два тика beat не начнут запуск одновременно
+    'start_lock_seconds': 60,
+}
+
+
+def scrape_runs_config() -> Dict:
+    config = dict(DEFAULT_SCRAPE_RUNS_CONFIG)
+    config.update(getattr(settings, 'SCRAPE_RUNS', {}))
+    return config
+
+
+def query_key(**params) -> str:
+    """Ключ запроса запуска: параметры поиска без числа страниц"""
+    return json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)[:255]
+
+
+class ScrapeRunInProgress(Exception):
+    """Запуск того же (source, query) еще идет - параллельный запуск не начинается"""
+
+
+class ScrapeRunTracker:
+    """
+    Курсор одного запуска скрапера (модель ScrapeRun).
+
+    Скрапер регистрирует страницы выдачи в порядке сайта (plan) и отдает
+    загруженные страницы через track(): уже записанные в прошлой попытке
+    страницы пропускаются. В инкрементальном режиме пагинация
+    останавливается, как только страница почти целиком (known_ratio из
+    INCREMENTAL_CRAWL) состоит из известных вакансий - уже импортированных
+    (KnownJobIndex) или найденных предыдущим запуском; выдача отсортирована
+    от новых к старым. Новые вакансии этой страницы все равно отдаются.
+    Страница считается записанной (курсор, seen_ids) только после того,
+    как ingest_stream подтвердил запись всех ее вакансий в on_batch;
+    страницы упавшего чанка остаются незаписанными, и продолжение запуска
+    загрузит их снова.
+    """
+
+    def __init__(self, run: ScrapeRun, baseline: List[str] = None, known: KnownJobIndex = None):
+        self.run = run
+        self.baseline = list(baseline or [])
+        # None - полный обход без ранней остановки
+        self.known = known
+        if known is not None:
+            known.update(self.baseline)
+        self.known_ratio = incremental_config()['known_ratio']
+        self.done_pages = set(run.cursor.get('pages', []))
+        self.seen = list(run.seen_ids)
+        self._seen_set = set(self.seen)
+        self.failed_pages = set()
+        # Отданные, но еще не подтвержденные on_batch страницы: url -> (ключи к записи, все ключи)
+        self.pending_pages = {}
+        self.stopped_early = False
+        self._order = {}
+        self._stop_at = None
+
+    @classmethod
+    def start(cls, source: str, incremental: bool = True, **query) -> 'ScrapeRunTracker':
+        """
+        Продолжить незавершенный запуск (source, query) или начать новый.
+        incremental=False - обойти всю выдачу (курсор продолжения остается).
+        Если запуск того же (source, query) еще идет - ScrapeRunInProgress.
+        """
+        query = query_key(**query)
+        config = scrape_runs_config()
+        incremental = incremental and incremental_config()['enabled']
+        # Расписания пересекаются (scrape-new-jobs и scrape-all-sources): выбор запуска под блокировкой
+        lock = f"scrape-run-start:{source}:{hashlib.md5(query.encode()).hexdigest()}"
+        if not cache.add(lock, 1, timeout=config['start_lock_seconds']):
+            raise ScrapeRunInProgress(f"{source} scrape run is being started by another worker")
+        try:
+            run, previous = cls._claim_run(source, query, config)
+        finally:
+            cache.delete(lock)
+        known = KnownJobIndex.for_source(source) if incremental else None
+        return cls(run, previous.seen_ids if previous else None, known)
+
+    @staticmethod
+    def _claim_run(source: str, query: str, config: Dict) -> Tuple[ScrapeRun, Optional[ScrapeRun]]:
+        """Продолжить незавершенный запуск или создать новый; живой running запуск - ScrapeRunInProgress"""
+        runs = ScrapeRun.objects.filter(source=source, query=query)
+        previous = runs.filter(status='completed').order_by('-started_at').first()
+        cutoff = timezone.now() - timedelta(hours=config['resume_within_hours'])
+        runs.filter(status='running', started_at__lt=cutoff).update(
+            status='failed', error='Abandoned: not resumed in time'
+        )
+
+        alive = timezone.now() - timedelta(minutes=config['stale_after_minutes'])
+        live = runs.filter(status='running', updated_at__gte=alive).order_by('-updated_at').first()
+        if live is not None:
+            raise ScrapeRunInProgress(f"{source} scrape run #{live.pk} is still running")
+        unfinished = runs.exclude(status='completed').filter(started_at__gte=cutoff).exclude(
+            status='running', updated_at__gte=alive
+        )
+        if previous is not None:
+            unfinished = unfinished.filter(started_at__gt=previous.started_at)
+        run = unfinished.order_by('-started_at').first()
+        if run is not None:
+            run.status = 'running'
+            run.attempts += 1
+            run.error = ''
+            run.save(update_fields=['status', 'attempts', 'error', 'updated_at'])
+            logger.info(
+                f"Resuming {source} scrape run #{run.pk} (attempt {run.attempts}, "
+                f"{len(run.cursor.get('pages', []))} pages already written)"
+            )
+        else:
+            run = ScrapeRun.objects.create(source=source, query=query)
+        return run, previous
+
+    def plan(self, urls: List[str]) -> List[str]:
+        """Зарегистрировать страницы выдачи (от новых к старым); вернуть еще не записанные"""
+        for url in urls:
+            self._order.setdefault(url, len(self._order))
+        return [url for url in urls if url not in self.done_pages]
+
+    def is_known_page(self, jobs: List[Dict]) -> bool:
+        """Страница почти целиком из уже известных вакансий (только в инкрементальном режиме)"""
+        return self.known is not None and bool(jobs) and self.known.known_ratio(jobs) >= self.known_ratio
+
+    def track(self, pages: Iterable[Tuple[str, Optional[List[Dict]]]]) -> Iterator[List[Dict]]:
+        """
+        Отдать вакансии страниц, отмечая их в курсоре.
+        pages - (url, jobs) в любом порядке загрузки; jobs=None - страница не загрузилась.
+        """
+        pages = iter(pages)
+        try:
+            for url, jobs in pages:
+                position = self._order.setdefault(url, len(self._order))
+                if url in self.done_pages or (self._stop_at is not None and position > self._stop_at):
+                    continue
+                if jobs is None:
+                    self.failed_pages.add(url)
+                elif self.is_known_page(jobs):
+                    self.stopped_early = True
+                    self._stop_at = position if self._stop_at is None else min(self._stop_at, position)
+                    logger.info(f"{self.run.source}: page {position + 1} is already known, stopping pagination")
+                    # Новые вакансии страницы остановки тоже записываем
+                    new_jobs = [job for job in jobs if job_key(job) not in self.known]
+                    if new_jobs:
+                        self._page_pending(url, new_jobs, jobs)
+                        yield new_jobs
+                    else:
+                        self._page_done(url, jobs)
+                else:
+                    self._page_pending(url, jobs, jobs)
+                    yield jobs
+                if self._stop_at is not None and self._newer_pages_processed():
+                    break
+        finally:
+            close = getattr(pages, 'close', None)
+            if close:
+                close()
+
+    def _page_pending(self, url: str, written: List[Dict], jobs: List[Dict]):
+        keys = [job_key(job) for job in jobs]
+        self.pending_pages[url] = ({job_key(job) for job in written} - {None}, [key for key in keys if key])
+
+    def _page_done(self, url: str, jobs: List[Dict]):
+        self._mark_done(url, [job_key(job) for job in jobs])
+
+    def _mark_done(self, url: str, keys: List[str]):
+        self.done_pages.add(url)
+        for key in keys:
+            if key and key not in self._seen_set:
+                self._seen_set.add(key)
+                self.seen.append(key)
+
+    def _newer_pages_processed(self) -> bool:
+        return all(
+            url in self.done_pages or url in self.failed_pages or url in self.pending_pages
+            for url, position in self._order.items() if position < self._stop_at
+        )
+
+    def confirm(self, written_jobs: List[Dict]):
+        """
+        Отметить записанными отданные страницы, все вакансии которых есть в
+        written_jobs. ingest_stream пишет страницы целиком, поэтому
+        остальные отданные страницы батча не записались (упавший чанк).
+        """
+        written = {job_key(job) for job in written_jobs}
+        for url, (keys, page_keys) in list(self.pending_pages.items()):
+            del self.pending_pages[url]
+            if keys <= written:
+                self._mark_done(url, page_keys)
+            else:
+                self.failed_pages.add(url)
+
+    def checkpoint(self, stats: Dict[str, int] = None):
+        """Сохранить курсор: вызывается после записи отданных вакансий в БД"""
+        run = self.run
+        run.cursor = {'pages': sorted(self.done_pages, key=lambda url: self._order.get(url, len(self._order)))}
+        run.seen_ids = self.seen
+        for key, value in (stats or {}).items():
+            run.stats[key] = run.stats.get(key, 0) + value
+        run.save(update_fields=['cursor', 'seen_ids', 'stats', 'updated_at'])
+
+    def on_batch(self, jobs: List[Dict], batch_stats: Dict[str, int]):
+        """Колбэк для JobIngestionService.ingest_stream (jobs - успешно записанные вакансии батча)"""
+        self.confirm(jobs)
+        self.checkpoint(batch_stats)
+
+    def finish(self):
+        """
+        Завершить запуск. Страницы, которые не загрузились, оставляют запуск
+        в статусе failed - следующий запуск догрузит только их.
+        """
+        # Отданные, но не подтвержденные записью страницы не записаны
+        self.failed_pages.update(self.pending_pages)
+        self.pending_pages = {}
+        if self._stop_at is not None:
+            self.failed_pages = {url for url in self.failed_pages if self._order[url] <= self._stop_at}
+        if self.stopped_early:
+            # Старые страницы не загружались - граница включает и вакансии предыдущего запуска
+            self.seen.extend(key for key in self.baseline if key not in self._seen_set)
+        self.seen = self.seen[:scrape_runs_config()['max_seen_ids']]
+        self._seen_set = set(self.seen)
+
+        run = self.run
+        run.finished_early = self.stopped_early
+        if self.failed_pages:
+            run.status = 'failed'
+            run.error = f"{len(self.failed_pages)} pages failed to load"
+        else:
+            run.status = 'completed'
+            run.finished_at = timezone.now()
+        self.checkpoint()
+        run.save(update_fields=['status', 'error', 'finished_early', 'finished_at', 'updated_at'])
+        logger.info(
+            f"{run.source} scrape run #{run.pk} {run.status}: {len(self.done_pages)} pages written"
+            f"{', stopped at known listings' if self.stopped_early else ''}"
+        )
+
+    def fail(self, error):
+        run = self.run
+        run.status = 'failed'
+        run.error = str(error)[:1000]
+        self.checkpoint()
+        run.save(update_fields=['status', 'error', 'updated_at'])
+        logger.error(f"{run.source} scrape run #{run.pk} failed after {len(self.done_pages)} pages: {run.error}")
+
+    def summary(self) -> str:
+        if self.stopped_early:
+            return f"{len(self.done_pages)} pages, stopped at known listings"
+        return f"{len(self.done_pages)} pages"
@@ -2,10 +2,12 @@ import time
 import logging
 from typing import List, Dict, Optional
 import requests
-from bs4 import BeautifulSoup
 from datetime import datetime
 from django.utils import timezone
 from ..models import Job, Company
+from ..fetcher import AsyncFetcher, build_url
+from ..html_parser import parse_html
+from ..http_cache import install_http_cache
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +18,10 @@ class CVeeScraper:
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
+        self.fetcher = AsyncFetcher(headers=self.headers)
+        # Страницы вакансий - через HTTP-кэш (условные запросы, TTL 'cv_ee_job')
+        self.session = install_http_cache(requests.Session(), 'cv_ee_job')
+        self.session.headers.update(self.headers)
 
     def _get_salary_range(self, salary_text: str) -> tuple:
         """Extract salary range from text"""
@@ -77,29 +83,28 @@ class CVeeScraper:
         """Search for jobs on cv.ee"""
         all_jobs = []
         
-        for page in range(max_pages):
+        params = {
+            'query': ' '.join(keywords) if keywords else '',
+            'location': location,
+        }
+        # requests отбрасывал None-параметры - делаем так же
+        params = {k: v for k, v in params.items() if v is not None}
+        page_urls = [build_url(self.BASE_URL, dict(params, page=page + 1)) for page in range(max_pages)]
+        logger.info(f"Searching jobs with URLs: {page_urls}")
+        
+        # Страницы грузятся параллельно через общий fetcher (лимиты хоста вместо time.sleep)
+        for page, result in enumerate(self.fetcher.fetch_all(page_urls)):
             try:
-                params = {
-                    'query': ' '.join(keywords) if keywords else '',
-                    'location': location,
-                    'page': page + 1
-                }
-                
-                url = f"{self.BASE_URL}?{'&'.join(f'{k}={v}' for k, v in params.items())}"
-                logger.info(f"Searching jobs with URL: {url}")
-                logger.info(f"Request parameters: {params}")
-                
-                response = requests.get(self.BASE_URL, params=params, headers=self.headers)
-                logger.info(f"Response status code: {response.status_code}")
-                logger.info(f"Response headers: {dict(response.headers)}")
-                logger.info(f"Response URL: {response.url}")
+                logger.info(f"Response status code: {result.status}")
+                logger.info(f"Response URL: {result.url}")
                 
-                if response.status_code != 200:
-                    logger.error(f"Error response content: {response.text[:500]}")
-                
-                response.raise_for_status()
+                if not result.ok:
+                    logger.error(f"Error searching jobs on page {page}: {result.error}")
+                    if result.content:
+                        logger.error(f"Error response content: {result.text[:500]}")
+                    break
                 
-                soup = BeautifulSoup(response.text, 'html.parser')
+                soup = parse_html(result.text, source='cv_ee')
                 job_cards = soup.find_all('div', class_='vacancy-card')
                 
                 logger.info(f"Found {len(job_cards)} job cards on page {page + 1}")
@@ -113,13 +118,8 @@ class CVeeScraper:
                     if job_data:
                         all_jobs.append(job_data)
                 
-                # Respect rate limiting
-                time.sleep(2)
-                
             except Exception as e:
                 logger.error(f"Error searching jobs on page {page}: {str(e)}")
-                if hasattr(e, 'response'):
-                    logger.error(f"Response content: {e.response.text[:500]}")
                 break
         
         return all_jobs
@@ -127,10 +127,10 @@ class CVeeScraper:
     def get_job_details(self, job_url: str) -> Dict:
         """Get detailed information about a specific job"""
         try:
-            response = requests.get(job_url, headers=self.headers)
+            response = self.session.get(job_url)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = parse_html(response.text, source='cv_ee')
             
             # Extract job description
             description = soup.find('div', class_='vacancy-description')
@@ -165,7 +165,7 @@ class CVeeScraper:
             response = requests.get(self.BASE_URL, headers=self.headers)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = parse_html(response.text, source='cv_ee')
             job_cards = soup.find_all('li', class_='vacancies-list__item')
             
             jobs_created = 0
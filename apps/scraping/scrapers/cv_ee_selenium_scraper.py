@@ -1,170 +1,203 @@
+import itertools
+import re
 import time
 import json
 import logging
-from typing import List, Dict, Optional
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+from django.conf import settings
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
-from django.utils import timezone
-from ..models import Job, Company
+from ..browser_pool import BrowserPool, get_browser_pool
+from ..fetcher import AsyncFetcher, build_url
+from ..html_parser import parse_html
+from ..ingestion import JobIngestionService
+from ..pipeline import ParsePipeline
+from ..readiness import PageReadiness
 
 logger = logging.getLogger(__name__)
 
+NEXT_DATA_RE = re.compile(r'<script id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.DOTALL)
+
+
+def extract_search_results(html: str) -> Optional[Dict]:
+    """
+    Достаем props.pageProps.searchResults из __NEXT_DATA__ прямо из HTML
+    (без браузера). None - если JSON на странице нет.
+    """
+    match = NEXT_DATA_RE.search(html or '')
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(1))
+    except ValueError:
+        return None
+    search_results = data.get("props", {}).get("pageProps", {}).get("searchResults")
+    if not isinstance(search_results, dict) or 'vacancies' not in search_results:
+        return None
+    return search_results
+
+
 class CVeeSeleniumScraper:
     BASE_URL = 'https://cv.ee/search'
+    # Тот же поиск без редиректа - для загрузки по HTTP
+    HTTP_SEARCH_URL = 'https://www.cv.ee/et/search'
+    PAGE_SIZE = 20
+    # Карточки вакансий в списке (для ожидания догрузки списка)
+    JOB_CARD_SELECTOR = "li[class*='vacancies-list__item'], div[class*='vacancy-item'], a[href*='/vacancy/']"
+    HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        'Accept-Language': 'et-EE,et;q=0.9,en;q=0.8',
+    }
 
-    def __init__(self):
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        service = Service(ChromeDriverManager(driver_version='137.0.7151.104').install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
-        self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    def __init__(self, pool: BrowserPool = None, browserless: bool = None):
+        # Браузер берется из пула при первом обращении и возвращается в close()
+        self.pool = pool or get_browser_pool('chrome')
+        self._driver = None
+        # Без браузера: страницы поиска грузятся по HTTP, Selenium - только запасной вариант
+        self.browserless = browserless if browserless is not None else getattr(settings, 'CV_EE_BROWSERLESS', True)
+        self.fetcher = AsyncFetcher(headers=self.HEADERS)
+
+    @property
+    def driver(self):
+        if self._driver is None:
+            self._driver = self.pool.acquire()
+        return self._driver
 
     def scrape_jobs(self):
         try:
-            self.driver.get(self.BASE_URL)
-            print(f"Загружена страница: {self.BASE_URL}")
-            
-            # Ждем загрузки страницы
-            time.sleep(8)
-            
-            # Прокручиваем страницу несколько раз для загрузки вакансий
-            for i in range(3):
-                self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(2)
-                print(f"Прокрутка {i+1}/3 выполнена")
-            
-            # Прокручиваем обратно наверх
-            self.driver.execute_script("window.scrollTo(0, 0);")
-            time.sleep(2)
-            
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-            
-            # Пробуем разные селекторы для поиска вакансий
-            job_cards = soup.find_all('li', class_=lambda x: x and 'vacancies-list__item' in x)
-            if not job_cards:
-                job_cards = soup.find_all('div', class_=lambda x: x and 'vacancy-item' in x)
-            if not job_cards:
-                job_cards = soup.find_all('article', class_=lambda x: x and 'vacancy' in x)
-            
-            # Новые селекторы для актуальной структуры cv.ee
-            if not job_cards:
-                job_cards = soup.find_all('div', class_=lambda x: x and 'job-item' in x)
-            if not job_cards:
-                job_cards = soup.find_all('div', attrs={'data-testid': 'job-card'})
-            if not job_cards:
-                # Ищем по ссылкам на вакансии
-                job_links = soup.find_all('a', href=lambda x: x and '/vacancy/' in x)
-                job_cards = [link.find_parent() for link in job_links if link.find_parent()]
-            
-            print(f"Найдено вакансий: {len(job_cards)}")
-            
-            jobs_created = 0
-            for card in job_cards:
-                try:
-                    # Title
-                    title_tag = card.find('a', class_=lambda x: x and 'vacancy-item__title' in x)
-                    if not title_tag:
-                        title_tag = card.find('a', href=lambda x: x and '/vacancy/' in x)
-                    if not title_tag:
-                        title_tag = card.find('h3')
-                        if title_tag:
-                            title_tag = title_tag.find('a')
-                    
-                    title = title_tag.text.strip() if title_tag else ''
-                    job_url = title_tag['href'] if title_tag else ''
-                    
-                    if job_url and not job_url.startswith('http'):
-                        job_url = f"https://cv.ee{job_url}"
-
-                    # Company
-                    company_name = ''
-                    company_link = card.find('a', href=lambda x: x and 'employer' in x)
-                    if company_link:
-                        company_name = company_link.text.strip()
-                    else:
-                        # Альтернативный поиск компании
-                        company_tag = card.find('span', class_=lambda x: x and 'company' in x)
-                        if company_tag:
-                            company_name = company_tag.text.strip()
-
-                    # Location
-                    location = ''
-                    location_div = card.find('div', class_=lambda x: x and 'vacancy-item__locations' in x)
-                    if location_div:
-                        location_text = location_div.get_text(strip=True)
-                        location = location_text.replace('...', '').strip()
-                    else:
-                        # Альтернативный поиск локации
-                        location_tag = card.find('span', class_=lambda x: x and 'location' in x)
-                        if location_tag:
-                            location = location_tag.text.strip()
-
-                    # Description
-                    description = ''
-                    body = card.find('div', class_=lambda x: x and 'vacancy-item__body' in x)
-                    if body:
-                        description = body.text.strip()
-                    else:
-                        # Ищем описание в других тегах
-                        desc_tag = card.find('p')
-                        if desc_tag:
-                            description = desc_tag.text.strip()
-
-                    # Пропускаем вакансии без названия
-                    if not title:
-                        continue
-
-                    # Создаем или получаем компанию
-                    company, _ = Company.objects.get_or_create(
-                        name=company_name or 'Unknown',
-                        defaults={'location': location, 'size': 'small'}
-                    )
-
-                    # Создаем вакансию
-                    job, created = Job.objects.get_or_create(
-                        source_url=job_url,
-                        defaults={
-                            'title': title,
-                            'company': company,
-                            'company_name': company_name,
-                            'location': location,
-                            'description': description,
-                            'salary_min': None,
-                            'salary_max': None,
-                            'salary_currency': 'EUR',
-                            'source_site': 'cv_ee',
-                            'posted_date': timezone.now(),
-                            'is_active': True
-                        }
-                    )
-                    if created:
-                        jobs_created += 1
-                        print(f"Создана вакансия: {title} в {company_name}")
-                        
-                except Exception as e:
-                    print(f"Ошибка обработки вакансии: {e}")
-                    continue
+            jobs_data = None
+            if self.browserless:
+                jobs_data = self._search_jobs_http({'limit': self.PAGE_SIZE, 'offset': 0}, max_pages=1)
+            if jobs_data is None:
+                jobs_data = self._scrape_cards_selenium()
+
+            stats = JobIngestionService('cv_ee').ingest(jobs_data)
+            jobs_created = stats['new']
+            logger.info(f"Создано вакансий: {jobs_created}")
                     
             return jobs_created
             
         except Exception as e:
-            print(f"Ошибка скрапинга cv.ee: {e}")
+            logger.error(f"Ошибка скрапинга cv.ee: {e}")
             return 0
         finally:
-            self.driver.quit()
+            self.close()
+
+    def _scrape_cards_selenium(self) -> List[Dict]:
+        """Первая страница поиска через браузер, вакансии из HTML карточек"""
+        readiness = PageReadiness(self.driver)
+        self.driver.get(self.BASE_URL)
+        logger.info(f"Загружена страница: {self.BASE_URL}")
+        
+        # Ждем, пока список вакансий отрисуется и перестанет меняться
+        readiness.document_ready()
+        readiness.element_count_stable(self.JOB_CARD_SELECTOR)
+        
+        # Прокручиваем страницу, пока подгружаются новые вакансии
+        readiness.scroll_to_end()
+        readiness.element_count_stable(self.JOB_CARD_SELECTOR)
+        self.driver.execute_script("window.scrollTo(0, 0);")
+        logger.info(f"Ожидание страницы cv.ee: {readiness.summary()}")
+        
+        return self._parse_cards_page(self.driver.page_source)
+
+    def _parse_cards_page(self, html: str) -> List[Dict]:
+        """Вакансии из HTML карточек страницы поиска (без браузера - по готовому HTML)"""
+        soup = parse_html(html, source='cv_ee')
+        
+        # Пробуем разные селекторы для поиска вакансий
+        job_cards = soup.find_all('li', class_=lambda x: x and 'vacancies-list__item' in x)
+        if not job_cards:
+            job_cards = soup.find_all('div', class_=lambda x: x and 'vacancy-item' in x)
+        if not job_cards:
+            job_cards = soup.find_all('article', class_=lambda x: x and 'vacancy' in x)
+        
+        # Новые селекторы для актуальной структуры cv.ee
+        if not job_cards:
+            job_cards = soup.find_all('div', class_=lambda x: x and 'job-item' in x)
+        if not job_cards:
+            job_cards = soup.find_all('div', attrs={'data-testid': 'job-card'})
+        if not job_cards:
+            # Ищем по ссылкам на вакансии
+            job_links = soup.find_all('a', href=lambda x: x and '/vacancy/' in x)
+            job_cards = [link.find_parent() for link in job_links if link.find_parent()]
+        
+        logger.debug(f"Найдено вакансий: {len(job_cards)}")
+        
+        jobs_data = []
+        for card in job_cards:
+            try:
+                # Title
+                title_tag = card.find('a', class_=lambda x: x and 'vacancy-item__title' in x)
+                if not title_tag:
+                    title_tag = card.find('a', href=lambda x: x and '/vacancy/' in x)
+                if not title_tag:
+                    title_tag = card.find('h3')
+                    if title_tag:
+                        title_tag = title_tag.find('a')
+                
+                title = title_tag.text.strip() if title_tag else ''
+                job_url = title_tag['href'] if title_tag else ''
+                
+                if job_url and not job_url.startswith('http'):
+                    job_url = f"https://cv.ee{job_url}"
+
+                # Company
+                company_name = ''
+                company_link = card.find('a', href=lambda x: x and 'employer' in x)
+                if company_link:
+                    company_name = company_link.text.strip()
+                else:
+                    # Альтернативный поиск компании
+                    company_tag = card.find('span', class_=lambda x: x and 'company' in x)
+                    if company_tag:
+                        company_name = company_tag.text.strip()
+
+                # Location
+                location = ''
+                location_div = card.find('div', class_=lambda x: x and 'vacancy-item__locations' in x)
+                if location_div:
+                    location_text = location_div.get_text(strip=True)
+                    location = location_text.replace('...', '').strip()
+                else:
+                    # Альтернативный поиск локации
+                    location_tag = card.find('span', class_=lambda x: x and 'location' in x)
+                    if location_tag:
+                        location = location_tag.text.strip()
+
+                # Description
+                description = ''
+                body = card.find('div', class_=lambda x: x and 'vacancy-item__body' in x)
+                if body:
+                    description = body.text.strip()
+                else:
+                    # Ищем описание в других тегах
+                    desc_tag = card.find('p')
+                    if desc_tag:
+                        description = desc_tag.text.strip()
+
+                # Пропускаем вакансии без названия
+                if not title:
+                    continue
+
+                jobs_data.append({
+                    'title': title,
+                    'company': company_name,
+                    'location': location,
+                    'description': description,
+                    'source_url': job_url,
+                    'salary_currency': 'EUR',
+                })
+                    
+            except Exception as e:
+                logger.warning(f"Ошибка обработки вакансии: {e}")
+                continue
+
+        return jobs_data
 
     def _wait_and_find_element(self, by: By, value: str, timeout: int = 10):
         """Ожидание и поиск элемента с обработкой ошибок."""
@@ -204,7 +237,7 @@ class CVeeSeleniumScraper:
                     if consent_button and consent_button.is_displayed():
                         consent_button.click()
                         logger.info("Согласие на cookies принято")
-                        time.sleep(1)
+                        PageReadiness(self.driver).element_gone(consent_button)
                         return True
                 except:
                     continue
@@ -232,32 +265,135 @@ class CVeeSeleniumScraper:
             logger.error(f"Ошибка при извлечении JSON данных: {str(e)}")
         return []
 
+    def _search_params(self, keywords: List[str] = None) -> Dict:
+        search_params = {
+            "limit": str(self.PAGE_SIZE),
+            "offset": "0",
+            "categories[0]": "INFORMATION_TECHNOLOGY",
+            "towns[0]": "312",  # Tallinn
+            "fuzzy": "true"
+        }
+        
+        if keywords:
+            search_params["q"] = " ".join(keywords)
+        return search_params
+
     def search_jobs(self, keywords: List[str] = None, location: str = "Tallinn", max_pages: int = 5) -> List[Dict]:
         """
-        Поиск вакансий на cv.ee с помощью Selenium.
+        Поиск вакансий на cv.ee (все страницы списком, см. iter_job_pages).
         :param keywords: Список ключевых слов для поиска.
         :param location: Локация для поиска.
         :param max_pages: Максимальное количество страниц для парсинга.
         :return: Список словарей с данными о вакансиях.
         """
+        return [job for page_jobs in self.iter_job_pages(keywords, location, max_pages) for job in page_jobs]
+
+    def iter_job_pages(self, keywords: List[str] = None, location: str = "Tallinn",
+                       max_pages: int = 5, run=None) -> Iterator[List[Dict]]:
+        """
+        Вакансии постранично, по мере загрузки и разбора страниц.
+        В режиме browserless страницы загружаются по HTTP, Selenium используется,
+        только если на странице не нашлось __NEXT_DATA__ (тогда все страницы
+        браузера отдаются одним списком, без курсора run).
+        :param run: ScrapeRunTracker - продолжение с курсора и остановка на известных вакансиях
+        """
+        search_params = self._search_params(keywords)
+        if self.browserless:
+            pages = self._iter_pages_http(search_params, max_pages, run)
+            first_page = next(pages, None)
+            if first_page is not None:
+                pages = itertools.chain([first_page], pages)
+                if run is not None:
+                    yield from run.track(pages)
+                    return
+                for page_url, jobs in pages:
+                    if jobs is not None:
+                        yield jobs
+                return
+            logger.warning("__NEXT_DATA__ не получен по HTTP, используем Selenium")
+        yield self._search_jobs_selenium(search_params, max_pages)
+
+    def _search_jobs_http(self, search_params: Dict, max_pages: int) -> Optional[List[Dict]]:
+        """
+        Поиск без браузера списком.
+        :return: вакансии или None, если JSON на первой странице не найден
+        """
+        pages = list(self._iter_pages_http(search_params, max_pages))
+        if not pages:
+            return None
+        return [job for page_url, page_jobs in pages for job in page_jobs or []]
+
+    def _iter_pages_http(self, search_params: Dict, max_pages: int,
+                         run=None) -> Iterator[Tuple[str, Optional[List[Dict]]]]:
+        """
+        Поиск без браузера: первая страница дает total, остальные offset'ы
+        загружаются параллельно через AsyncFetcher и разбираются в пуле
+        процессов (ParsePipeline). Каждая страница отдается сразу после
+        разбора парой (URL, вакансии без уже отданных раньше; None - страница
+        не загрузилась). Если JSON на первой странице не найден, генератор
+        ничего не отдает.
+        """
+        started = time.monotonic()
+        first_url = build_url(self.HTTP_SEARCH_URL, dict(search_params, offset=0))
+        first = self.fetcher.fetch_all([first_url], archive='cv_ee', cache='cv_ee')[0]
+        search_results = extract_search_results(first.text) if first.ok else None
+        if search_results is None:
+            return
+
+        seen_ids = set()
+        jobs_count = 0
+
+        def unique(jobs):
+            nonlocal jobs_count
+            page_jobs = []
+            for job_data in jobs:
+                if job_data['external_id'] in seen_ids:
+                    continue
+                seen_ids.add(job_data['external_id'])
+                page_jobs.append(job_data)
+            jobs_count += len(page_jobs)
+            return page_jobs
+
+        if run is not None:
+            run.plan([first_url])
+        yield first_url, unique(self._parse_vacancies(search_results.get('vacancies') or []))
+
+        total = search_results.get('total') or 0
+        page_count = min(max_pages, -(-total // self.PAGE_SIZE))
+        urls = [
+            build_url(self.HTTP_SEARCH_URL, dict(search_params, offset=page * self.PAGE_SIZE))
+            for page in range(1, page_count)
+        ]
+        if run is not None:
+            urls = run.plan(urls)
+        pages_count = 1
+        # Разбираем страницы по мере загрузки, HTML сразу отбрасываем
+        for page in ParsePipeline(parse_search_page, self.fetcher, archive='cv_ee', cache='cv_ee').iter_pages(urls):
+            if page['error'] or not page['parsed']:
+                logger.warning(f"No vacancies in {page['url']} ({page['error'] or 'no __NEXT_DATA__'})")
+                yield page['url'], None
+                continue
+            pages_count += 1
+            yield page['url'], unique(page['jobs'])
+
+        logger.info(
+            f"cv.ee: {jobs_count} вакансий с {pages_count}/{max(page_count, 1)} страниц "
+            f"по HTTP за {time.monotonic() - started:.1f}s"
+        )
+
+    def _parse_vacancies(self, vacancies: List[Dict]) -> List[Dict]:
+        """Вакансии из searchResults.vacancies (некорректные пропускаются)"""
+        return [job_data for job_data in map(self._parse_vacancy_from_json, vacancies) if job_data]
+
+    def _search_jobs_selenium(self, search_params: Dict, max_pages: int) -> List[Dict]:
+        """Поиск через браузер (запасной вариант)."""
         all_jobs = []
         try:
-            # Формируем URL с параметрами поиска
-            search_params = {
-                "limit": "20",
-                "offset": "0",
-                "categories[0]": "INFORMATION_TECHNOLOGY",
-                "towns[0]": "312",  # Tallinn
-                "fuzzy": "true"
-            }
-            
-            if keywords:
-                search_params["q"] = " ".join(keywords)
-            
             # Строим URL
             params_str = "&".join([f"{k}={v}" for k, v in search_params.items()])
             search_url = f"{self.BASE_URL}?{params_str}"
             
+            readiness = PageReadiness(self.driver)
             self.driver.get(search_url)
             logger.info(f"Открыта страница: {search_url}")
             
@@ -265,7 +401,7 @@ class CVeeSeleniumScraper:
             self._handle_cookie_consent()
             
             # Ожидание загрузки страницы
-            time.sleep(3)
+            readiness.next_data()
             
             # Парсинг страниц
             for page in range(max_pages):
@@ -285,16 +421,19 @@ class CVeeSeleniumScraper:
                 
                 # Проверка наличия следующей страницы
                 if page < max_pages - 1:
+                    current_url = self.driver.current_url
                     if not self._go_to_next_page():
                         logger.info("Достигнут конец списка вакансий")
                         break
-                    time.sleep(2)
+                    readiness.url_changed(current_url)
+                    readiness.element_count_stable(self.JOB_CARD_SELECTOR)
+
+            logger.info(f"Ожидание страниц cv.ee: {readiness.total_wait()}s ({readiness.summary()})")
 
         except Exception as e:
             logger.error(f"Ошибка при поиске вакансий: {str(e)}")
         finally:
-            self.driver.quit()
-            logger.info("Браузер закрыт")
+            self.close()
 
         return all_jobs
 
@@ -496,7 +635,7 @@ class CVeeSeleniumScraper:
             logger.info(f"Открыта страница вакансии: {job_url}")
 
             # Ожидание загрузки страницы
-            time.sleep(2)
+            PageReadiness(self.driver).document_ready()
             
             # Извлечение детальной информации
             description_selectors = [
@@ -534,7 +673,22 @@ class CVeeSeleniumScraper:
         return details
 
     def close(self):
-        """Закрытие браузера."""
-        if hasattr(self, 'driver'):
-            self.driver.quit()
-            logger.info("Браузер закрыт") 
\ No newline at end of file
+        """Возврат браузера в пул."""
+        if self._driver is not None:
+            self.pool.release(self._driver)
+            self._driver = None
+            logger.info("Браузер возвращен в пул") 
+
+
+@lru_cache(maxsize=None)
+def _page_parser() -> CVeeSeleniumScraper:
+    # Один экземпляр на процесс-воркер разбора; браузер из пула не берется
+    return CVeeSeleniumScraper(browserless=True)
+
+
+def parse_search_page(html: str) -> List[Dict]:
+    """Разбор страницы поиска cv.ee в процессе-воркере ParsePipeline"""
+    search_results = extract_search_results(html)
+    if search_results is None:
+        return []
+    return _page_parser()._parse_vacancies(search_results.get('vacancies') or [])
@@ -1,7 +1,6 @@
-import time
 import re
+import html
 import logging
-import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -9,8 +8,15 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import json
 import urllib.parse
 import requests
-from bs4 import BeautifulSoup
 from datetime import datetime
+from functools import lru_cache
+
+from ..browser_pool import get_browser_pool
+from ..fetcher import AsyncFetcher
+from ..html_parser import parse_cards, parse_html
+from ..ingestion import normalize_job_data
+from ..pipeline import ParsePipeline
+from ..readiness import PageReadiness
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +26,11 @@ class CVKeskusScraper:
     name = "cvkeskus"
     base_url = "https://www.cvkeskus.ee"
     search_url = "https://www.cvkeskus.ee/toopakkumised"
+    PAGE_SIZE = 30  # вакансий на странице результатов
+    START_RE = re.compile(r'[?&]start=(\d+)')
+    HREF_RE = re.compile(r'href=["\']([^"\']*start=\d+[^"\']*)["\']')
+    # Контейнер карточки вакансии - при частичном разборе строятся только эти поддеревья
+    CARD_CONTAINERS = [('article', {'data-component': 'jobad'})]
     
     def __init__(self):
         self.driver = None
@@ -32,47 +43,15 @@ class CVKeskusScraper:
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
         })
+        self.fetcher = AsyncFetcher(headers=dict(self.session.headers))
         
     def setup_driver(self):
-        """Настройка Chrome WebDriver"""
+        """Берем undetected Chrome из пула браузеров"""
+        if self.driver:
+            return
         try:
-            options = uc.ChromeOptions()
-            options.add_argument("--no-sandbox")
-            options.add_argument("--disable-dev-shm-usage")
-            options.add_argument("--disable-gpu")
-            options.add_argument("--window-size=1920,1080")
-            options.add_argument("--lang=en")  # Force English language
-            options.add_argument("--disable-web-security")
-            options.add_argument("--allow-running-insecure-content")
-            options.add_argument("--disable-features=VizDisplayCompositor")
-            
-            # Try to use existing ChromeDriver first
-            try:
-                self.driver = uc.Chrome(
-                    options=options,
-                    version_main=None,  # Let it auto-detect Chrome version
-                    driver_executable_path=None,  # Let it find existing driver
-                    browser_executable_path=None  # Let it find existing browser
-                )
-            except Exception as e:
-                logger.warning(f"Failed to use existing ChromeDriver: {e}")
-                # Try with different version
-                try:
-                    self.driver = uc.Chrome(
-                        options=options,
-                        version_main=None,  # Let it auto-detect
-                        driver_executable_path=None,
-                        browser_executable_path=None
-                    )
-                except Exception as e2:
-                    logger.error(f"Failed to setup ChromeDriver with auto-detect: {e2}")
-                    raise
-            
-            logger.info("Chrome WebDriver setup successful")
-            
-            # Set default page load timeout
-            self.driver.set_page_load_timeout(30)
-            
+            self.driver = get_browser_pool('undetected').acquire()
+            logger.info("Chrome WebDriver leased from pool")
         except Exception as e:
             logger.error(f"Error setting up Chrome WebDriver: {e}")
             raise
@@ -86,21 +65,23 @@ class CVKeskusScraper:
             )
             accept_button.click()
             logger.info("Accepted cookie consent")
-            time.sleep(2)  # Wait for popup to disappear
+            PageReadiness(self.driver).element_gone(accept_button)
         except TimeoutException:
             logger.info("No cookie consent popup found")
         except Exception as e:
             logger.warning(f"Error handling cookie consent: {e}")
     
     def close_driver(self):
-        """Закрытие драйвера"""
+        """Возврат драйвера в пул"""
         if self.driver:
             try:
-                self.driver.quit()
-                logger.info("Chrome WebDriver closed successfully")
+                get_browser_pool('undetected').release(self.driver)
+                logger.info("Chrome WebDriver returned to pool")
             except Exception as e:
-                logger.error(f"Error closing Chrome WebDriver: {e}")
-            
+                logger.error(f"Error releasing Chrome WebDriver: {e}")
+            finally:
+                self.driver = None
+    
     def extract_salary(self, salary_text):
         """Извлечение зарплаты из текста"""
         if not salary_text:
@@ -204,72 +185,182 @@ class CVKeskusScraper:
             logger.error(f"Error parsing job card: {e}")
             return None
     
-    def search_jobs(self, keywords="", location="", max_pages=1, limit=None):
-        """Поиск вакансий на CV Keskus"""
-        try:
-            # Формируем URL для поиска - используем фильтры для IT вакансий
-            search_params = {
-                'op': 'search',
-                'search[job_salary]': '3',  # Все зарплаты
-                'ga_track': 'results',  # Изменено с 'all_ads' на 'results'
-                'search[categories][]': ['8', '23'],  # IT и маркетинг категории
-                'badge[categories][]': ['8', '23'],  # Добавляем badge фильтры
-                'search[keyword]': keywords,
-                'search[expires_days]': '',
-                'search[job_lang]': '',
-                'search[salary]': ''
-            }
+    def _build_search_url(self, keywords="", location="", start=0):
+        """URL страницы поиска (start - смещение, по PAGE_SIZE вакансий на страницу)"""
+        # Формируем URL для поиска - используем фильтры для IT вакансий
+        search_params = {
+            'op': 'search',
+            'search[job_salary]': '3',  # Все зарплаты
+            'ga_track': 'results',  # Изменено с 'all_ads' на 'results'
+            'search[categories][]': ['8', '23'],  # IT и маркетинг категории
+            'badge[categories][]': ['8', '23'],  # Добавляем badge фильтры
+            'search[keyword]': keywords,
+            'search[expires_days]': '',
+            'search[job_lang]': '',
+            'search[salary]': ''
+        }
+
+        if location:
+            search_params['search[location]'] = location
+        if start:
+            search_params['start'] = start
 
-            if location:
-                search_params['search[location]'] = location
+        # Строим URL
+        return f"{self.search_url}?{urllib.parse.urlencode(search_params, doseq=True)}"
 
-            # Строим URL
-            url = f"{self.search_url}?{urllib.parse.urlencode(search_params, doseq=True)}"
-            logger.info(f"Searching jobs at: {url}")
+    def _discover_page_offsets(self, markup):
+        """
+        Смещения остальных страниц по ссылкам пагинации первой страницы
+        (?start=30, 60, ... и ссылка на последнюю страницу). Ищем прямо в
+        разметке - пагинация в дерево карточек не попадает.
+        """
+        starts = set()
+        for href in self.HREF_RE.findall(markup):
+            starts.update(int(start) for start in self.START_RE.findall(html.unescape(href)))
+        starts.discard(0)
+        if not starts:
+            return []
+        step = min(min(starts), self.PAGE_SIZE)
+        return list(range(step, max(starts) + 1, step))
 
-            # Получаем страницу
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
+    def _parse_results_page(self, soup):
+        """Все вакансии одной страницы результатов"""
+        jobs = []
 
-            # Сохраняем для отладки
-            with open("cvkeskus_debug.html", "w", encoding="utf-8") as f:
-                f.write(response.text)
+        # Ищем вакансии - используем правильный селектор на основе реальной структуры
+        job_elements = soup.find_all('article', attrs={'data-component': 'jobad'})
 
-            # Парсим HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
+        if not job_elements:
+            # Альтернативный поиск по атрибуту data-href
+            job_elements = soup.find_all(attrs={'data-href': lambda x: x and 'toopakkumised' in x})
+            logger.info(f"Found {len(job_elements)} jobs with data-href selector")
+        else:
+            logger.info(f"Found {len(job_elements)} jobs with data-component='jobad' selector")
 
-            jobs = []
+        if not job_elements:
+            # Последняя попытка - найти все ссылки на вакансии
+            job_links = soup.find_all('a', href=lambda x: x and '/toopakkumised/' in x)
+            logger.info(f"Found {len(job_links)} job links")
+
+            for link in job_links:
+                job_data = self._parse_job_from_link(link, soup)
+                if job_data:
+                    jobs.append(job_data)
+        else:
+            # Парсим найденные элементы вакансий
+            for job_element in job_elements:
+                job_data = self._parse_job_element(job_element)
+                if job_data:
+                    jobs.append(job_data)
+        return jobs
+
+    def _parse_page_markup(self, markup):
+        """Вакансии страницы: разбираются только карточки, вся страница - если карточек нет"""
+        cards = parse_cards(markup, self.CARD_CONTAINERS, source='cvkeskus')
+        if not cards:
+            # Разметка изменилась - полный разбор с запасными селекторами
+            return self._parse_results_page(parse_html(markup, source='cvkeskus'))
+        logger.info(f"Found {len(cards)} jobs with data-component='jobad' selector")
+        jobs = []
+        for card in cards:
+            job_data = self._parse_job_element(card)
+            if job_data:
+                jobs.append(job_data)
+        return jobs
 
-            # Ищем вакансии - используем правильный селектор на основе реальной структуры
-            job_elements = soup.find_all('article', attrs={'data-component': 'jobad'})
+    def _unique_jobs(self, jobs, seen):
+        """
+        Отбрасываем вакансии, уже встреченные на предыдущих страницах.
+        Ключ один для сырых и нормализованных вакансий - URL, как source_url в БД.
+        """
+        unique = []
+        for job in jobs:
+            key = job.get('source_url') or job.get('url')
+            if key:
+                if key in seen:
+                    continue
+                seen.add(key)
+            unique.append(job)
+        return unique
 
-            if not job_elements:
-                # Альтернативный поиск по атрибуту data-href
-                job_elements = soup.find_all(attrs={'data-href': lambda x: x and 'toopakkumised' in x})
-                logger.info(f"Found {len(job_elements)} jobs with data-href selector")
-            else:
-                logger.info(f"Found {len(job_elements)} jobs with data-component='jobad' selector")
+    def iter_job_pages(self, keywords="", location="", max_pages=None, normalized=False, run=None):
+        """
+        Вакансии постранично: первая страница определяет число страниц,
+        остальные загружаются параллельно (лимиты хоста в AsyncFetcher),
+        разбираются в пуле процессов (ParsePipeline) и отдаются по мере
+        готовности - без дубликатов между страницами.
+        :param max_pages: ограничение числа страниц (None - все)
+        :param normalized: отдавать вакансии уже приведенными к полям Job
+        :param run: ScrapeRunTracker - продолжение с курсора и остановка на известных вакансиях
+        """
+        pages = self._iter_fetched_pages(keywords, location, max_pages, normalized, run)
+        if run is not None:
+            yield from run.track(pages)
+            return
+        for page_url, jobs in pages:
+            if jobs is not None:
+                yield jobs
 
-            if not job_elements:
-                # Последняя попытка - найти все ссылки на вакансии
-                job_links = soup.find_all('a', href=lambda x: x and '/toopakkumised/' in x)
-                logger.info(f"Found {len(job_links)} job links")
+    def _iter_fetched_pages(self, keywords, location, max_pages, normalized, run):
+        """(URL страницы, вакансии) в порядке загрузки; вакансии None - страница не загрузилась"""
+        url = self._build_search_url(keywords, location)
+        logger.info(f"Searching jobs at: {url}")
 
-                for link in job_links:
-                    job_data = self._parse_job_from_link(link, soup)
-                    if job_data:
-                        jobs.append(job_data)
-            else:
-                # Парсим найденные элементы вакансий
-                for job_element in job_elements:
-                    job_data = self._parse_job_element(job_element)
-                    if job_data:
-                        jobs.append(job_data)
+        # Получаем страницу через общий fetcher (ретраи и лимиты хоста); сырой ответ
+        # сохраняется в архив страниц (apps/scraping/archive.py)
+        response = self.fetcher.fetch_all([url], archive=self.name, cache=self.name)[0]
+        if not response.ok:
+            raise RuntimeError(f"Failed to fetch {url}: {response.error}")
 
-            # Ограничиваем количество результатов если указан limit
-            if limit and len(jobs) > limit:
-                jobs = jobs[:limit]
-                logger.info(f"Limited results to {limit} jobs")
+        seen = set()
+        first_page = self._parse_page_markup(response.text)
+        if normalized:
+            first_page = [row for row in (normalize_job_data(job, self.name) for job in first_page) if row]
+        if run is not None:
+            run.plan([url])
+        yield url, self._unique_jobs(first_page, seen)
+
+        offsets = self._discover_page_offsets(response.text)
+        if max_pages is not None:
+            offsets = offsets[:max(max_pages - 1, 0)]
+        page_urls = [self._build_search_url(keywords, location, start) for start in offsets]
+        if run is not None:
+            # Страницы, записанные прерванной попыткой этого запуска, не загружаются
+            page_urls = run.plan(page_urls)
+        if not page_urls:
+            return
+        logger.info(f"Fetching {len(page_urls)} more CV Keskus result pages")
+
+        pipeline = ParsePipeline(
+            parse_results_page, self.fetcher, source_site=self.name if normalized else None,
+            archive=self.name, cache=self.name,
+        )
+        for page in pipeline.iter_pages(page_urls):
+            if page['error']:
+                logger.warning(f"Skipping CV Keskus page {page['url']}: {page['error']}")
+                yield page['url'], None
+                continue
+            yield page['url'], self._unique_jobs(page['jobs'], seen)
+        logger.info(
+            f"CV Keskus pages parsed: {pipeline.stats['pages']} ({pipeline.stats['failed']} failed), "
+            f"{pipeline.stats['parse_seconds']:.2f}s parsing"
+        )
+
+    def search_jobs(self, keywords="", location="", max_pages=1, limit=None):
+        """Поиск вакансий на CV Keskus"""
+        try:
+            jobs = []
+            pages = self.iter_job_pages(keywords, location, max_pages)
+            try:
+                for page_jobs in pages:
+                    jobs.extend(page_jobs)
+                    # Ограничиваем количество результатов если указан limit
+                    if limit and len(jobs) >= limit:
+                        jobs = jobs[:limit]
+                        logger.info(f"Limited results to {limit} jobs")
+                        break
+            finally:
+                pages.close()
 
             logger.info(f"Successfully parsed {len(jobs)} jobs")
             return jobs
@@ -387,6 +478,17 @@ class CVKeskusScraper:
             logger.error(f"Error parsing job from link: {e}")
             return None
 
+@lru_cache(maxsize=None)
+def _page_parser():
+    # Один экземпляр на процесс-воркер разбора: браузер и сеть ему не нужны
+    return CVKeskusScraper()
+
+
+def parse_results_page(markup):
+    """Разбор страницы результатов в процессе-воркере ParsePipeline"""
+    return _page_parser()._parse_page_markup(markup)
+
+
 def cvkeskus_scraper(search_url=None, limit=None):
     """Функция для использования в других модулях"""
     scraper = CVKeskusScraper()
@@ -4,7 +4,11 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from datetime import datetime
-import time
+
+from ..readiness import PageReadiness
+
+# Карточка вакансии: по ней ждем загрузку страницы и по ней же разбираем
+JOB_CARD_SELECTOR = 'article[id^="jobad_"]'
 
 def cvkeskus_selenium_scraper(url, headless=True):
     jobs = []
@@ -21,14 +25,15 @@ def cvkeskus_selenium_scraper(url, headless=True):
     # Wait for job cards to load
     try:
         WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, 'div.cursor-pointer.shadow'))
+            EC.presence_of_element_located((By.CSS_SELECTOR, JOB_CARD_SELECTOR))
         )
-        time.sleep(2)  # Give time for all jobs to load
+        # Wait until no more job cards are being added
+        PageReadiness(driver).element_count_stable(JOB_CARD_SELECTOR)
     except Exception as e:
         print(f"Timeout waiting for job cards: {e}")
 
     # job_cards = driver.find_elements(By.CSS_SELECTOR, 'div.cursor-pointer.shadow')
-    job_cards = driver.find_elements(By.CSS_SELECTOR, 'article[id^=\"jobad_\"]')
+    job_cards = driver.find_elements(By.CSS_SELECTOR, JOB_CARD_SELECTOR)
     print(f"[DEBUG] Found {len(job_cards)} job cards on the page.")
     if job_cards:
         try:
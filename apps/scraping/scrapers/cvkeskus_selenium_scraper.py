@@ -5,7 +5,7 @@ from webdriver_manager.chrome import ChromeDriverManager
 from bs4 import BeautifulSoup
 from django.utils import timezone
 from ..models import Job, Company
-import time
+from ..readiness import PageReadiness
 
 class CVKeskusSeleniumScraper:
     BASE_URL = 'https://www.cvkeskus.ee/toopakkumised'
@@ -25,7 +25,8 @@ class CVKeskusSeleniumScraper:
 
     def scrape_jobs(self):
         self.driver.get(self.BASE_URL)
-        time.sleep(5)  # Дать странице прогрузиться
+        # Ждем, пока список вакансий прогрузится
+        PageReadiness(self.driver).element_count_stable('article.bg-white')
         soup = BeautifulSoup(self.driver.page_source, 'html.parser')
         job_cards = soup.find_all('article', class_='bg-white')
         jobs_created = 0
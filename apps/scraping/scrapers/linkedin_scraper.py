@@ -1,11 +1,17 @@
+import re
 import time
 import json
 import logging
-from typing import List, Dict, Optional
-from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+from datetime import datetime, timedelta
 import requests
-from bs4 import BeautifulSoup
 from django.conf import settings
+from django.utils import timezone
+
+from ..fetcher import AsyncFetcher, build_url
+from ..html_parser import parse_cards, parse_html
+from ..http_cache import install_http_cache
 
 logger = logging.getLogger(__name__)
 
@@ -17,10 +23,20 @@ class LinkedInScraper:
         'Accept-Language': 'en-US,en;q=0.5',
         'Connection': 'keep-alive',
     }
+    # Job card containers (alternatives for older layouts); only these subtrees are parsed
+    CARD_CONTAINERS = [
+        ('div', {'class': 'base-card'}),
+        ('div', {'class': 'job-search-card'}),
+        ('li', {'class': 'result-card'}),
+        ('div', {'class': 'base-search-card'}),
+    ]
 
     def __init__(self, session: Optional[requests.Session] = None):
         self.session = session or requests.Session()
         self.session.headers.update(self.HEADERS)
+        # Страницы вакансий: условные запросы и TTL из HTTP_CACHE['ttl']['linkedin_job']
+        install_http_cache(self.session, 'linkedin_job')
+        self.fetcher = AsyncFetcher(headers=dict(self.session.headers))
         self._setup_auth()
 
     def _setup_auth(self):
@@ -113,135 +129,183 @@ class LinkedInScraper:
             logger.error(f"Error parsing job card: {str(e)}")
             return None
 
-    def search_jobs(self, keywords: List[str], location: str = None, max_pages: int = 5) -> List[Dict]:
-        """Search for jobs on LinkedIn"""
-        all_jobs = []
+    def parse_search_page(self, html: str) -> List[Dict]:
+        """Parse the job cards of one search results page (only card subtrees are built)"""
+        jobs = []
+        for card in parse_cards(html, self.CARD_CONTAINERS, source='linkedin'):
+            job_data = self._parse_job_card(card)
+            if job_data and job_data.get('title') != 'Unknown Title':
+                job_data['posted_date'] = job_data.get('posted_date') or ''
+                jobs.append(job_data)
+        return jobs
+
+    def iter_job_pages(self, keywords: List[str], location: str = None, max_pages: int = 5,
+                       run=None) -> Iterator[List[Dict]]:
+        """
+        Yield the new unique jobs of every search results page as soon as the
+        page is fetched and parsed (pages arrive in completion order).
+        run - ScrapeRunTracker: resume from its cursor, stop at already known jobs
+        """
+        pages = self._iter_fetched_pages(keywords, location, max_pages, run)
+        if run is not None:
+            yield from run.track(pages)
+            return
+        for page_url, jobs in pages:
+            if jobs is not None:
+                yield jobs
+
+    def _iter_fetched_pages(self, keywords: List[str], location: Optional[str], max_pages: int,
+                            run) -> Iterator[Tuple[str, Optional[List[Dict]]]]:
+        """(page URL, unique jobs) in completion order; jobs is None when the page failed"""
         seen_urls = set()  # Для дедупликации по URL
         seen_signatures = set()  # Для дедупликации по title + company + posted_date
         
-        for page in range(max_pages):
+        base_params = {
+            'keywords': ' '.join(keywords),
+            'location': location or 'Estonia',
+        }
+        # LinkedIn shows 25 jobs per page; страницы грузятся параллельно,
+        # вежливость обеспечивает лимит хоста в AsyncFetcher
+        page_urls = [
+            build_url(self.BASE_URL, dict(base_params, start=page * 25))
+            for page in range(max_pages)
+        ]
+        page_numbers = {url: page + 1 for page, url in enumerate(page_urls)}
+        if run is not None:
+            page_urls = run.plan(page_urls)
+        logger.info(f"Searching LinkedIn ({len(page_urls)} pages) with params: {base_params}")
+        
+        for result in self.fetcher.iter_fetched(page_urls, archive='linkedin', cache='linkedin'):
+            page = page_numbers[result.url]
+            if not result.ok:
+                logger.error(f"Error searching jobs on page {page}: {result.error}")
+                yield result.url, None
+                continue
             try:
-                params = {
-                    'keywords': ' '.join(keywords),
-                    'location': location or 'Estonia',
-                    'start': page * 25,  # LinkedIn shows 25 jobs per page
-                }
-                
-                logger.info(f"Searching LinkedIn page {page + 1} with params: {params}")
-                
-                response = self.session.get(self.BASE_URL, params=params)
-                response.raise_for_status()
+                page_jobs = self.parse_search_page(result.text)
+            except Exception as e:
+                logger.error(f"Error searching jobs on page {page}: {str(e)}")
+                yield result.url, None
+                continue
+            logger.info(f"Found {len(page_jobs)} job cards on page {page}")
+            if not page_jobs:
+                logger.warning(f"No job cards found on page {page}")
+                continue
+            
+            unique_jobs = []
+            for job_data in page_jobs:
+                # Создаем уникальную сигнатуру вакансии
+                job_signature = f"{job_data.get('title', '')}-{job_data.get('company', '')}-{job_data['posted_date']}"
+                job_url = job_data.get('url')
                 
-                soup = BeautifulSoup(response.text, 'html.parser')
+                # Проверяем дубликаты по URL и сигнатуре
+                is_duplicate = False
+                if job_url:
+                    is_duplicate = job_url in seen_urls
+                    if not is_duplicate:
+                        seen_urls.add(job_url)
                 
-                # Попробуем разные селекторы для карточек вакансий
-                job_cards = (
-                    soup.find_all('div', class_='base-card') or
-                    soup.find_all('div', class_='job-search-card') or
-                    soup.find_all('li', class_='result-card') or
-                    soup.find_all('div', class_='base-search-card')
+                if not is_duplicate:
+                    is_duplicate = job_signature in seen_signatures
+                    if not is_duplicate:
+                        seen_signatures.add(job_signature)
+                        unique_jobs.append(job_data)
+            yield result.url, unique_jobs
+
+    def search_jobs(self, keywords: List[str], location: str = None, max_pages: int = 5) -> List[Dict]:
+        """Search for jobs on LinkedIn"""
+        all_jobs = [job for page_jobs in self.iter_job_pages(keywords, location, max_pages) for job in page_jobs]
+        logger.info(f"Total unique jobs found: {len(all_jobs)}")
+        return all_jobs
+
+    # "2 weeks ago", "1 month ago", "Reposted 3 days ago"
+    RELATIVE_DATE_RE = re.compile(r'(\d+)\s+(minute|hour|day|week|month|year)s?\s+ago', re.IGNORECASE)
+    RELATIVE_DATE_UNITS = {
+        'minute': timedelta(minutes=1),
+        'hour': timedelta(hours=1),
+        'day': timedelta(days=1),
+        'week': timedelta(weeks=1),
+        'month': timedelta(days=30),
+        'year': timedelta(days=365),
+    }
+
+    def _parse_posted_date(self, text: str) -> Optional[datetime]:
+        """Convert LinkedIn's relative posting date into an aware datetime"""
+        match = self.RELATIVE_DATE_RE.search(text or '')
+        if not match:
+            return None
+        amount, unit = int(match.group(1)), match.group(2).lower()
+        return timezone.now() - amount * self.RELATIVE_DATE_UNITS[unit]
+
+    def parse_job_details(self, html: str) -> Dict:
+        """Parse a LinkedIn job page (description, posting date, employment type)"""
+        soup = parse_html(html, source='linkedin')
+        
+        # Extract job description
+        description_selectors = [
+            'div.show-more-less-html__markup',
+            'div.description__text',
+            'div.jobs-description-content__text',
+            'div.jobs-box__html-content'
+        ]
+        
+        description = ''
+        for selector in description_selectors:
+            desc_element = soup.select_one(selector)
+            if desc_element:
+                description = desc_element.get_text(separator='\n', strip=True)
+                break
+        
+        # Extract additional details
+        details = {
+            'description': description,
+            'posted_date': None,
+            'employment_type': None,
+            'experience_level': None
+        }
+        
+        # Try to get posting date
+        date_selectors = [
+            'span.posted-time-ago__text',
+            'time.job-posted-date',
+            'span.jobs-unified-top-card__posted-date'
+        ]
+        
+        for selector in date_selectors:
+            date_element = soup.select_one(selector)
+            if date_element:
+                details['posted_date'] = (
+                    date_element.get('datetime') or
+                    self._parse_posted_date(date_element.get_text(strip=True))
                 )
-                
-                logger.info(f"Found {len(job_cards)} job cards on page {page + 1}")
-                
-                if not job_cards:
-                    logger.warning(f"No job cards found on page {page + 1}")
-                    break
-                
-                for card in job_cards:
-                    job_data = self._parse_job_card(card)
-                    if job_data and job_data.get('title') != 'Unknown Title':
-                        # Получаем дату публикации
-                        date_element = card.find('time', class_='job-search-card__listdate') or \
-                                     card.find('time', class_='job-posted-date') or \
-                                     card.find('time')
-                        posted_date = date_element.get('datetime') if date_element else ''
-                        
-                        # Создаем уникальную сигнатуру вакансии
-                        job_signature = f"{job_data.get('title', '')}-{job_data.get('company', '')}-{posted_date}"
-                        job_url = job_data.get('url')
-                        
-                        # Проверяем дубликаты по URL и сигнатуре
-                        is_duplicate = False
-                        if job_url:
-                            is_duplicate = job_url in seen_urls
-                            if not is_duplicate:
-                                seen_urls.add(job_url)
-                        
-                        if not is_duplicate:
-                            is_duplicate = job_signature in seen_signatures
-                            if not is_duplicate:
-                                seen_signatures.add(job_signature)
-                                job_data['posted_date'] = posted_date
-                                all_jobs.append(job_data)
-                
-                # Respect rate limiting
-                time.sleep(2)
-                
-            except Exception as e:
-                logger.error(f"Error searching jobs on page {page}: {str(e)}")
                 break
         
-        logger.info(f"Total unique jobs found: {len(all_jobs)}")
-        return all_jobs
+        # Блок критериев: "Seniority level", "Employment type", ...
+        for item in soup.select('li.description__job-criteria-item'):
+            header = item.select_one('h3')
+            value = item.select_one('span')
+            if not header or not value:
+                continue
+            header_text = header.get_text(strip=True).lower()
+            if header_text == 'employment type':
+                details['employment_type'] = value.get_text(strip=True)
+            elif header_text == 'seniority level':
+                details['experience_level'] = value.get_text(strip=True)
+        
+        # Try to get employment type
+        if not details['employment_type']:
+            employment_element = soup.select_one('li.jobs-unified-top-card__job-insight span')
+            if employment_element:
+                details['employment_type'] = employment_element.get_text(strip=True)
+        
+        return details
 
     def get_job_details(self, job_url: str) -> Dict:
         """Get detailed information about a specific job"""
         try:
             response = self.session.get(job_url)
             response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Extract job description
-            description_selectors = [
-                'div.show-more-less-html__markup',
-                'div.description__text',
-                'div.jobs-description-content__text',
-                'div.jobs-box__html-content'
-            ]
-            
-            description = ''
-            for selector in description_selectors:
-                desc_element = soup.select_one(selector)
-                if desc_element:
-                    description = desc_element.get_text(strip=True)
-                    break
-            
-            # Extract additional details
-            details = {
-                'description': description,
-                'posted_date': None,
-                'employment_type': None,
-                'experience_level': None
-            }
-            
-            # Try to get posting date
-            date_selectors = [
-                'span.posted-time-ago__text',
-                'time.job-posted-date',
-                'span.jobs-unified-top-card__posted-date'
-            ]
-            
-            for selector in date_selectors:
-                date_element = soup.select_one(selector)
-                if date_element:
-                    details['posted_date'] = date_element.get_text(strip=True)
-                    break
-            
-            # Try to get employment type
-            employment_selectors = [
-                'span.job-criteria-item__text',
-                'li.jobs-unified-top-card__job-insight span'
-            ]
-            
-            for selector in employment_selectors:
-                employment_element = soup.select_one(selector)
-                if employment_element:
-                    details['employment_type'] = employment_element.get_text(strip=True)
-                    break
-            
-            return details
+            return self.parse_job_details(response.text)
             
         except Exception as e:
             logger.error(f"Error getting job details from {job_url}: {str(e)}")
@@ -250,4 +314,31 @@ class LinkedInScraper:
                 'posted_date': None,
                 'employment_type': None,
                 'experience_level': None
-            } 
\ No newline at end of file
+            }
+
+    def fetch_job_details(self, job_urls: List[str]) -> Dict[str, Dict]:
+        """
+        Fetch and parse several job pages concurrently through the shared fetcher
+        (per-host concurrency and rate limits apply, shared with the search
+        pages that may still be streaming in iter_job_pages()).
+        :return: {url: details} for the pages that were loaded successfully
+        """
+        details = {}
+        for result in self.fetcher.fetch_all(job_urls, cache='linkedin_job'):
+            if not result.ok:
+                continue
+            try:
+                details[result.url] = self.parse_job_details(result.text)
+            except Exception as e:
+                logger.error(f"Error parsing job details from {result.url}: {str(e)}")
+        return details
+
+
+@lru_cache(maxsize=None)
+def _page_parser() -> LinkedInScraper:
+    return LinkedInScraper()
+
+
+def parse_search_page(html: str) -> List[Dict]:
+    """Job cards of a search results page (used to reparse archived pages)"""
+    return _page_parser().parse_search_page(html)
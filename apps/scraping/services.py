@@ -1,11 +1,13 @@
-from typing import List, Dict
+from typing import List, Dict, Set
 from .models import Vacancy, JobScore
 import re
 import logging
 import requests
 from django.conf import settings
 from django.utils import timezone
-from .models import Job, UserProfile, Application
+from .job_features import get_features, job_keywords, match_skills, other_keywords
+from .keyword_matcher import KeywordMatcher, get_matcher
+from .models import Job, JobFeatures, UserProfile, Application
 
 logger = logging.getLogger(__name__)
 
@@ -30,38 +32,58 @@ class JobScoringService:
         'senior': ['senior', 'lead', 'principal', 'architect', 'старший']
     }
 
+    # Вес свежести в relevance_score - единственная часть, зависящая от времени
+    FRESHNESS_WEIGHT = 0.2
+
+    @classmethod
+    def keyword_matcher(cls) -> KeywordMatcher:
+        """Один автомат для всех технологий и уровней опыта (собирается один раз)"""
+        return get_matcher(
+            [keyword for keywords in cls.TECH_KEYWORDS.values() for keyword in keywords]
+            + [keyword for keywords in cls.EXPERIENCE_KEYWORDS.values() for keyword in keywords]
+        )
+
     def calculate_relevance_score(self, job: Job) -> int:
         """Расчет общего скора релевантности (0-100)"""
         try:
-            score = 0
-            text = f"{job.title} {job.description}".lower()
-            
-            # Базовый скор за наличие ключевых слов
-            tech_score = self._calculate_tech_score(text)
-            score += tech_score * 0.4
-            
-            # Скор за соответствие уровню опыта
-            experience_score = self._calculate_experience_score(text, job.experience_level)
-            score += experience_score * 0.2
-            
             # Скор за актуальность (новые вакансии получают больше баллов)
             freshness_score = self._calculate_freshness_score(job.created_at)
-            score += freshness_score * 0.2
-            
-            # Скор за полноту информации
-            completeness_score = self._calculate_completeness_score(job)
-            score += completeness_score * 0.2
-            
-            return min(100, max(0, int(score)))
+            return self.combine_relevance(self.calculate_content_score(job), freshness_score)
             
         except Exception as e:
             logger.error(f"Error calculating relevance score for job {job.id}: {str(e)}")
             return 50  # Средний скор по умолчанию
 
+    def calculate_content_score(self, job: Job) -> float:
+        """Часть релевантности, зависящая только от содержимого вакансии (0-80, без свежести)"""
+        score = 0
+        # Ключевые слова title + description из JobFeatures
+        found = job_keywords(job)['text']
+        
+        # Базовый скор за наличие ключевых слов
+        tech_score = self._calculate_tech_score(found)
+        score += tech_score * 0.4
+        
+        # Скор за соответствие уровню опыта
+        experience_score = self._calculate_experience_score(found, job.experience_level)
+        score += experience_score * 0.2
+        
+        # Скор за полноту информации
+        completeness_score = self._calculate_completeness_score(job)
+        score += completeness_score * 0.2
+        
+        return score
+
+    @classmethod
+    def combine_relevance(cls, content_score: float, freshness_score: int) -> int:
+        """relevance_score из содержимой части и свежести (так же считает SQL в update_freshness)"""
+        return min(100, max(0, int(content_score + freshness_score * cls.FRESHNESS_WEIGHT)))
+
     def calculate_skill_match_score(self, job: Job) -> int:
         """Расчет скора соответствия навыков (0-100)"""
         try:
-            text = f"{job.title} {job.description} {job.requirements}".lower()
+            keywords = job_keywords(job)
+            found = keywords['text'] | keywords['requirements']
             
             # Подсчитываем количество найденных технологий
             found_techs = 0
@@ -69,7 +91,7 @@ class JobScoringService:
             
             for tech_category, keywords in self.TECH_KEYWORDS.items():
                 category_weight = len(keywords)
-                found_in_category = sum(1 for keyword in keywords if keyword in text)
+                found_in_category = sum(1 for keyword in keywords if keyword in found)
                 
                 if found_in_category > 0:
                     found_techs += found_in_category
@@ -146,22 +168,22 @@ class JobScoringService:
             logger.error(f"Error calculating location score for job {job.id}: {str(e)}")
             return 60
 
-    def _calculate_tech_score(self, text: str) -> int:
-        """Расчет скора по технологиям"""
+    def _calculate_tech_score(self, found: Set[str]) -> int:
+        """Расчет скора по технологиям (found - найденные KeywordMatcher ключевые слова)"""
         found_keywords = 0
         total_keywords = sum(len(keywords) for keywords in self.TECH_KEYWORDS.values())
         
         for keywords in self.TECH_KEYWORDS.values():
-            found_keywords += sum(1 for keyword in keywords if keyword in text)
+            found_keywords += sum(1 for keyword in keywords if keyword in found)
         
         return min(100, (found_keywords / total_keywords) * 100)
 
-    def _calculate_experience_score(self, text: str, job_level: str) -> int:
+    def _calculate_experience_score(self, found: Set[str], job_level: str) -> int:
         """Расчет скора по уровню опыта"""
         # Если уровень опыта в вакансии соответствует найденным ключевым словам
         if job_level in self.EXPERIENCE_KEYWORDS:
             keywords = self.EXPERIENCE_KEYWORDS[job_level]
-            if any(keyword in text for keyword in keywords):
+            if any(keyword in found for keyword in keywords):
                 return 100
         
         return 70  # Базовый скор если уровень не определен четко
@@ -308,6 +330,7 @@ class NotificationService:
             
             # Получаем навыки пользователя
             user_skills = [skill.strip().lower() for skill in user_profile.skills.split(',') if skill.strip()]
+            skills_matcher = get_matcher(user_skills)
             
             for job in jobs:
                 # Проверяем минимальную зарплату
@@ -323,8 +346,13 @@ class NotificationService:
                 
                 # Проверяем соответствие навыков
                 if user_skills:
-                    job_text = f"{job.title} {job.description} {job.requirements}".lower()
-                    skill_match = any(skill in job_text for skill in user_skills)
+                    features = get_features(job)
+                    if features is not None:
+                        skill_match = bool(match_skills(
+                            features, skills_matcher, f"{job.title} {job.description} {job.requirements}"
+                        ))
+                    else:
+                        skill_match = skills_matcher.matches_any(f"{job.title} {job.description} {job.requirements}")
                     if not skill_match:
                         continue
                 
@@ -361,16 +389,14 @@ class JobAnalyticsService:
                 created_at__gte=last_week
             ).count()
             
-            # Топ технологий
+            # Топ технологий: посчитанные generate_job_analytics или один проход по описаниям
             tech_keywords = ['python', 'javascript', 'java', 'react', 'node.js', 'django']
-            tech_stats = {}
-            
-            for tech in tech_keywords:
-                count = Job.objects.filter(
-                    is_active=True,
-                    description__icontains=tech
-                ).count()
-                tech_stats[tech] = count
+            from django.core.cache import cache
+            cached_stats = (cache.get('job_analytics') or {}).get('technology_stats')
+            if cached_stats:
+                tech_stats = {tech: cached_stats.get(tech, 0) for tech in tech_keywords}
+            else:
+                tech_stats = self.count_technologies(tech_keywords)
             
             # Средние зарплаты по уровням
             salary_by_level = {}
@@ -398,6 +424,30 @@ class JobAnalyticsService:
             logger.error(f"Error getting market trends: {str(e)}")
             return {}
 
+    def count_technologies(self, keywords: List[str] = None) -> Dict[str, int]:
+        """
+        Число активных вакансий, в title + description которых встречается каждая технология.
+        Читает предрасчитанные JobFeatures вместо запроса icontains на технологию.
+        """
+        keywords = keywords or [
+            keyword for keywords in JobScoringService.TECH_KEYWORDS.values() for keyword in keywords
+        ]
+        matcher = get_matcher(keywords)
+        counts = dict.fromkeys(matcher.keywords, 0)
+        # Слова не из словаря признаков ищутся по множеству слов вакансии, фразы - по тексту
+        words, phrases = other_keywords(matcher)
+        fields = ('keywords', 'tokens') + (('job__title', 'job__description') if phrases else ())
+        rows = JobFeatures.objects.filter(job__is_active=True).values_list(*fields)
+        for row in rows.iterator(chunk_size=2000):
+            found = set(row[0]) & counts.keys()
+            if words:
+                found |= matcher.find_words(set(row[1])) & words
+            if phrases:
+                found |= matcher.find(f"{row[2]} {row[3]}") & phrases
+            for keyword in found:
+                counts[keyword] += 1
+        return {keyword: counts[' '.join(keyword.lower().split())] for keyword in keywords}
+
     def _calculate_remote_percentage(self) -> float:
         """Расчет процента удаленных вакансий"""
         try:
@@ -1,7 +1,7 @@
-from celery import shared_task
+from celery import shared_task, group, chord
 from django.utils import timezone
 from django.core.management import call_command
-from django.db import transaction
+from django.db import transaction, connection
 from django.conf import settings
 import logging
 import subprocess
@@ -10,14 +10,25 @@ import requests
 from typing import List, Dict
 # import redis  # Redis отключен для разработки
 import time
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
 
+from .ingestion import JobIngestionService
+from .enrichment import LinkedInDetailsEnricher
+from .scrape_runs import ScrapeRunInProgress, ScrapeRunTracker
+
 logger = logging.getLogger(__name__)
 
+
+def _format_ingestion_stats(stats: Dict[str, int]) -> str:
+    return f"{stats['new']} new jobs, {stats['updated']} updated, {stats['unchanged']} unchanged"
+
+
 @shared_task
-def scrape_cv_ee_jobs():
+def scrape_cv_ee_jobs(incremental: bool = True):
     """
     Scrape CV.ee jobs and import them into the database
+    (incremental - stop paginating at already imported jobs)
     """
     def set_progress(scraper_name, percent):
         pass  # Redis отключен для разработки
@@ -26,79 +37,47 @@ def scrape_cv_ee_jobs():
         logger.info("Starting CV.ee scraping task")
         
         from .scrapers.cv_ee_selenium_scraper import CVeeSeleniumScraper
-        from .models import Job, Company
         
+        keywords = ["python", "django", "javascript", "react", "vue", "angular", "node.js"]
+        # Прерванный запуск продолжается с курсора, на уже известных вакансиях пагинация останавливается
+        run = ScrapeRunTracker.start('cv_ee', incremental, keywords=keywords, location="Tallinn")
         scraper = CVeeSeleniumScraper()
-        jobs_data = scraper.search_jobs(
-            keywords=["python", "django", "javascript", "react", "vue", "angular", "node.js"],
-            location="Tallinn",
-            max_pages=3
-        )
-        
-        imported_count = 0
-        updated_count = 0
-        total = len(jobs_data) if jobs_data else 1
-        
-        with transaction.atomic():
-            for i, job_data in enumerate(jobs_data):
-                try:
-                    # Создаем или получаем компанию
-                    company = None
-                    if job_data.get('company'):
-                        company, created = Company.objects.get_or_create(
-                            name=job_data['company'],
-                            defaults={'location': job_data.get('location', '')}
-                        )
-                    
-                    # Создаем или обновляем вакансию
-                    job, created = Job.objects.update_or_create(
-                        source_url=job_data['source_url'],
-                        defaults={
-                            'title': job_data['title'],
-                            'company': company,
-                            'company_name': job_data.get('company', ''),
-                            'location': job_data.get('location', ''),
-                            'description': job_data.get('description', ''),
-                            'requirements': job_data.get('requirements', ''),
-                            'source_site': 'cv_ee',
-                            'salary_min': job_data.get('salary_min'),
-                            'salary_max': job_data.get('salary_max'),
-                            'salary_currency': job_data.get('salary_currency', 'EUR'),
-                            'is_remote': job_data.get('is_remote', False),
-                            'experience_level': job_data.get('experience_level', 'any'),
-                            'employment_type': job_data.get('employment_type'),
-                            'posted_date': job_data.get('posted_date'),
-                            'is_active': True
-                        }
-                    )
-                    
-                    if created:
-                        imported_count += 1
-                    else:
-                        updated_count += 1
-                        
-                except Exception as e:
-                    logger.error(f"Error processing job {job_data.get('title', 'Unknown')}: {str(e)}")
-                    continue
-                set_progress('cvee', int((i + 1) / total * 100))
+        # Страницы пишутся в БД микро-батчами, пока остальные еще загружаются
+        try:
+            stats = JobIngestionService('cv_ee').ingest_stream(
+                scraper.iter_job_pages(keywords=keywords, location="Tallinn", max_pages=3, run=run),
+                on_batch=run.on_batch,
+            )
+        except Exception as e:
+            run.fail(e)
+            raise
+        finally:
+            scraper.close()
+        run.finish()
         
         set_progress('cvee', 100)
-        logger.info(f"CV.ee scraping completed: {imported_count} new, {updated_count} updated")
+        logger.info(f"CV.ee scraping completed: {_format_ingestion_stats(stats)} ({run.summary()})")
         
         # Запускаем расчет скоров для новых вакансий
         # calculate_job_scores.delay()  # Celery отключен для разработки
         
-        return f"CV.ee scraping completed: {imported_count} new jobs, {updated_count} updated"
+        return f"CV.ee scraping completed: {_format_ingestion_stats(stats)} ({run.summary()})"
         
+    except ScrapeRunInProgress as e:
+        # Тот же запрос уже скрапится (пересечение расписаний) - этот тик пропускаем
+        logger.info(f"CV.ee scraping skipped: {e}")
+        return f"CV.ee scraping skipped: {e}"
+
     except Exception as e:
         logger.error(f"Error in CV.ee scraping task: {str(e)}")
         set_progress('cvee', 0)
         return f"Error: {str(e)}"
 
 @shared_task
-def scrape_linkedin_jobs():
+def scrape_linkedin_jobs(incremental: bool = True):
     """
     Scrape LinkedIn jobs and import them into the database
+    (incremental - stop paginating at already imported jobs)
     """
     def set_progress(scraper_name, percent):
         pass  # Redis отключен для разработки
@@ -107,7 +86,7 @@ def scrape_linkedin_jobs():
         logger.info("Starting LinkedIn scraping task")
         
         from .scrapers.linkedin_scraper import LinkedInScraper
-        from .models import Job, Company, LinkedInAuth
+        from .models import LinkedInAuth
         
         # Получаем активные учетные данные LinkedIn
         linkedin_auth = LinkedInAuth.objects.filter(is_active=True).first()
@@ -117,70 +96,53 @@ def scrape_linkedin_jobs():
             return "No LinkedIn credentials available"
         
         scraper = LinkedInScraper()
-        jobs_data = scraper.search_jobs(
-            keywords=["software engineer", "developer", "programmer"],
-            location="Estonia",
-            max_pages=3
-        )
-        
-        imported_count = 0
-        updated_count = 0
-        total = len(jobs_data) if jobs_data else 1
-        
-        with transaction.atomic():
-            for i, job_data in enumerate(jobs_data):
-                try:
-                    # Создаем или получаем компанию
-                    company = None
-                    if job_data.get('company'):
-                        company, created = Company.objects.get_or_create(
-                            name=job_data['company'],
-                            defaults={'location': job_data.get('location', '')}
-                        )
-                    
-                    # Создаем или обновляем вакансию
-                    job, created = Job.objects.update_or_create(
-                        source_url=job_data['url'],
-                        defaults={
-                            'title': job_data['title'],
-                            'company': company,
-                            'company_name': job_data.get('company', ''),
-                            'location': job_data.get('location', ''),
-                            'description': job_data.get('description', ''),
-                            'source_site': 'linkedin',
-                            'is_remote': job_data.get('is_remote', False),
-                            'experience_level': job_data.get('experience_level', 'any'),
-                            'is_active': True
-                        }
-                    )
-                    
-                    if created:
-                        imported_count += 1
-                    else:
-                        updated_count += 1
-                        
-                except Exception as e:
-                    logger.error(f"Error processing LinkedIn job {job_data.get('title', 'Unknown')}: {str(e)}")
-                    continue
-                set_progress('linkedin', int((i + 1) / total * 100))
+        enricher = LinkedInDetailsEnricher(scraper=scraper)
+        details_stats = {'enriched': 0, 'skipped': 0, 'failed': 0}
+        keywords = ["software engineer", "developer", "programmer"]
+        run = ScrapeRunTracker.start('linkedin', incremental, keywords=keywords, location="Estonia")
+
+        def enrich_batch(jobs, batch_stats):
+            run.on_batch(jobs, batch_stats)
+            # Догружаем полные описания для новых/измененных вакансий записанного батча
+            for key, value in enricher.enrich([job.get('url') for job in jobs]).items():
+                details_stats[key] += value
+
+        try:
+            stats = JobIngestionService('linkedin').ingest_stream(
+                scraper.iter_job_pages(keywords=keywords, location="Estonia", max_pages=3, run=run),
+                on_batch=enrich_batch,
+            )
+        except Exception as e:
+            run.fail(e)
+            raise
+        run.finish()
         
         set_progress('linkedin', 100)
-        logger.info(f"LinkedIn scraping completed: {imported_count} new, {updated_count} updated")
+        summary = (
+            f"{_format_ingestion_stats(stats)}, {details_stats['enriched']} job pages loaded ({run.summary()})"
+        )
+        logger.info(f"LinkedIn scraping completed: {summary}")
         
         # Запускаем расчет скоров для новых вакансий
         # calculate_job_scores.delay()  # Celery отключен для разработки
         
-        return f"LinkedIn scraping completed: {imported_count} new jobs, {updated_count} updated"
+        return f"LinkedIn scraping completed: {summary}"
         
+    except ScrapeRunInProgress as e:
+        # Тот же запрос уже скрапится (пересечение расписаний) - этот тик пропускаем
+        logger.info(f"LinkedIn scraping skipped: {e}")
+        return f"LinkedIn scraping skipped: {e}"
+
     except Exception as e:
         logger.error(f"Error in LinkedIn scraping task: {str(e)}")
         set_progress('linkedin', 0)
         return f"Error: {str(e)}"
 
 @shared_task
-def scrape_cvkeskus_jobs():
+def scrape_cvkeskus_jobs(incremental: bool = True):
     """
     Scrape CVKeskus jobs and import them into the database
+    (incremental - stop paginating at already imported jobs)
     """
     def set_progress(scraper_name, percent):
         pass  # Redis отключен для разработки
@@ -189,151 +151,251 @@ def scrape_cvkeskus_jobs():
         logger.info("Starting CVKeskus scraping task")
         
         from .scrapers.cvkeskus_scraper import CVKeskusScraper
-        from .models import Job, Company
         
         scraper = CVKeskusScraper()
-        jobs_data = scraper.search_jobs(
-            max_pages=3
-        )
-        
-        imported_count = 0
-        updated_count = 0
-        total = len(jobs_data) if jobs_data else 1
-        
-        with transaction.atomic():
-            for i, job_data in enumerate(jobs_data):
-                try:
-                    # Создаем или получаем компанию
-                    company = None
-                    if job_data.get('company'):
-                        company, created = Company.objects.get_or_create(
-                            name=job_data['company'],
-                            defaults={'location': job_data.get('location', '')}
-                        )
-                    
-                    # Создаем или обновляем вакансию
-                    job, created = Job.objects.update_or_create(
-                        source_url=job_data['url'],
-                        defaults={
-                            'title': job_data['title'],
-                            'company': company,
-                            'company_name': job_data.get('company', ''),
-                            'location': job_data.get('location', ''),
-                            'description': job_data.get('description', ''),
-                            'source_site': 'cvkeskus',
-                            'salary_min': job_data.get('salary_min'),
-                            'salary_max': job_data.get('salary_max'),
-                            'salary_currency': 'EUR',
-                            'is_remote': False,  # CVKeskus doesn't provide this info directly
-                            'employment_type': job_data.get('employment_type', 'full_time'),
-                            'is_active': True
-                        }
-                    )
-                    
-                    if created:
-                        imported_count += 1
-                    else:
-                        updated_count += 1
-                        
-                except Exception as e:
-                    logger.error(f"Error processing job {job_data.get('title', 'Unknown')}: {str(e)}")
-                    continue
-                set_progress('cvkeskus', int((i + 1) / total * 100))
+        # CVKeskus не отдает тип занятости и удаленку явно
+        ingestion = JobIngestionService('cvkeskus', defaults={'employment_type': 'full_time'})
+        
+        run = ScrapeRunTracker.start('cvkeskus', incremental, keywords="", location="")
+        
+        # Все страницы IT категории; страницы разбираются и нормализуются в пуле процессов
+        # и пишутся в БД микро-батчами, пока остальные еще загружаются
+        try:
+            stats = ingestion.ingest_stream(
+                scraper.iter_job_pages(max_pages=None, normalized=True, run=run),
+                on_batch=run.on_batch,
+            )
+        except Exception as e:
+            run.fail(e)
+            raise
+        run.finish()
         
         set_progress('cvkeskus', 100)
-        logger.info(f"CVKeskus scraping completed: {imported_count} new, {updated_count} updated")
+        logger.info(f"CVKeskus scraping completed: {_format_ingestion_stats(stats)} ({run.summary()})")
         
         # Запускаем расчет скоров для новых вакансий
         # calculate_job_scores.delay()  # Celery отключен для разработки
         
-        return f"CVKeskus scraping completed: {imported_count} new jobs, {updated_count} updated"
+        return f"CVKeskus scraping completed: {_format_ingestion_stats(stats)} ({run.summary()})"
         
+    except ScrapeRunInProgress as e:
+        # Тот же запрос уже скрапится (пересечение расписаний) - этот тик пропускаем
+        logger.info(f"CVKeskus scraping skipped: {e}")
+        return f"CVKeskus scraping skipped: {e}"
+
     except Exception as e:
         logger.error(f"Error in CVKeskus scraping task: {str(e)}")
         set_progress('cvkeskus', 0)
         return f"Error: {str(e)}"
 
+# Источники для scrape_all_sources: ключ -> (название для отчета, задача)
+SCRAPE_SOURCES = {
+    'cv_ee': ('CV.ee', scrape_cv_ee_jobs),
+    'linkedin': ('LinkedIn', scrape_linkedin_jobs),
+    'cvkeskus': ('CVKeskus', scrape_cvkeskus_jobs),
+}
+
+
+def _run_scrape_source(source: str, incremental: bool = True) -> Dict:
+    """
+    Run a single source scraper, timing it and isolating its failure
+    """
+    label, task = SCRAPE_SOURCES[source]
+    started = time.monotonic()
+    try:
+        result = task(incremental=incremental)
+        if str(result).startswith('Error'):
+            status = 'failed'
+        elif ' scraping skipped: ' in str(result):
+            status = 'skipped'
+        else:
+            status = 'completed'
+    except Exception as e:
+        logger.error(f"Unhandled error in {label} scraper: {str(e)}")
+        result = f"Error: {str(e)}"
+        status = 'failed'
+    finally:
+        # Каждый поток работает со своим подключением к БД - закрываем его
+        connection.close()
+
+    duration = round(time.monotonic() - started, 2)
+    logger.info(f"{label} scraper {status} in {duration}s")
+    return {
+        'source': source,
+        'label': label,
+        'status': status,
+        'result': result,
+        'duration': duration,
+    }
+
+
+def _format_scrape_results(results: List[Dict]) -> str:
+    """Build the text summary returned by scrape_all_sources"""
+    return "\n".join(
+        f"{r['label']} ({r['duration']}s, {r['status']}): {r['result']}" for r in results
+    )
+
+
+@shared_task
+def run_scrape_source(source: str, incremental: bool = True) -> Dict:
+    """
+    Celery wrapper around a single source scraper (used by the fan-out in scrape_all_sources)
+    """
+    return _run_scrape_source(source, incremental)
+
+
 @shared_task
-def scrape_all_sources():
+def collect_scrape_results(results: List[Dict]) -> str:
     """
-    Scrape all configured job sources
+    Chord callback: log per-source results of scrape_all_sources
+    """
+    results = sorted(results, key=lambda r: list(SCRAPE_SOURCES).index(r['source']))
+    failed = [r['label'] for r in results if r['status'] == 'failed']
+    slowest = max((r['duration'] for r in results), default=0)
+    logger.info(f"All scraping tasks completed, slowest source took {slowest}s, failed: {failed or 'none'}")
+    return _format_scrape_results(results)
+
+
+@shared_task
+def scrape_all_sources(sources: List[str] = None, local: bool = False, incremental: bool = True):
+    """
+    Scrape all configured job sources in parallel.
+
+    With a Celery broker configured every source runs as its own task
+    (group + chord callback when a result backend is available). Without a
+    broker the sources run in a thread pool - the scrapers spend their time
+    waiting on the network and the browser, so threads are enough. In both
+    modes one failing source does not affect the others and the total time
+    is bounded by the slowest source. local=True always uses the thread pool
+    (record/replay runs must stay in this process). incremental=False crawls
+    every results page instead of stopping at already imported jobs.
     """
     try:
-        logger.info("Starting comprehensive job scraping task")
-        results = []
-        
-        # Scrape CV.ee
-        cv_result = scrape_cv_ee_jobs()
-        results.append(f"CV.ee: {cv_result}")
-        
-        # Scrape LinkedIn
-        linkedin_result = scrape_linkedin_jobs()
-        results.append(f"LinkedIn: {linkedin_result}")
-        
-        # Scrape CVKeskus
-        cvkeskus_result = scrape_cvkeskus_jobs()
-        results.append(f"CVKeskus: {cvkeskus_result}")
-        
-        logger.info("All scraping tasks completed")
-        return "\n".join(results)
-        
+        sources = [s for s in (sources or SCRAPE_SOURCES) if s in SCRAPE_SOURCES]
+        logger.info(f"Starting comprehensive job scraping task for: {', '.join(sources)}")
+
+        if not local and getattr(settings, 'CELERY_BROKER_URL', None):
+            header = group(run_scrape_source.si(source, incremental) for source in sources)
+            if getattr(settings, 'CELERY_RESULT_BACKEND', None):
+                async_result = chord(header)(collect_scrape_results.s())
+            else:
+                async_result = header.apply_async()
+            logger.info(f"Scraping fan-out dispatched to Celery: {async_result.id}")
+            return f"Scraping dispatched for {len(sources)} sources: {async_result.id}"
+
+        started = time.monotonic()
+        max_workers = min(len(sources), getattr(settings, 'SCRAPE_ALL_MAX_WORKERS', len(sources))) or 1
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scrape') as executor:
+            results = list(executor.map(_run_scrape_source, sources, [incremental] * len(sources)))
+
+        total = round(time.monotonic() - started, 2)
+        logger.info(
+            f"All scraping tasks completed in {total}s "
+            f"(sequential would be {round(sum(r['duration'] for r in results), 2)}s)"
+        )
+        return _format_scrape_results(results)
+
     except Exception as e:
         logger.error(f"Error in scrape_all_sources task: {str(e)}")
         return f"Error: {str(e)}"
 
 @shared_task
-def calculate_job_scores():
+def calculate_job_scores(rescore_all: bool = False):
     """
-    Calculate relevance scores for all active jobs
+    Calculate scores for active jobs that have none or changed since scoring
+    (new and changed jobs are normally scored right after ingestion,
+    this catches the ones that were missed; rescore_all - every active job)
     """
     try:
-        from .models import Job, JobScore, UserProfile
-        from .services import JobScoringService
+        from django.db.models import F, Q
+        from .models import Job
+        from .scoring import BatchJobScorer
         
         logger.info("Starting job scoring calculation")
         
-        # Получаем все активные вакансии без скоров или с устаревшими скорами
-        cutoff_date = timezone.now() - timezone.timedelta(hours=24)
-        jobs_to_score = Job.objects.filter(
-            is_active=True
-        ).exclude(
-            jobscore__updated_at__gte=cutoff_date
+        # Вакансии без скоров или измененные после расчета; свежесть обновляет update_job_freshness
+        jobs_to_score = Job.objects.filter(is_active=True)
+        if not rescore_all:
+            jobs_to_score = jobs_to_score.filter(
+                Q(jobscore__isnull=True)
+                | Q(jobscore__content_score__isnull=True)
+                | Q(jobscore__calculated_at__lt=F('updated_at'))
+            )
+        
+        # Скоры считаются чанками в NumPy и пишутся одним bulk upsert на чанк
+        stats = BatchJobScorer().score_queryset(jobs_to_score)
+        
+        logger.info(
+            f"Job scoring completed: {stats['scored']} jobs scored, "
+            f"{stats['failed']} failed in {stats['seconds']}s"
         )
+        return f"Scored {stats['scored']} jobs"
+        
+    except Exception as e:
+        logger.error(f"Error in job scoring task: {str(e)}")
+        return f"Error: {str(e)}"
+
+@shared_task
+def score_jobs(job_ids: List[int]):
+    """
+    Score new or changed jobs (queued by ingestion via scoring.enqueue_scoring)
+    """
+    try:
+        from .models import Job
+        from .scoring import BatchJobScorer
         
-        scoring_service = JobScoringService()
-        scored_count = 0
+        stats = BatchJobScorer().score_queryset(Job.objects.filter(id__in=job_ids))
+        return f"Scored {stats['scored']} jobs"
         
-        for job in jobs_to_score:
-            try:
-                # Рассчитываем базовые скоры
-                relevance_score = scoring_service.calculate_relevance_score(job)
-                skill_match_score = scoring_service.calculate_skill_match_score(job)
-                salary_score = scoring_service.calculate_salary_score(job)
-                location_score = scoring_service.calculate_location_score(job)
-                
-                # Создаем или обновляем скор
-                job_score, created = JobScore.objects.update_or_create(
-                    job=job,
-                    defaults={
-                        'relevance_score': relevance_score,
-                        'skill_match_score': skill_match_score,
-                        'salary_score': salary_score,
-                        'location_score': location_score,
-                        'calculated_at': timezone.now()
-                    }
-                )
-                
-                scored_count += 1
-                
-            except Exception as e:
-                logger.error(f"Error scoring job {job.id}: {str(e)}")
-                continue
+    except Exception as e:
+        logger.error(f"Error scoring jobs {job_ids[:10]}: {str(e)}")
+        return f"Error: {str(e)}"
+
+@shared_task
+def update_job_freshness():
+    """
+    Apply the time-dependent freshness part of relevance_score in SQL
+    """
+    try:
+        from .scoring import update_freshness
         
-        logger.info(f"Job scoring completed: {scored_count} jobs scored")
-        return f"Scored {scored_count} jobs"
+        updated = update_freshness()
+        logger.info(f"Job freshness updated: {updated} scores changed")
+        return f"Updated freshness of {updated} scores"
         
     except Exception as e:
-        logger.error(f"Error in job scoring task: {str(e)}")
+        logger.error(f"Error in job freshness task: {str(e)}")
+        return f"Error: {str(e)}"
+
+@shared_task
+def build_job_features(rebuild: bool = False):
+    """
+    Досчитать JobFeatures для вакансий, записанных в обход ingestion
+    (rebuild=True - проверить все, например после изменения словаря)
+    """
+    try:
+        from .job_features import refresh_job_features
+
+        stats = refresh_job_features(rebuild=rebuild)
+        return f"Job features: {stats['built']} built, {stats['unchanged']} unchanged"
+
+    except Exception as e:
+        logger.error(f"Error in job features task: {str(e)}")
+        return f"Error: {str(e)}"
+
+@shared_task
+def calculate_user_matches(user_ids: List[int] = None):
+    """
+    Calculate personalised top-K job matches for user profiles
+    """
+    try:
+        from .personalization import calculate_user_matches as calculate
+        
+        stats = calculate(user_ids)
+        return f"Matched {stats['users']} users: {stats['matches']} matches in {stats['seconds']}s"
+        
+    except Exception as e:
+        logger.error(f"Error in user matches task: {str(e)}")
         return f"Error: {str(e)}"
 
 @shared_task
@@ -342,7 +404,8 @@ def send_job_notifications():
     Send notifications about new relevant jobs to users
     """
     try:
-        from .models import Job, UserProfile, Application
+        from .models import Job, UserProfile
+        from .personalization import match_new_jobs
         from .services import NotificationService
         
         logger.info("Starting job notifications task")
@@ -362,12 +425,16 @@ def send_job_notifications():
             is_active=True,
             created_at__gte=cutoff_date,
             jobscore__relevance_score__gte=70  # Только релевантные вакансии
-        ).select_related('jobscore')
+        )
+        
+        # Подходящие профилям вакансии (лучшие первыми) - по всем новым вакансиям,
+        # а не только по сохраненному top_k UserJobMatch
+        users_with_notifications = list(users_with_notifications)
+        matched_jobs = match_new_jobs(users_with_notifications, new_jobs)
         
         for user_profile in users_with_notifications:
             try:
-                # Фильтруем вакансии по предпочтениям пользователя
-                relevant_jobs = notification_service.filter_jobs_for_user(new_jobs, user_profile)
+                relevant_jobs = matched_jobs.get(user_profile.user_id, [])
                 
                 if relevant_jobs:
                     # Отправляем уведомление
@@ -420,6 +487,48 @@ def cleanup_old_jobs():
         logger.error(f"Error in cleanup task: {str(e)}")
         return f"Error: {str(e)}"
 
+@shared_task
+def prune_page_archive():
+    """
+    Apply the raw page archive retention (PAGE_ARCHIVE max_age_days / max_size_mb)
+    """
+    try:
+        from .archive import archive_config, get_page_archive
+
+        archive = get_page_archive()
+        if archive is None:
+            return "Page archive is disabled"
+        config = archive_config()
+        removed = archive.prune(config['max_age_days'], config['max_size_mb'])
+        logger.info(
+            f"Page archive pruned: {removed['pages']} pages, {removed['blobs']} blobs, "
+            f"{removed['bytes'] / 1024 / 1024:.1f} MB"
+        )
+        return f"Removed {removed['pages']} archived pages, {removed['blobs']} blobs"
+
+    except Exception as e:
+        logger.error(f"Error in page archive prune task: {str(e)}")
+        return f"Error: {str(e)}"
+
+@shared_task
+def prune_http_cache():
+    """
+    Delete HTTP cache entries older than HTTP_CACHE['max_age_days']
+    """
+    try:
+        from .http_cache import cache_config, get_http_cache
+
+        http_cache = get_http_cache()
+        if http_cache is None:
+            return "HTTP cache is disabled"
+        deleted = http_cache.prune(cache_config()['max_age_days'])
+        logger.info(f"HTTP cache pruned: {deleted} entries")
+        return f"Deleted {deleted} HTTP cache entries"
+
+    except Exception as e:
+        logger.error(f"Error in HTTP cache prune task: {str(e)}")
+        return f"Error: {str(e)}"
+
 @shared_task
 def generate_job_analytics():
     """
@@ -462,6 +571,12 @@ def generate_job_analytics():
             count=Count('id')
         )
         
+        # Технологии по JobFeatures (используется и в get_market_trends)
+        from .job_features import refresh_job_features
+        from .services import JobAnalyticsService
+        refresh_job_features(Job.objects.filter(is_active=True))
+        technology_stats = JobAnalyticsService().count_technologies()
+        
         analytics_data = {
             'total_jobs': total_jobs,
             'remote_jobs': remote_jobs,
@@ -471,6 +586,7 @@ def generate_job_analytics():
             'experience_stats': list(experience_stats),
             'top_companies': [{'name': c.name, 'job_count': c.job_count} for c in top_companies],
             'source_stats': list(source_stats),
+            'technology_stats': technology_stats,
             'generated_at': timezone.now().isoformat()
         }
         
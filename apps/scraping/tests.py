@@ -1,3 +1,1164 @@
-from django.test import TestCase
+import asyncio
+import io
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipIf
 
-# Create your tests here.
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from selenium.common.exceptions import WebDriverException
+
+from . import cassette as cassette_module
+from .archive import PageArchive, get_page_archive, zstandard
+from .benchmarks import load_markup
+from .browser_pool import DRIVER_FACTORIES, BrowserPool, get_browser_pool
+from .cassette import CassetteMiss, active_cassette, use_cassette
+from .enrichment import LinkedInDetailsEnricher
+from .fetcher import AsyncFetcher, TokenBucket
+from .html_parser import available_backends, parse_cards, parse_html
+from .http_cache import CachingAdapter, HttpCache, freshness_lifetime
+from .ingestion import JobIngestionService
+from .job_features import extract_features, match_skills, refresh_job_features
+from .keyword_matcher import KeywordMatcher, get_matcher
+from .models import Job, JobFeatures, JobScore, ScrapeRun, UserJobMatch, UserProfile
+from .personalization import UserJobMatcher, calculate_user_matches, match_new_jobs
+from .scrape_runs import ScrapeRunInProgress, ScrapeRunTracker
+from .scoring import BatchJobScorer
+from .scrapers.cvkeskus_scraper import CVKeskusScraper, parse_results_page
+from .scrapers.linkedin_scraper import LinkedInScraper
+from .services import JobScoringService, NotificationService
+
+
+def make_jobs(prefix, count):
+    return [
+        {'url': f'https://jobs.example/{prefix}{i}', 'title': f'Python developer {prefix}{i}', 'description': 'Python'}
+        for i in range(count)
+    ]
+
+
+class JobIngestionServiceTests(TestCase):
+    """Пакетная запись вакансий: upsert по source_url, счетчики, дубликаты"""
+
+    def test_upserts_by_source_url_and_counts(self):
+        stats = JobIngestionService('cvkeskus', chunk_size=2).ingest(make_jobs('a', 5))
+        self.assertEqual(stats, {'new': 5, 'updated': 0, 'unchanged': 0, 'failed': 0, 'total': 5})
+
+        changed = make_jobs('a', 5)
+        changed[0]['title'] = 'Senior Python developer'
+        changed.append({'url': 'https://jobs.example/b0', 'title': 'Go developer'})
+        stats = JobIngestionService('cvkeskus', chunk_size=2).ingest(changed)
+
+        self.assertEqual(stats, {'new': 1, 'updated': 1, 'unchanged': 4, 'failed': 0, 'total': 6})
+        self.assertEqual(Job.objects.count(), 6)
+        self.assertEqual(Job.objects.get(source_url='https://jobs.example/a0').title, 'Senior Python developer')
+
+    def test_duplicates_and_invalid_jobs(self):
+        jobs = make_jobs('a', 2) + [
+            {'url': 'https://jobs.example/a0', 'title': 'Python developer, last version wins'},
+            {'url': 'https://jobs.example/no-title'},
+            {'title': 'No URL'},
+        ]
+        stats = JobIngestionService('cvkeskus').ingest(jobs)
+
+        self.assertEqual((stats['new'], stats['failed'], stats['total']), (2, 2, 5))
+        self.assertEqual(
+            Job.objects.get(source_url='https://jobs.example/a0').title, 'Python developer, last version wins'
+        )
+
+    def test_unchanged_jobs_are_not_rewritten(self):
+        JobIngestionService('cvkeskus').ingest(make_jobs('a', 3))
+        Job.objects.update(updated_at=Job.objects.get(source_url='https://jobs.example/a0').created_at)
+        before = dict(Job.objects.values_list('source_url', 'updated_at'))
+
+        stats = JobIngestionService('cvkeskus').ingest(make_jobs('a', 3))
+
+        self.assertEqual((stats['unchanged'], stats['updated']), (3, 0))
+        self.assertEqual(dict(Job.objects.values_list('source_url', 'updated_at')), before)
+
+    def test_missing_posted_date_keeps_known_date(self):
+        dated = dict(make_jobs('a', 1)[0], posted_date='2024-05-01')
+        JobIngestionService('cvkeskus').ingest([dated])
+
+        stats = JobIngestionService('cvkeskus').ingest([dict(dated, posted_date=None, title='Python lead')])
+
+        self.assertEqual(stats['updated'], 1)
+        self.assertEqual(Job.objects.get().posted_date.date().isoformat(), '2024-05-01')
+
+
+class IngestStreamTests(TestCase):
+    """Запись вакансий по мере скрапинга микро-батчами"""
+
+    def test_writes_micro_batches(self):
+        batches = []
+        pages = [make_jobs('a', 3), make_jobs('b', 3), make_jobs('c', 1)]
+        stats = JobIngestionService('cvkeskus').ingest_stream(
+            iter(pages), batch_size=4, on_batch=lambda jobs, batch_stats: batches.append(len(jobs))
+        )
+
+        self.assertEqual(stats['new'], 7)
+        self.assertEqual(batches, [6, 1])
+
+    def test_flushes_collected_jobs_when_scraper_fails(self):
+        def pages():
+            yield make_jobs('a', 2)
+            yield make_jobs('b', 1)
+            raise RuntimeError('scraper crashed')
+
+        with self.assertRaises(RuntimeError):
+            JobIngestionService('cvkeskus').ingest_stream(pages(), batch_size=100)
+
+        self.assertEqual(Job.objects.count(), 3)
+
+
+class FakeDetailsScraper:
+    def __init__(self, details):
+        self.details = details
+
+    def fetch_job_details(self, job_urls):
+        return {url: self.details for url in job_urls}
+
+
+class LinkedInDetailsEnricherTests(TestCase):
+    """Детали вакансии не затираются повторным скрапингом той же карточки"""
+
+    card = {
+        'url': 'https://www.linkedin.com/jobs/view/1',
+        'title': 'Python Developer',
+        'company': 'Acme',
+        'description': 'Short snippet',
+    }
+
+    def test_rescraped_card_keeps_enriched_details(self):
+        JobIngestionService('linkedin').ingest([dict(self.card)])
+        enricher = LinkedInDetailsEnricher(scraper=FakeDetailsScraper({
+            'description': 'Full description with Django and PostgreSQL',
+            'employment_type': 'Full-time',
+            'posted_date': '2024-05-01',
+        }))
+        self.assertEqual(enricher.enrich([self.card['url']])['enriched'], 1)
+
+        stats = JobIngestionService('linkedin').ingest([dict(self.card)])
+
+        self.assertEqual(stats['unchanged'], 1)
+        job = Job.objects.get()
+        self.assertEqual(job.description, 'Full description with Django and PostgreSQL')
+        self.assertEqual(job.posted_date.date().isoformat(), '2024-05-01')
+        self.assertIsNotNone(job.details_fetched_at)
+
+    def test_changed_card_is_updated(self):
+        JobIngestionService('linkedin').ingest([dict(self.card)])
+        stats = JobIngestionService('linkedin').ingest([dict(self.card, title='Senior Python Developer')])
+
+        self.assertEqual(stats['updated'], 1)
+        self.assertEqual(Job.objects.get().title, 'Senior Python Developer')
+
+
+class ScrapeRunTrackerTests(TestCase):
+    """Курсор запуска: ранняя остановка, запись страниц и продолжение после сбоя"""
+
+    def setUp(self):
+        self.known = make_jobs('k', 23)
+        JobIngestionService('cvkeskus').ingest(self.known)
+
+    def crawl(self, pages, urls):
+        run = ScrapeRunTracker.start('cvkeskus', incremental=True, query='python')
+        run.plan(urls)
+        stats = JobIngestionService('cvkeskus').ingest_stream(run.track(pages), on_batch=run.on_batch)
+        run.finish()
+        return run, stats
+
+    def test_new_jobs_on_known_page_are_ingested(self):
+        page = make_jobs('u', 2) + self.known
+        run, stats = self.crawl([('p1', page), ('p2', make_jobs('old', 5))], ['p1', 'p2'])
+
+        self.assertEqual(stats['new'], 2)
+        self.assertTrue(run.stopped_early)
+        self.assertEqual(run.done_pages, {'p1'})
+        self.assertTrue(Job.objects.filter(source_url='https://jobs.example/u0').exists())
+        self.assertFalse(Job.objects.filter(source_url='https://jobs.example/old0').exists())
+        self.assertIn('https://jobs.example/u0', run.run.seen_ids)
+        self.assertEqual(run.run.status, 'completed')
+
+    def test_known_page_without_new_jobs_stops_without_writing(self):
+        run, stats = self.crawl([('p1', self.known), ('p2', make_jobs('old', 5))], ['p1', 'p2'])
+
+        self.assertEqual(stats['total'], 0)
+        self.assertEqual(run.done_pages, {'p1'})
+        self.assertEqual(run.run.status, 'completed')
+
+    def test_failed_chunk_leaves_page_unwritten_and_resumes(self):
+        pages = [('p1', make_jobs('a', 3)), ('p2', make_jobs('b', 3))]
+        with mock.patch.object(JobIngestionService, '_ingest_chunk', side_effect=RuntimeError('db down')):
+            run, stats = self.crawl(pages, ['p1', 'p2'])
+
+        self.assertEqual(stats['failed'], 6)
+        self.assertEqual(run.done_pages, set())
+        self.assertEqual(run.run.status, 'failed')
+        self.assertNotIn('https://jobs.example/a0', run.run.seen_ids)
+
+        run, stats = self.crawl(pages, ['p1', 'p2'])
+        self.assertEqual(run.run.pk, ScrapeRun.objects.get().pk)
+        self.assertEqual(run.run.attempts, 2)
+        self.assertEqual(stats['new'], 6)
+        self.assertEqual(run.run.status, 'completed')
+        self.assertIn('https://jobs.example/a0', run.run.seen_ids)
+
+    def test_resume_skips_written_pages(self):
+        pages = [('p1', make_jobs('a', 3)), ('p2', None), ('p3', make_jobs('c', 3))]
+        run, _ = self.crawl(pages, ['p1', 'p2', 'p3'])
+        self.assertEqual(run.run.status, 'failed')
+        self.assertEqual(run.done_pages, {'p1', 'p3'})
+
+        resumed = ScrapeRunTracker.start('cvkeskus', incremental=True, query='python')
+        self.assertEqual(resumed.plan(['p1', 'p2', 'p3']), ['p2'])
+
+    def test_run_source_is_a_valid_choice(self):
+        run = ScrapeRunTracker.start('cvkeskus', incremental=True, query='python')
+        run.run.clean_fields(exclude=['cursor', 'seen_ids', 'stats'])
+        self.assertEqual(run.run.get_source_display(), 'CV Keskus')
+
+    def test_live_run_is_not_started_twice(self):
+        first = ScrapeRunTracker.start('cvkeskus', incremental=True, query='python')
+        with self.assertRaises(ScrapeRunInProgress):
+            ScrapeRunTracker.start('cvkeskus', incremental=False, query='python')
+        # Другой запрос того же источника не блокируется
+        other = ScrapeRunTracker.start('cvkeskus', incremental=True, query='django')
+        self.assertNotEqual(other.run.pk, first.run.pk)
+        self.assertEqual(ScrapeRun.objects.filter(status='running').count(), 2)
+
+        # Запуск без обновлений дольше stale_after_minutes считается прерванным и продолжается
+        ScrapeRun.objects.filter(pk=first.run.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        resumed = ScrapeRunTracker.start('cvkeskus', incremental=True, query='python')
+        self.assertEqual(resumed.run.pk, first.run.pk)
+        self.assertEqual(resumed.run.attempts, 2)
+
+    def test_scrape_task_skips_live_run(self):
+        from .tasks import scrape_cvkeskus_jobs
+
+        ScrapeRunTracker.start('cvkeskus', incremental=True, keywords="", location="")
+        with mock.patch.object(CVKeskusScraper, 'iter_job_pages') as iter_job_pages:
+            result = scrape_cvkeskus_jobs()
+        self.assertIn('skipped', result)
+        iter_job_pages.assert_not_called()
+        self.assertEqual(ScrapeRun.objects.count(), 1)
+
+
+class FakeResponse:
+    def __init__(self, status, delay=0.0, tracker=None, headers=None, body=b'<html></html>'):
+        self.status = status
+        self.headers = headers or {}
+        self.delay = delay
+        self.tracker = tracker
+        self.body = body
+
+    async def read(self):
+        if self.tracker is not None:
+            self.tracker.enter()
+        await asyncio.sleep(self.delay)
+        if self.tracker is not None:
+            self.tracker.exit()
+        return self.body
+
+    def get_encoding(self):
+        return 'utf-8'
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+class FakeSession:
+    def __init__(self, statuses=None, delay=0.0, tracker=None, responses=None):
+        self.statuses = list(statuses or [])
+        self.delay = delay
+        self.tracker = tracker
+        # (status, headers, body) по порядку запросов - вместо statuses
+        self.responses = list(responses or [])
+        self.requests = 0
+        self.sent_headers = []
+
+    def get(self, url, headers=None):
+        self.requests += 1
+        self.sent_headers.append(dict(headers or {}))
+        if self.responses:
+            status, response_headers, body = self.responses.pop(0)
+            return FakeResponse(status, self.delay, self.tracker, response_headers, body)
+        status = self.statuses.pop(0) if self.statuses else 200
+        return FakeResponse(status, self.delay, self.tracker)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+class ConcurrencyTracker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def enter(self):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def exit(self):
+        with self.lock:
+            self.active -= 1
+
+
+class FetcherTests(SimpleTestCase):
+    """Лимиты хостов и повторы AsyncFetcher"""
+
+    def test_token_bucket_spreads_requests_after_burst(self):
+        bucket = TokenBucket(rate=10, burst=2)
+
+        async def take(count):
+            for _ in range(count):
+                await bucket.acquire()
+
+        started = time.monotonic()
+        asyncio.run(take(5))
+        # 2 токена сразу, еще 3 - по 0.1 с
+        self.assertAlmostEqual(time.monotonic() - started, 0.3, delta=0.1)
+
+    def test_retries_transient_statuses(self):
+        fetcher = AsyncFetcher(retries=2, host_limits={'retry.test': {'rate': 1000, 'burst': 10}})
+        session = FakeSession([503, 429, 200])
+        fetcher._make_session = lambda: session
+        with mock.patch.object(AsyncFetcher, '_backoff', return_value=0):
+            result, = fetcher.fetch_all(['https://retry.test/page'])
+
+        self.assertTrue(result.ok)
+        self.assertEqual(result.attempts, 3)
+        self.assertEqual(session.requests, 3)
+
+    def test_gives_up_after_retries(self):
+        fetcher = AsyncFetcher(retries=1, host_limits={'retry.test': {'rate': 1000, 'burst': 10}})
+        fetcher._make_session = lambda: FakeSession([503, 503, 200])
+        with mock.patch.object(AsyncFetcher, '_backoff', return_value=0):
+            result, = fetcher.fetch_all(['https://retry.test/page'])
+
+        self.assertEqual(result.error, 'HTTP 503')
+        self.assertEqual(result.attempts, 2)
+
+    def test_host_limits_are_shared_across_calls_and_threads(self):
+        limits = {'shared.test': {'concurrency': 2, 'rate': 1000, 'burst': 10}}
+        tracker = ConcurrencyTracker()
+        urls = [f'https://shared.test/{i}' for i in range(12)]
+        fetchers = [AsyncFetcher(host_limits=limits) for _ in range(2)]
+        for fetcher in fetchers:
+            fetcher._make_session = lambda: FakeSession(delay=0.02, tracker=tracker)
+
+        results = {}
+        thread = threading.Thread(target=lambda: results.update(batch=fetchers[0].fetch_all(urls)))
+        thread.start()
+        streamed = list(fetchers[1].iter_fetched(urls, max_pending=4))
+        thread.join()
+
+        self.assertEqual(len(streamed), 12)
+        self.assertEqual(len(results['batch']), 12)
+        self.assertEqual(tracker.peak, 2)
+
+
+def stub_response(request, status, headers=None, body=b''):
+    """Ответ транспорта requests без сети"""
+    response = requests.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers or {})
+    response.raw = io.BytesIO(body)
+    response._content = body
+    response.encoding = 'utf-8'
+    response.url = request.url
+    response.request = request
+    return response
+
+
+class HttpCacheTests(SimpleTestCase):
+    """HTTP-кэш: свежие записи без запроса, условные запросы и 304, no-store, TTL политики"""
+
+    url = 'https://cache.test/job/1'
+
+    def setUp(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path, ignore_errors=True)
+        config = {'enabled': True, 'path': os.path.join(path, 'http_cache.sqlite3'), 'ttl': {'job': 3600}}
+        settings_override = override_settings(HTTP_CACHE=config)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.cache = HttpCache(config['path'], config['ttl'])
+        self.sent = []
+
+    def session(self, policy, responses):
+        """requests.Session с CachingAdapter поверх транспорта, отдающего responses по порядку"""
+        responses = list(responses)
+
+        def send(request, **kwargs):
+            self.sent.append(dict(request.headers))
+            return stub_response(request, *responses.pop(0))
+
+        patcher = mock.patch.object(HTTPAdapter, 'send', side_effect=send)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        session = requests.Session()
+        adapter = CachingAdapter(policy, cache=self.cache)
+        session.mount('https://', adapter)
+        return session
+
+    def test_freshness_lifetime(self):
+        self.assertIsNone(freshness_lifetime({'Cache-Control': 'no-store'}, 3600))
+        # TTL политики важнее no-cache и max-age сайта
+        self.assertEqual(freshness_lifetime({'Cache-Control': 'no-cache'}, 3600), 3600)
+        self.assertEqual(freshness_lifetime({'cache-control': 'public, max-age=60'}, 3600), 3600)
+        self.assertEqual(freshness_lifetime({'Cache-Control': 'public, max-age=60'}, None), 60)
+        self.assertEqual(freshness_lifetime({'Cache-Control': 'no-cache, max-age=60'}, None), 0)
+        self.assertEqual(freshness_lifetime({}, None), 0)
+
+    def test_fresh_entry_is_served_without_request(self):
+        session = self.session('job', [(200, {'Cache-Control': 'no-cache', 'ETag': '"v1"'}, b'job page')])
+
+        first = session.get(self.url)
+        second = session.get(self.url)
+
+        self.assertFalse(getattr(first, 'from_cache', False))
+        self.assertTrue(second.from_cache)
+        self.assertEqual(second.content, b'job page')
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(len(self.sent), 1)
+        # Срок свежести - TTL политики, а не no-cache ответа
+        entry = self.cache.lookup(self.url)
+        self.assertAlmostEqual(entry['expires_at'] - entry['stored_at'], 3600, delta=1)
+
+    def test_stale_entry_is_revalidated(self):
+        validators = {'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Sep 2025 10:00:00 GMT', 'Cache-Control': 'no-cache'}
+        session = self.session('page', [
+            (200, dict(validators, **{'Content-Length': '9', 'Set-Cookie': 'a=b'}), b'page body'),
+            (304, {'ETag': '"v2"'}),
+            (200, {'ETag': '"v3"', 'Cache-Control': 'no-cache'}, b'new body'),
+        ])
+
+        session.get(self.url)
+        self.assertNotIn('Set-Cookie', self.cache.lookup(self.url)['headers'])
+        revalidated = session.get(self.url)
+
+        self.assertEqual(self.sent[1]['If-None-Match'], '"v1"')
+        self.assertEqual(self.sent[1]['If-Modified-Since'], validators['Last-Modified'])
+        self.assertTrue(revalidated.from_cache)
+        self.assertEqual(revalidated.status_code, 200)
+        self.assertEqual(revalidated.content, b'page body')
+        self.assertEqual(self.cache.lookup(self.url)['etag'], '"v2"')
+
+        # Страница изменилась - в кэше новое тело
+        changed = session.get(self.url)
+        self.assertEqual(self.sent[2]['If-None-Match'], '"v2"')
+        self.assertEqual(changed.content, b'new body')
+        self.assertEqual(self.cache.lookup(self.url)['content'], b'new body')
+
+    def test_no_store_is_not_cached(self):
+        session = self.session('job', [
+            (200, {'Cache-Control': 'no-store', 'ETag': '"v1"'}, b'private'),
+            (200, {'Cache-Control': 'no-store', 'ETag': '"v1"'}, b'private'),
+        ])
+
+        session.get(self.url)
+        second = session.get(self.url)
+
+        self.assertIsNone(self.cache.lookup(self.url))
+        self.assertFalse(getattr(second, 'from_cache', False))
+        self.assertNotIn('If-None-Match', self.sent[1])
+
+    def test_post_and_errors_bypass_cache(self):
+        session = self.session('job', [(500, {'ETag': '"v1"'}, b'error'), (200, {}, b'created')])
+
+        session.get(self.url)
+        session.post(self.url, data={'a': 1})
+
+        self.assertIsNone(self.cache.lookup(self.url))
+        self.assertEqual(len(self.sent), 2)
+
+    def test_async_fetcher_uses_cache(self):
+        fetcher = AsyncFetcher(retries=0, host_limits={'cache.test': {'rate': 1000, 'burst': 10}})
+        session = FakeSession(responses=[
+            (200, {'ETag': '"v1"', 'Cache-Control': 'no-cache'}, b'listing'),
+            (304, {'ETag': '"v1"'}, b''),
+        ])
+        fetcher._make_session = lambda: session
+
+        downloaded, = fetcher.fetch_all([self.url], cache='job')
+        fresh, = fetcher.fetch_all([self.url], cache='job')
+        self.assertFalse(downloaded.from_cache)
+        self.assertTrue(fresh.from_cache)
+        self.assertEqual(fresh.content, b'listing')
+        self.assertEqual(session.requests, 1)
+
+        # Политика без TTL: no-cache - каждый раз условный запрос, на 304 тело из кэша
+        other = 'https://cache.test/search'
+        session.responses = [(200, {'ETag': '"s1"', 'Cache-Control': 'no-cache'}, b'search'), (304, {}, b'')]
+        fetcher.fetch_all([other], cache='search')
+        revalidated, = fetcher.fetch_all([other], cache='search')
+        self.assertEqual(session.sent_headers[-1], {'If-None-Match': '"s1"'})
+        self.assertTrue(revalidated.ok)
+        self.assertTrue(revalidated.from_cache)
+        self.assertEqual(revalidated.content, b'search')
+
+
+class KeywordMatcherTests(SimpleTestCase):
+    """Совпадения только на границе слова, фразы и слова со знаками"""
+
+    def test_word_boundaries(self):
+        matcher = KeywordMatcher(['js', 'mid', 'java', '.net', 'node.js', 'c#', 'entity framework'])
+
+        self.assertEqual(matcher.find('Parsing JSON in middleware, JavaScript'), set())
+        self.assertEqual(matcher.find('JS and Java, mid-level'), {'js', 'java', 'mid'})
+        self.assertEqual(matcher.find('ASP.NET Core and Node.js'), {'.net', 'node.js', 'js'})
+        self.assertEqual(matcher.find('C# with Entity  Framework'), {'c#', 'entity framework'})
+        self.assertEqual(matcher.find('node js, c, entity and framework'), {'js'})
+
+    def test_matches_any_agrees_with_find(self):
+        matcher = KeywordMatcher(['js', '.net'])
+        for text in ['json only', 'asp.net', 'plain js', 'dotnet', '']:
+            self.assertEqual(matcher.matches_any(text), bool(matcher.find(text)), text)
+
+    def test_find_words_leaves_phrases_to_text(self):
+        matcher = KeywordMatcher(['python', 'f#', 'entity framework'])
+
+        self.assertEqual(matcher.phrases, {'f#', 'entity framework'})
+        self.assertEqual(matcher.find_words({'python', 'f', 'entity', 'framework'}), {'python'})
+
+    def test_match_skills_checks_punctuated_skills_in_text(self):
+        text = 'Data engineer: F, Python and a framework for entity resolution'
+        features = JobFeatures(**extract_features('Data engineer', text, ''))
+        matcher = get_matcher(['f#', 'entity framework', 'resolution'])
+
+        self.assertEqual(match_skills(features, matcher, text), {'resolution'})
+        self.assertEqual(match_skills(features, matcher, 'Uses F# daily'), {'resolution', 'f#'})
+
+
+class UserJobMatcherTests(TestCase):
+    """Персональные совпадения - те же вакансии, что отбирает filter_jobs_for_user"""
+
+    jobs = [
+        ('Python Developer', 'Django, PostgreSQL', 'Tallinn', 4000, False),
+        ('Senior Python Engineer', 'FastAPI and Docker', 'Tartu', 6000, False),
+        ('C# Developer', 'ASP.NET Core, Entity Framework', 'Tallinn', 3500, False),
+        ('Frontend Developer', 'React, JSON APIs, middleware', 'Riga', 5000, True),
+        ('Data Engineer', 'F, Spark and a framework for entity resolution', 'Tallinn', None, False),
+        ('Java Developer', 'Spring Boot, Kafka', 'Tartu', 2500, False),
+        ('DevOps Engineer', 'Kubernetes, Docker, Terraform', 'Tallinn', 5500, True),
+    ]
+    profiles = [
+        ('python, docker', None, ''),
+        ('python', 5000, ''),
+        ('c#, entity framework', None, 'tallinn'),
+        ('f#, js', None, ''),
+        ('react, kubernetes', 3000, 'tartu'),
+        ('', 4000, ''),
+    ]
+
+    def setUp(self):
+        JobIngestionService('cvkeskus').ingest([
+            {'url': f'https://jobs.example/m{i}', 'title': title, 'description': description,
+             'location': location, 'salary_min': salary, 'is_remote': remote}
+            for i, (title, description, location, salary, remote) in enumerate(self.jobs)
+        ])
+        for i, job in enumerate(Job.objects.order_by('id')):
+            JobScore.objects.create(job=job, relevance_score=50 + 5 * i)
+        users = get_user_model().objects
+        self.user_profiles = [
+            UserProfile.objects.create(
+                user=users.create(email=f'user{i}@example.com'),
+                skills=skills, min_salary=min_salary, location_preference=location,
+            )
+            for i, (skills, min_salary, location) in enumerate(self.profiles)
+        ]
+
+    def test_matches_agree_with_filter_jobs_for_user(self):
+        matcher = UserJobMatcher(self.user_profiles, top_k=50)
+        matcher.rank(Job.objects.all())
+        matched = {}
+        for match in matcher.matches():
+            matched.setdefault(match.user_id, set()).add(match.job_id)
+
+        jobs = list(Job.objects.select_related('features'))
+        for profile in self.user_profiles:
+            expected = {job.id for job in NotificationService().filter_jobs_for_user(jobs, profile)}
+            self.assertEqual(matched.get(profile.user_id, set()), expected, profile.skills)
+
+    @override_settings(PERSONALIZATION={'top_k': 1})
+    def test_new_job_matches_are_not_capped_by_top_k(self):
+        calculate_user_matches()
+        profile = self.user_profiles[0]
+        self.assertEqual(UserJobMatch.objects.filter(user_id=profile.user_id).count(), 1)
+
+        matched = match_new_jobs([profile], Job.objects.all())[profile.user_id]
+
+        # Оба навыка + relevance 55 > docker + relevance 80 > python + relevance 50
+        self.assertEqual(
+            [job.title for job in matched],
+            ['Senior Python Engineer', 'DevOps Engineer', 'Python Developer'],
+        )
+
+
+class BatchJobScorerTests(TestCase):
+    """Векторный расчет дает те же скоры, что JobScoringService по одной вакансии"""
+
+    words = [
+        'python', 'django', 'js', 'json', 'react', 'java', 'javascript', 'spring', 'C#', 'ASP.NET',
+        'docker', 'sql', 'senior', 'junior', 'mid', 'middleware', 'lead', 'Node.js', 'trainee', 'team',
+    ]
+
+    def test_scores_match_per_job_service(self):
+        rng = random.Random(21)
+        Job.objects.bulk_create([
+            Job(
+                title=' '.join(rng.choices(self.words, k=rng.randint(1, 4))),
+                company_name=rng.choice(['', 'Acme']),
+                location=rng.choice(['Tallinn', 'Tartu, Estonia', 'Remote', 'Hybrid Riga', 'Berlin', '']),
+                description=' '.join(rng.choices(self.words, k=rng.randint(0, 60))),
+                requirements=' '.join(rng.choices(self.words, k=rng.randint(0, 10))),
+                source_url=f'https://jobs.example/s{i}',
+                source_site='cvkeskus',
+                salary_min=rng.choice([None, 0, 1000, 2500, 3500, 4500, 6000, 9000]),
+                is_remote=rng.random() < 0.2,
+                experience_level=rng.choice(['junior', 'middle', 'senior', 'lead', 'any']),
+            )
+            for i in range(120)
+        ])
+        now = timezone.now()
+        for job_id in Job.objects.values_list('id', flat=True):
+            age = timedelta(days=rng.choice([0, 3, 10, 20, 40]), hours=2)
+            Job.objects.filter(id=job_id).update(created_at=now - age)
+        refresh_job_features()
+        # Часть вакансий без признаков - скорер разбирает их тексты сам
+        JobFeatures.objects.filter(job_id__in=Job.objects.values_list('id', flat=True)[:10]).delete()
+
+        stats = BatchJobScorer().score_queryset(Job.objects.all())
+        self.assertEqual((stats['scored'], stats['failed']), (120, 0))
+
+        service = JobScoringService()
+        scores = {score.job_id: score for score in JobScore.objects.all()}
+        for job in Job.objects.select_related('features'):
+            score = scores[job.id]
+            expected = (
+                service.calculate_relevance_score(job), service.calculate_skill_match_score(job),
+                service.calculate_salary_score(job), service.calculate_location_score(job),
+            )
+            got = (score.relevance_score, score.skill_match_score, score.salary_score, score.location_score)
+            self.assertEqual(got, expected, job.title)
+            self.assertAlmostEqual(score.content_score, service.calculate_content_score(job))
+
+
+def fixture_path(name):
+    return os.path.join(settings.BASE_DIR, name)
+
+
+def outer_nodes(nodes):
+    """Совпадения селектора без вложенных в другие совпадения (как карточки parse_cards)"""
+    outer = []
+    for node in nodes:
+        parent = node.parent
+        while parent is not None and not any(parent == other for other in nodes):
+            parent = parent.parent
+        if parent is None:
+            outer.append(node)
+    return outer
+
+
+class ParseCardsTests(SimpleTestCase):
+    """Частичный разбор карточек совпадает с полным разбором тем же backend'ом"""
+
+    cases = [
+        # Конец <li> подразумевается следующим <li> и </ul>
+        ('<ul><li class="result-card">A<li class="result-card">B<li class="result-card">C</ul><p>after</p>',
+         [('li', {'class': 'result-card'})], 'li.result-card'),
+        # <div/>: html.parser и libxml2 закрывают сразу, HTML5 - нет
+        ('<div class="card">A<div/>x</div><div class="card">B</div><p>end</p>',
+         [('div', {'class': 'card'})], 'div.card'),
+        ('<div class="card">A<div class="card">nested</div></div><div class="card">B',
+         [('div', {'class': 'card'})], 'div.card'),
+        ('<script>"<div class=card>"</script><div class="card">A<div>x</div></div><!-- <div class="card"> -->'
+         '<div class="card">B</div>',
+         [('div', {'class': 'card'})], 'div.card'),
+    ]
+
+    def assertSameCards(self, markup, containers, selector, backend):
+        cards = parse_cards(markup, containers, backend=backend)
+        expected = outer_nodes(parse_html(markup, backend=backend).select(selector))
+        self.assertEqual(
+            [card.get_text(' ', strip=True) for card in cards],
+            [node.get_text(' ', strip=True) for node in expected],
+            f"{backend}: {markup[:80]}",
+        )
+
+    def test_matches_full_parse(self):
+        for markup, containers, selector in self.cases:
+            for backend in available_backends():
+                self.assertSameCards(markup, containers, selector, backend)
+
+    def test_saved_pages_match_full_parse(self):
+        fixtures = [
+            ('cvkeskus', 'cvkeskus_debug.html', CVKeskusScraper.CARD_CONTAINERS, 'article[data-component="jobad"]'),
+            ('linkedin', 'linkedin_jobs_debug.json', LinkedInScraper.CARD_CONTAINERS, 'div.base-card'),
+        ]
+        checked = 0
+        for source, name, containers, selector in fixtures:
+            path = fixture_path(name)
+            if not os.path.exists(path) or not os.path.getsize(path):
+                continue
+            markup = load_markup(source, path)
+            for backend in available_backends():
+                self.assertSameCards(markup, containers, selector, backend)
+                self.assertTrue(parse_cards(markup, containers, backend=backend))
+            checked += 1
+        if not checked:
+            self.skipTest('no saved result pages')
+
+
+class HtmlParserBackendTests(SimpleTestCase):
+    """HtmlNode (lxml/selectolax) отвечает на вызовы скраперов так же, как BeautifulSoup"""
+
+    markup = (
+        '<html><head><title>Jobs</title><script>var x = "<div class=job>";</script></head><body>'
+        '<nav><a href="/login">Login</a></nav>'
+        '<ul class="results">'
+        '<li><article class="job-card featured" data-component="jobad" data-id="1">'
+        '<h2 class="title"><a href="/vacancy/1" title="Python dev">Python developer</a></h2>'
+        '<span class="company">Acme</span> <span class="salary">3000 - 4000 EUR</span>'
+        '<div class="meta">Tallinn <b>remote</b></div></article></li>'
+        '<li><article class="job-card" data-component="jobad" data-id="2">'
+        '<h2 class="title"><a href="/vacancy/2">Backend engineer</a></h2>'
+        '<span class="company">  Beta OÜ  </span><div class="meta">Tartu</div></article></li>'
+        '</ul><footer><p>Total: <strong>2</strong></p></footer></body></html>'
+    )
+
+    @staticmethod
+    def describe(node):
+        if node is None:
+            return None
+        return (node.name, node.get('data-id') or node.get('href'), node.get_text(' ', strip=True))
+
+    def observe(self, doc):
+        """Вызовы API, которые делают скраперы; результат сравнивается между backend'ами"""
+        describe = self.describe
+        cards = doc.find_all('article', attrs={'data-component': 'jobad'})
+        first = cards[0]
+        link = first.find('a', href=lambda href: href and '/vacancy/' in href)
+        return {
+            'cards': [describe(card) for card in cards],
+            'class_': [describe(node) for node in doc.find_all('article', class_='featured')],
+            'class_list': first.get('class'),
+            'attrs': first.attrs,
+            'missing': (first.get('data-missing'), first.get('data-missing', 'x'), first.has_attr('data-id')),
+            'regex_name': [node.name for node in first.find_all(re.compile('^(h2|span)$'))],
+            'name_list': [describe(node) for node in first.find_all(['span', 'b'])],
+            'not_recursive': [node.name for node in first.find_all(recursive=False)],
+            'limit': [describe(node) for node in doc.find_all('span', limit=1)],
+            'string': describe(doc.find('a', string='Backend engineer')),
+            'string_regex': [describe(node) for node in doc.find_all('span', string=re.compile('EUR'))],
+            'link': (describe(link), link['href'], link.get('title')),
+            'find_parent': describe(link.find_parent('article')),
+            'find_parent_attrs': describe(link.find_parent(attrs={'class': 'job-card'})),
+            'select': [describe(node) for node in doc.select('article[data-component="jobad"] h2 a')],
+            'select_one': describe(doc.select_one('ul.results .company')),
+            'select_missing': doc.select_one('.missing'),
+            'card_select': [describe(node) for node in cards[1].select('span')],
+            'get_text': [first.get_text(), first.get_text(' '), first.get_text('|', strip=True)],
+            'text': cards[1].find('span', class_='company').text,
+            'strings': [
+                first.find('span', class_='company').string,
+                first.h2.string,
+                first.find('div', class_='meta').string,
+            ],
+            'child_access': describe(first.h2.a),
+            'footer': doc.find('footer').get_text(strip=True),
+            'nothing': (doc.find('table'), doc.find_all('table')),
+        }
+
+    def test_backends_agree_with_bs4(self):
+        expected = self.observe(parse_html(self.markup, backend='bs4'))
+        self.assertEqual(expected['cards'][0][1], '1')
+        for backend in available_backends():
+            got = self.observe(parse_html(self.markup, backend=backend))
+            for key, value in expected.items():
+                self.assertEqual(got[key], value, f"{backend}: {key}")
+
+    def test_parsed_cards_agree_with_bs4(self):
+        containers = [('article', {'data-component': 'jobad'})]
+        expected = [
+            (self.describe(card), self.describe(card.find('span', class_='company')), card.h2.a['href'])
+            for card in parse_cards(self.markup, containers, backend='bs4')
+        ]
+        for backend in available_backends():
+            cards = parse_cards(self.markup, containers, backend=backend)
+            got = [
+                (self.describe(card), self.describe(card.find('span', class_='company')), card.h2.a['href'])
+                for card in cards
+            ]
+            self.assertEqual(got, expected, backend)
+
+    def test_saved_page_parses_the_same_on_every_backend(self):
+        path = fixture_path('cvkeskus_debug.html')
+        if not os.path.exists(path) or not os.path.getsize(path):
+            self.skipTest('no saved CV Keskus page')
+        with open(path, encoding='utf-8') as f:
+            markup = f.read()
+        scraper = CVKeskusScraper()
+
+        def parse(backend):
+            with override_settings(HTML_PARSER_BACKENDS={'default': backend, 'cvkeskus': backend}):
+                jobs = scraper._parse_page_markup(markup)
+            # scraped_at - время разбора, от backend'а не зависит
+            return [{key: value for key, value in job.items() if key != 'scraped_at'} for job in jobs]
+
+        expected = parse('bs4')
+        self.assertTrue(expected)
+        for backend in available_backends():
+            self.assertEqual(parse(backend), expected, backend)
+
+
+class FakeSwitch:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver.current_handle = handle
+
+
+class FakeBrowser:
+    """WebDriver без браузера: адреса окон и выполненные команды"""
+
+    def __init__(self, config=None):
+        self.urls = {'main': 'about:blank'}
+        self.current_handle = 'main'
+        self.switch_to = FakeSwitch(self)
+        self.commands = []
+
+    @property
+    def window_handles(self):
+        return list(self.urls)
+
+    @property
+    def current_url(self):
+        return self.urls[self.current_handle]
+
+    def get(self, url):
+        self.urls[self.current_handle] = url
+
+    def close(self):
+        del self.urls[self.current_handle]
+
+    def execute_script(self, script):
+        self.commands.append(('script', script))
+
+    def execute_cdp_cmd(self, command, params):
+        self.commands.append((command, params.get('origin')))
+
+    def delete_all_cookies(self):
+        self.commands.append(('delete_all_cookies', None))
+
+    def quit(self):
+        pass
+
+
+class BrowserPoolTests(SimpleTestCase):
+    """Между арендами чистятся cookies и storage всех открытых сайтов"""
+
+    def test_reset_clears_every_visited_origin(self):
+        pool = BrowserPool('chrome', {'size': 1}, factory=FakeBrowser)
+        with pool.lease() as driver:
+            driver.get('https://www.cv.ee/et/search?page=1')
+            driver.get('https://cvkeskus.ee/toopakkumised')
+            # Переход без driver.get() (клик, редирект) и второе окно
+            driver.driver.urls['main'] = 'https://login.example.com/sso'
+            driver.driver.urls['popup'] = 'https://ads.example.net/'
+        raw = driver.driver
+
+        cleared = {origin for command, origin in raw.commands if command == 'Storage.clearDataForOrigin'}
+        self.assertEqual(cleared, {
+            'https://www.cv.ee', 'https://cvkeskus.ee', 'https://login.example.com', 'https://ads.example.net',
+        })
+        self.assertIn(('Network.clearBrowserCookies', None), raw.commands)
+        self.assertTrue(any(command == 'script' for command, _ in raw.commands))
+        self.assertEqual(raw.window_handles, ['main'])
+        self.assertEqual(raw.current_url, 'about:blank')
+
+        with pool.lease() as driver:
+            pass
+        self.assertEqual(pool.stats['leases'], 2)
+        self.assertEqual(pool.stats['reused'], 1)
+        self.assertEqual(pool.stats['discarded'], 0)
+
+
+def days_ago(days):
+    return (timezone.now() - timedelta(days=days)).isoformat(timespec='seconds')
+
+
+@skipIf(zstandard is None, 'zstandard is not installed')
+class PageArchiveTests(SimpleTestCase):
+    """Архив страниц: одно тело на hash, последняя загрузка URL, очистка по сроку и объему"""
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path, ignore_errors=True)
+        self.archive = PageArchive(self.path)
+
+    def blob_exists(self, digest):
+        return os.path.exists(self.archive._blob_path(digest))
+
+    def test_same_content_is_stored_once(self):
+        first = self.archive.store('https://a.example/1', b'<html>same</html>', 'cvkeskus', 200, 'utf-8')
+        second = self.archive.store('https://a.example/2', b'<html>same</html>', 'cvkeskus', 200, 'utf-8')
+        other = self.archive.store('https://a.example/1', b'<html>changed</html>', 'cvkeskus', 200, 'utf-8')
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        stats = self.archive.stats()
+        self.assertEqual((stats['pages'], stats['urls'], stats['blobs']), (3, 2, 2))
+        self.assertEqual(stats['size'], len(b'<html>same</html>') + len(b'<html>changed</html>'))
+        self.assertEqual(self.archive.read(first), b'<html>same</html>')
+        self.assertEqual(len(os.listdir(os.path.join(self.path, 'blobs', first[:2]))), 1)
+
+    def test_pages_latest_fetch_per_url(self):
+        self.archive.store('https://a.example/1', b'old', 'cvkeskus', 200, fetched_at=days_ago(3))
+        self.archive.store('https://a.example/2', b'two', 'cvkeskus', 200, fetched_at=days_ago(2))
+        self.archive.store('https://a.example/1', b'new', 'cvkeskus', 200, fetched_at=days_ago(1))
+        self.archive.store('https://b.example/1', b'other', 'linkedin', 200, fetched_at=days_ago(1))
+
+        latest = self.archive.pages('cvkeskus')
+        self.assertEqual([row['url'] for row in latest], ['https://a.example/2', 'https://a.example/1'])
+        self.assertEqual(self.archive.read(latest[1]['hash']), b'new')
+        self.assertEqual(len(self.archive.pages('cvkeskus', latest=False)), 3)
+        self.assertEqual(len(self.archive.pages(latest=True)), 3)
+
+        # Интервал применяется до выбора последней загрузки
+        window = self.archive.pages('cvkeskus', until=timezone.now() - timedelta(days=1, hours=12))
+        self.assertEqual([self.archive.read(row['hash']) for row in window], [b'old', b'two'])
+        since = self.archive.pages('cvkeskus', since=timezone.now() - timedelta(days=1, hours=12), latest=False)
+        self.assertEqual([row['url'] for row in since], ['https://a.example/1'])
+
+        results = list(self.archive.iter_results(latest))
+        self.assertEqual([result.content for result in results], [b'two', b'new'])
+        self.assertEqual(results[0].status, 200)
+
+    def test_prune_by_age_keeps_blobs_still_referenced(self):
+        shared = self.archive.store('https://a.example/1', b'shared', 'cvkeskus', 200, fetched_at=days_ago(90))
+        self.archive.store('https://a.example/2', b'shared', 'cvkeskus', 200, fetched_at=days_ago(1))
+        old = self.archive.store('https://a.example/3', b'old only', 'cvkeskus', 200, fetched_at=days_ago(90))
+
+        removed = self.archive.prune(max_age_days=60)
+
+        self.assertEqual(removed['pages'], 2)
+        self.assertEqual(removed['blobs'], 1)
+        self.assertGreater(removed['bytes'], 0)
+        self.assertTrue(self.blob_exists(shared))
+        self.assertFalse(self.blob_exists(old))
+        self.assertEqual([row['url'] for row in self.archive.pages(latest=False)], ['https://a.example/2'])
+        self.assertEqual(self.archive.stats()['blobs'], 1)
+
+    def test_prune_by_size_drops_least_recently_fetched(self):
+        bodies = [os.urandom(64 * 1024) for _ in range(3)]
+        digests = [
+            self.archive.store(f'https://a.example/{i}', body, 'cvkeskus', 200, fetched_at=days_ago(3 - i))
+            for i, body in enumerate(bodies)
+        ]
+        # Первое тело загружено еще раз недавно - удаляется второе
+        self.archive.store('https://a.example/again', bodies[0], 'cvkeskus', 200, fetched_at=days_ago(0))
+        stored = self.archive.stats()['stored_size']
+        budget_mb = (stored - 1) / (1024 * 1024)
+
+        removed = self.archive.prune(max_size_mb=budget_mb)
+
+        self.assertEqual((removed['pages'], removed['blobs']), (1, 1))
+        self.assertLessEqual(self.archive.stats()['stored_size'], budget_mb * 1024 * 1024)
+        self.assertEqual(stored - self.archive.stats()['stored_size'], removed['bytes'])
+        self.assertEqual([self.blob_exists(digest) for digest in digests], [True, False, True])
+        self.assertEqual(self.archive.prune(max_size_mb=budget_mb), {'pages': 0, 'blobs': 0, 'bytes': 0})
+
+    def test_prune_orphans_and_blobs_missing_on_disk(self):
+        orphan = self.archive.store('https://a.example/1', b'orphan', 'cvkeskus', 200)
+        kept = self.archive.store('https://a.example/2', b'kept', 'cvkeskus', 200)
+        gone = self.archive.store('https://a.example/3', b'gone', 'cvkeskus', 200, fetched_at=days_ago(90))
+        with self.archive._connect() as conn:
+            conn.execute('DELETE FROM pages WHERE hash = ?', (orphan,))
+        os.remove(self.archive._blob_path(gone))
+
+        # Тело без ссылок удаляется и без ограничений; отсутствующий файл не ломает очистку
+        removed = self.archive.prune(max_age_days=60)
+
+        self.assertEqual((removed['pages'], removed['blobs']), (1, 2))
+        self.assertFalse(self.blob_exists(orphan))
+        self.assertTrue(self.blob_exists(kept))
+        self.assertEqual(self.archive.stats()['blobs'], 1)
+
+    def test_unreadable_blob_is_reported_as_fetch_error(self):
+        digest = self.archive.store('https://a.example/1', b'body', 'cvkeskus', 200)
+        os.remove(self.archive._blob_path(digest))
+
+        result, = self.archive.iter_results(self.archive.pages())
+        self.assertFalse(result.ok)
+        self.assertIn('unreadable', result.error)
+
+
+@skipIf(zstandard is None, 'zstandard is not installed')
+class ReparseArchiveTests(TestCase):
+    """manage.py reparse_archive: текущие парсеры по архиву, без загрузки из сети"""
+
+    def setUp(self):
+        path = fixture_path('cvkeskus_debug.html')
+        if not os.path.exists(path) or not os.path.getsize(path):
+            self.skipTest('no saved CV Keskus page')
+        with open(path, 'rb') as f:
+            self.markup = f.read()
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path, ignore_errors=True)
+        settings_override = override_settings(PAGE_ARCHIVE={'enabled': True, 'path': self.path})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def reparse(self, **options):
+        call_command('reparse_archive', sources=['cvkeskus'], workers=0, stdout=open(os.devnull, 'w'), **options)
+
+    def test_reparse_imports_latest_snapshot(self):
+        archive = get_page_archive()
+        url = 'https://www.cvkeskus.ee/toopakkumised?page=1'
+        # Старый снимок той же страницы не разбирается
+        archive.store(url, b'<html><body>old</body></html>', 'cvkeskus', 200, 'utf-8', fetched_at=days_ago(2))
+        archive.store(url, self.markup, 'cvkeskus', 200, 'utf-8', fetched_at=days_ago(1))
+        # На странице есть несколько вакансий одной компании с одним URL - одна запись на URL
+        expected = len({job['url'] for job in parse_results_page(self.markup)})
+
+        self.reparse(dry_run=True)
+        self.assertFalse(Job.objects.exists())
+
+        self.reparse()
+        self.assertEqual(Job.objects.filter(source_site='cvkeskus').count(), expected)
+        self.assertEqual(set(Job.objects.values_list('employment_type', flat=True)), {'full_time'})
+
+        # Повторный разбор того же архива ничего не меняет
+        self.reparse()
+        self.assertEqual(Job.objects.count(), expected)
+
+
+class PageBrowser(FakeBrowser):
+    """FakeBrowser с HTML открытой страницы"""
+
+    @property
+    def page_source(self):
+        return f'<html><head><title>{self.current_url}</title></head><body><div class="job">1</div></body></html>'
+
+
+class CassetteServer(BaseHTTPRequestHandler):
+    """Локальный сайт для записи кассеты: каждый ответ нумеруется, чтобы различать повторы"""
+
+    hits = 0
+
+    def do_GET(self):
+        CassetteServer.hits += 1
+        body = f'{self.path} #{CassetteServer.hits}'.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('X-Hit', str(CassetteServer.hits))
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class CassetteTests(SimpleTestCase):
+    """Запись всех загрузок запуска в кассету и воспроизведение без сети и без браузера"""
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path, ignore_errors=True)
+        CassetteServer.hits = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), CassetteServer)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.base = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def record(self):
+        fetcher = AsyncFetcher(retries=0)
+        with mock.patch.dict(DRIVER_FACTORIES, {'chrome': PageBrowser}):
+            with use_cassette(self.path, 'record') as cassette:
+                responses = [requests.get(f'{self.base}/api'), requests.get(f'{self.base}/api')]
+                results = fetcher.fetch_all([f'{self.base}/list?page=1', f'{self.base}/list?page=2'])
+                with get_browser_pool('chrome').lease() as driver:
+                    driver.get(f'{self.base}/browser')
+                    source = driver.page_source
+        # Сайт больше недоступен - воспроизведение идет только из кассеты
+        self.server.shutdown()
+        self.server.server_close()
+        self.assertEqual(cassette.stats['recorded'], 5)
+        return responses, results, source
+
+    def test_replay_returns_recorded_responses(self):
+        responses, results, source = self.record()
+
+        fetcher = AsyncFetcher(retries=0)
+        with mock.patch.dict(DRIVER_FACTORIES, {'chrome': mock.Mock(side_effect=AssertionError('Chrome started'))}):
+            with use_cassette(self.path, 'replay') as cassette:
+                replayed = [requests.get(f'{self.base}/api') for _ in range(3)]
+                replayed_results = fetcher.fetch_all([f'{self.base}/list?page=2', f'{self.base}/list?page=1'])
+                with get_browser_pool('chrome').lease() as driver:
+                    driver.get(f'{self.base}/browser')
+                    replayed_source = driver.page_source
+                    title = driver.title
+
+        # Повторы одного URL - по порядку записи, после последней записи - снова последняя
+        self.assertEqual([r.content for r in replayed], [r.content for r in responses] + [responses[1].content])
+        self.assertEqual(replayed[0].status_code, 200)
+        self.assertEqual(replayed[0].headers['X-Hit'], responses[0].headers['X-Hit'])
+        self.assertEqual(replayed[0].text, responses[0].text)
+        self.assertEqual(
+            [(r.status, r.content) for r in replayed_results],
+            [(r.status, r.content) for r in reversed(results)],
+        )
+        self.assertEqual(replayed_source, source)
+        self.assertEqual(title, f'{self.base}/browser')
+        self.assertEqual(cassette.stats, {'recorded': 0, 'replayed': 6, 'missed': 0})
+        # Кассета закрыта - requests снова ходит в сеть
+        self.assertIsNone(active_cassette())
+        self.assertIs(HTTPAdapter.send, cassette_module._original_send)
+
+    def test_cassette_misses(self):
+        self.record()
+
+        fetcher = AsyncFetcher(retries=0)
+        with use_cassette(self.path, 'replay') as cassette:
+            with self.assertRaises(requests.ConnectionError):
+                requests.get(f'{self.base}/unknown')
+            result, = fetcher.fetch_all([f'{self.base}/unknown'])
+            with get_browser_pool('chrome').lease() as driver:
+                with self.assertRaises(WebDriverException):
+                    driver.get(f'{self.base}/unknown')
+            with self.assertRaises(CassetteMiss):
+                cassette.replay('http', f'{self.base}/browser')
+            with self.assertRaises(RuntimeError):
+                with use_cassette(self.path, 'record'):
+                    pass
+
+        self.assertFalse(result.ok)
+        self.assertIn('not in cassette', result.error)
+        self.assertEqual(cassette.stats['missed'], 4)
+        with self.assertRaises(FileNotFoundError):
+            with use_cassette(os.path.join(self.path, 'missing'), 'replay'):
+                pass
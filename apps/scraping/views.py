@@ -4,7 +4,7 @@ from django.views import View
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q, Count, Avg
+from django.db.models import Q, F, Count, Avg, FilteredRelation
 from django.db.models.functions import TruncDate
 from django.http import JsonResponse, HttpResponse
 from django.core.cache import cache
@@ -27,6 +27,8 @@ from .models import (
 from .forms import FindForm, ParsedJobFilterForm
 from .scrapers.linkedin_scraper import LinkedInScraper
 from .services import JobAnalyticsService, NotificationService
+from .ingestion import JobIngestionService
+from .job_features import similar_jobs as find_similar_jobs
 from .tasks import scrape_all_sources, calculate_job_scores, scrape_cvkeskus_jobs
 from .scrapers.cv_ee_scraper import CVeeScraper
 from .scrapers.cv_ee_selenium_scraper import CVeeSeleniumScraper
@@ -75,7 +77,18 @@ def job_list_view(request):
     
     # Sorting
     sort_by = request.GET.get('sort', '-created_at')
-    jobs = jobs.order_by(sort_by)
+    if sort_by == 'match':
+        # Personal match scores precomputed in UserJobMatch, unmatched jobs last
+        if request.user.is_authenticated:
+            jobs = jobs.annotate(
+                user_match=FilteredRelation('user_matches', condition=Q(user_matches__user=request.user))
+            ).annotate(match_score=F('user_match__score')).order_by(
+                F('match_score').desc(nulls_last=True), '-created_at'
+            )
+        else:
+            jobs = jobs.order_by('-created_at')
+    else:
+        jobs = jobs.order_by(sort_by)
     
     # Pagination
     paginator = Paginator(jobs, 20)
@@ -99,13 +112,10 @@ def job_list_view(request):
 
 def job_detail_view(request, job_id):
     """Detailed view of a specific job"""
-    job = get_object_or_404(Job, id=job_id, is_active=True)
+    job = get_object_or_404(Job.objects.select_related('features'), id=job_id, is_active=True)
     
-    # Get similar jobs
-    similar_jobs = Job.objects.filter(
-        is_active=True,
-        job_type=job.job_type
-    ).exclude(id=job.id).select_related('company')[:5]
+    # Get similar jobs (shared technologies from JobFeatures)
+    similar_jobs = find_similar_jobs(job)
     
     context = {
         'job': job,
@@ -501,29 +511,8 @@ class ScraperManagementView(LoginRequiredMixin, ListView):
 
     def _save_linkedin_jobs(self, jobs):
         """Сохранить вакансии LinkedIn в базу данных"""
-        jobs_created = 0
-        for job_data in jobs:
-            try:
-                job, created = Job.objects.get_or_create(
-                    source_url=job_data.get('url', ''),
-                    defaults={
-                        'title': job_data.get('title', ''),
-                        'company_name': job_data.get('company', ''),
-                        'location': job_data.get('location', ''),
-                        'description': job_data.get('description', ''),
-                        'source_site': 'linkedin',
-                        'salary_min': job_data.get('salary_min'),
-                        'salary_max': job_data.get('salary_max'),
-                        'is_active': True
-                    }
-                )
-                if created:
-                    jobs_created += 1
-            except Exception as e:
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.error(f"Error saving LinkedIn job: {str(e)}")
-        return jobs_created
+        stats = JobIngestionService('linkedin').ingest(jobs)
+        return stats['new']
 
 
 @login_required
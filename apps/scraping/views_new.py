@@ -21,6 +21,7 @@ from .models import (
 )
 from .forms import FindForm, ParsedJobFilterForm
 from .scrapers.linkedin_scraper import LinkedInScraper
+from .job_features import similar_jobs as find_similar_jobs
 from .services import JobAnalyticsService, NotificationService
 from .tasks import scrape_all_sources, calculate_job_scores
 
@@ -151,11 +152,8 @@ def job_detail_view(request, job_id):
     except JobScore.DoesNotExist:
         job_score = None
     
-    # Получаем похожие вакансии
-    similar_jobs = Job.objects.filter(
-        is_active=True,
-        experience_level=job.experience_level
-    ).exclude(id=job.id).select_related('company')[:5]
+    # Получаем похожие вакансии (общие технологии по JobFeatures)
+    similar_jobs = find_similar_jobs(job)
     
     # Проверяем, подавал ли пользователь заявку на эту вакансию
     user_application = None
@@ -1,6 +1,7 @@
 import os
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_process_init
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
@@ -16,16 +17,41 @@ app.autodiscover_tasks()
 
 # Настройка периодических задач
 app.conf.beat_schedule = {
-    # Парсинг вакансий каждые 4 часа
+    # Инкрементальный парсинг: только новые вакансии, обычно 1-2 страницы на источник
+    'scrape-new-jobs': {
+        'task': 'apps.scraping.tasks.scrape_all_sources',
+        'schedule': crontab(minute='*/15'),  # Каждые 15 минут
+    },
+
+    # Полный обход выдачи каждые 4 часа (изменения старых вакансий)
     'scrape-all-sources': {
         'task': 'apps.scraping.tasks.scrape_all_sources',
-        'schedule': crontab(minute=0, hour='*/4'),  # Каждые 4 часа
+        'schedule': crontab(minute=5, hour='*/4'),  # Каждые 4 часа в 5 минут
+        'kwargs': {'incremental': False},
     },
     
-    # Расчет скоров каждые 2 часа
+    # Скоры новых и измененных вакансий считаются при записи; здесь - пропущенные, раз в день в 3:30
     'calculate-job-scores': {
         'task': 'apps.scraping.tasks.calculate_job_scores',
-        'schedule': crontab(minute=30, hour='*/2'),  # Каждые 2 часа в 30 минут
+        'schedule': crontab(hour=3, minute=30),
+    },
+    
+    # Свежесть в relevance_score - дешевый UPDATE каждый час в 50 минут
+    'update-job-freshness': {
+        'task': 'apps.scraping.tasks.update_job_freshness',
+        'schedule': crontab(minute=50),
+    },
+    
+    # Признаки вакансий, записанных в обход ingestion, каждый час в 25 минут
+    'build-job-features': {
+        'task': 'apps.scraping.tasks.build_job_features',
+        'schedule': crontab(minute=25),
+    },
+    
+    # Персональные top-K вакансий пользователей - перед уведомлениями, каждый час в 10 минут
+    'calculate-user-matches': {
+        'task': 'apps.scraping.tasks.calculate_user_matches',
+        'schedule': crontab(minute=10),
     },
     
     # Отправка уведомлений каждый час
@@ -46,6 +72,18 @@ app.conf.beat_schedule = {
         'schedule': crontab(hour=2, minute=0),  # Каждый день в 2:00
     },
     
+    # Очистка архива сырых страниц каждый день в 2:30
+    'prune-page-archive': {
+        'task': 'apps.scraping.tasks.prune_page_archive',
+        'schedule': crontab(hour=2, minute=30),
+    },
+    
+    # Очистка HTTP-кэша каждый день в 2:45
+    'prune-http-cache': {
+        'task': 'apps.scraping.tasks.prune_http_cache',
+        'schedule': crontab(hour=2, minute=45),
+    },
+    
     # Генерация аналитики каждые 6 часов
     'generate-analytics': {
         'task': 'apps.scraping.tasks.generate_job_analytics',
@@ -56,6 +94,13 @@ app.conf.beat_schedule = {
 # Настройка временной зоны для периодических задач
 app.conf.timezone = 'Europe/Tallinn'
 
+@worker_process_init.connect
+def start_browser_pools(**kwargs):
+    # Пулы с prewarm (BROWSER_POOL) запускают браузеры заранее, чтобы задачи скрапинга
+    # не ждали холодный старт Chrome; остальные пулы создают браузер при первой аренде
+    from apps.scraping.browser_pool import warm_browser_pools
+    warm_browser_pools(background=True)
+
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}') 
\ No newline at end of file
@@ -235,6 +235,35 @@ SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 SCRAPING_INTERVAL = 3600  # 1 hour
 MAX_RETRIES = 3
 RETRY_DELAY = 300  # 5 minutes
+SCRAPE_ALL_MAX_WORKERS = 3  # Сколько источников scrape_all_sources запускает параллельно
+INGESTION_CHUNK_SIZE = 500  # Размер чанка для bulk upsert вакансий
+INGESTION_BATCH_SIZE = 100  # Вакансий в микро-батче потоковой записи (ingest_stream)
+SCORING_CHUNK_SIZE = 2000  # Вакансий в чанке пакетного расчета скоров (apps/scraping/scoring.py)
+
+# Курсоры запусков скраперов (apps/scraping/scrape_runs.py)
+SCRAPE_RUNS = {
+    'resume_within_hours': 24,  # прерванный запуск продолжается, если начат не раньше
+    'stale_after_minutes': 30,  # running без обновлений дольше - запуск считается прерванным
+    'max_seen_ids': 5000,  # URL вакансий - граница ранней остановки следующего запуска
+    'start_lock_seconds': 60,  # блокировка выбора запуска - пересекающиеся тики beat не стартуют дважды
+}
+
+# Персональные скоры вакансий (apps/scraping/personalization.py)
+PERSONALIZATION = {
+    'top_k': 200,  # лучших вакансий на пользователя в UserJobMatch
+    'job_batch_size': 5000,  # вакансий в одном произведении разреженных матриц
+    'user_batch_size': 500,  # профилей в одной матрице
+    'skill_weight': 70,  # доля навыков профиля, найденных в вакансии
+    'relevance_weight': 30,  # глобальный relevance_score
+}
+
+# Инкрементальный обход: остановка на странице из уже импортированных вакансий
+INCREMENTAL_CRAWL = {
+    'enabled': True,
+    'known_ratio': 0.9,  # доля известных вакансий на странице для остановки
+    'bloom_above': 200000,  # больше URL у источника - Bloom-фильтр вместо множества
+    'false_positive_rate': 0.001,
+}
 
 # Job Status Configuration
 JOB_STATUS_CHOICES = [
@@ -258,6 +287,124 @@ SCRAPER_CONFIG = {
     },
 }
 
+# Общий асинхронный HTTP fetcher (apps/scraping/fetcher.py)
+FETCHER_CONFIG = {
+    'max_connections': 20,  # Размер пула соединений на один запуск
+    'timeout': 30,
+    'retries': 3,
+    'backoff_base': 1.0,  # Секунды, окно экспоненциального backoff с jitter
+    'backoff_max': 30.0,
+}
+# Бюджет вежливости по хостам: одновременные запросы, запросов в секунду, burst
+FETCHER_DEFAULT_HOST_LIMIT = {'concurrency': 4, 'rate': 2.0, 'burst': 4}
+FETCHER_HOST_LIMITS = {
+    'www.linkedin.com': {'concurrency': 2, 'rate': 0.5, 'burst': 1},
+    'www.cv.ee': {'concurrency': 3, 'rate': 1.0, 'burst': 2},
+    'www.cvkeskus.ee': {'concurrency': 3, 'rate': 1.0, 'burst': 2},
+    # Страницы вакансий LinkedIn отдаются с региональных поддоменов
+    'ee.linkedin.com': {'concurrency': 2, 'rate': 0.5, 'burst': 1},
+}
+
+# Догрузка страниц вакансий LinkedIn (описание, тип занятости, дата публикации)
+LINKEDIN_DETAILS_CONFIG = {
+    'refresh_days': 7,  # не загружать повторно раньше этого срока
+    'batch_size': 100,  # вакансий на один проход fetcher + bulk_update
+}
+
+# cv.ee: вакансии берутся из __NEXT_DATA__ по HTTP, браузер - только если JSON не найден
+CV_EE_BROWSERLESS = True
+
+# Пулы "теплых" браузеров для Selenium-скраперов (на каждый worker-процесс)
+BROWSER_POOL = {
+    'chrome': {  # cv.ee
+        'size': 2,
+        'page_budget': 50,  # после стольких страниц браузер перезапускается
+        'driver_version': '137.0.7151.104',
+        # Запуск браузеров при старте процессов Celery worker - только для отдельного
+        # worker'а скрапинга (BROWSER_POOL_PREWARM=1): cv.ee открывает браузер лишь
+        # при отказе HTTP-пути, остальным задачам он не нужен. Иначе - при первой аренде
+        'prewarm': os.getenv('BROWSER_POOL_PREWARM') == '1',
+        'resource_profile': 'cv_ee',
+    },
+    'undetected': {  # CV Keskus
+        'size': 1,
+        'page_budget': 30,
+        'prewarm': False,
+        'resource_profile': 'cvkeskus',
+    },
+}
+
+# Ресурсы, которые не нужны для чтения вакансий (шаблоны CDP Network.setBlockedURLs)
+BLOCKED_RESOURCE_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.mp4', '*.webm',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*facebook.net*', '*hotjar.com*', '*clarity.ms*', '*linkedin.com/px*',
+]
+
+# Профили блокировки ресурсов браузера по источникам.
+# allowed_hosts - единственные хосты, которые браузер может резолвить (документ, JS и API сайта)
+BROWSER_RESOURCE_PROFILES = {
+    'cv_ee': {
+        'block_images': True,
+        'blocked_urls': BLOCKED_RESOURCE_PATTERNS,
+        'allowed_hosts': ['cv.ee', '*.cv.ee'],
+    },
+    'cvkeskus': {
+        'block_images': True,
+        'blocked_urls': BLOCKED_RESOURCE_PATTERNS,
+        'allowed_hosts': ['cvkeskus.ee', '*.cvkeskus.ee'],
+    },
+}
+
+# Максимальное ожидание готовности страницы в Selenium-скраперах по условиям (секунды)
+READINESS_TIMEOUTS = {
+    'document_ready': 15,
+    'next_data': 15,
+    'element_count': 15,
+    'scroll_end': 20,
+}
+
+# HTML-парсер по источнику: 'selectolax', 'lxml' или 'bs4' (если библиотека не
+# установлена - откат на lxml, затем на BeautifulSoup). 'default' - для остальных парсеров
+HTML_PARSER_BACKENDS = {
+    'default': 'lxml',
+    'cvkeskus': 'selectolax',
+    'cv_ee': 'lxml',
+    'linkedin': 'lxml',
+}
+
+# Конвейер загрузка -> разбор (apps/scraping/pipeline.py): разбор страниц в пуле процессов.
+# workers: None - по числу ядер минус одно, 0 - разбор в текущем процессе
+PARSE_PIPELINE = {
+    'workers': None,
+    'queue_size': 16,  # страниц, которые загружаются или ждут разбора одновременно
+}
+
+# Архив сырых страниц (apps/scraping/archive.py): тела ответов в zstd по хешу содержимого,
+# индекс в SQLite. Хранится max_age_days дней, не больше max_size_mb (manage.py prune_archive)
+PAGE_ARCHIVE = {
+    'enabled': True,
+    'path': BASE_DIR / 'page_archive',
+    'compression_level': 10,
+    'max_age_days': 60,
+    'max_size_mb': 1024,
+}
+
+# HTTP-кэш ответов (apps/scraping/http_cache.py): ETag / Last-Modified, условные запросы.
+# ttl - секунды, в течение которых страница политики не запрашивается вовсе
+# (без записи действует Cache-Control ответа); записи старше max_age_days удаляются
+HTTP_CACHE = {
+    'enabled': True,
+    'path': BASE_DIR / 'http_cache.sqlite3',
+    'ttl': {
+        'linkedin_job': 24 * 3600,
+        'cv_ee_job': 24 * 3600,
+    },
+    'max_age_days': 30,
+}
+
 # Настройки для crispy_forms, taggit, weasyprint
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 TAGGIT_CASE_INSENSITIVE = True
@@ -46,11 +46,8 @@ u = get_urls(q)
 city = City.objects.filter(slug='kiev').first()
 language = Language.objects.filter(slug='python').first()
 
-jobs, errors = [], []
-for func, url in parsers:
-    j, e = func(url)
-    jobs += j
-    errors += e
+# Страницы всех сайтов качаются параллельно
+jobs, errors = run_parsers(parsers)
 
 for job in jobs:
     v = Vacancy(**job, city=city, language=language)